@@ -0,0 +1,102 @@
+"""
+Measures how the throughput of a virtual Salesforce instance scales with the
+number of threads calling it at once, for reads, writes and a mix of both
+
+    python benchmarks/concurrency.py --storage-engine sqlite --seconds 2
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+from simple_mockforce.storage import ROWS, STORAGE_ENGINES
+from simple_mockforce.virtual import VirtualSalesforce
+
+SOBJECT_NAMES = ("Account", "Contact", "Lead", "Opportunity")
+THREAD_COUNTS = (1, 2, 4, 8)
+
+
+def seed(virtual: VirtualSalesforce, records: int):
+    for sobject_name in SOBJECT_NAMES:
+        virtual.declare_index(sobject_name, "External_ID__c")
+        for i in range(records):
+            virtual.create(
+                sobject_name,
+                {"Name": f"{sobject_name} {i}", "External_ID__c": str(i), "Rank__c": i},
+            )
+
+
+def read(virtual: VirtualSalesforce, thread: int, i: int):
+    sobject_name = SOBJECT_NAMES[(thread + i) % len(SOBJECT_NAMES)]
+    virtual.query(
+        f"SELECT Name FROM {sobject_name} WHERE Rank__c < 50 ORDER BY Rank__c LIMIT 10"
+    )
+
+
+def write(virtual: VirtualSalesforce, thread: int, i: int):
+    sobject_name = SOBJECT_NAMES[(thread + i) % len(SOBJECT_NAMES)]
+    virtual.upsert(sobject_name, str(i % 100), {"Rank__c": i}, "External_ID__c")
+
+
+def mixed(virtual: VirtualSalesforce, thread: int, i: int):
+    # one write for every nine reads
+    if i % 10 == 0:
+        write(virtual, thread, i)
+    else:
+        read(virtual, thread, i)
+
+
+WORKLOADS = {"read": read, "write": write, "mixed": mixed}
+
+
+def throughput(virtual: VirtualSalesforce, workload, threads: int, seconds: float):
+    """
+    Returns how many operations per second the threads completed altogether
+    """
+    done = [0] * threads
+    start = threading.Barrier(threads + 1)
+    deadline = None
+
+    def run(thread: int):
+        start.wait()
+        i = 0
+        while time.perf_counter() < deadline:
+            workload(virtual, thread, i)
+            i += 1
+        done[thread] = i
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    deadline = time.perf_counter() + seconds
+    start.wait()
+    for worker in workers:
+        worker.join()
+    return sum(done) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--storage-engine", choices=STORAGE_ENGINES, default=ROWS)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    # every query logs a warning, which would be most of what's measured
+    logging.getLogger("simple_mockforce").setLevel(logging.ERROR)
+
+    virtual = VirtualSalesforce(storage_engine=args.storage_engine)
+    seed(virtual, args.records)
+
+    print(f"{args.storage_engine} engine, {args.records} records per sobject")
+    print(f"{'workload':<10}" + "".join(f"{n:>8} thr" for n in THREAD_COUNTS))
+    for name, workload in WORKLOADS.items():
+        rates = [
+            throughput(virtual, workload, threads, args.seconds)
+            for threads in THREAD_COUNTS
+        ]
+        print(f"{name:<10}" + "".join(f"{rate:>9.0f}/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
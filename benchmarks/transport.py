@@ -0,0 +1,97 @@
+"""
+Measures the time a call to the mocked Salesforce API takes through each
+transport, against that of calling the virtual org directly
+
+    python benchmarks/transport.py --calls 2000
+"""
+
+import argparse
+import logging
+import time
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.patching import ADAPTER, RESPONSES, TRANSPORTS
+from simple_mockforce.virtual import VirtualSalesforce
+
+CREDENTIALS = {
+    "username": "benchmark",
+    "password": "benchmark",
+    "security_token": "benchmark",
+    "domain": "mock",
+}
+SOQL = "SELECT Name FROM Account WHERE Rank__c < 10"
+
+
+def api_calls(salesforce: Salesforce, account_id: str):
+    return {
+        "get": lambda i: salesforce.Account.get(account_id),
+        "create": lambda i: salesforce.Account.create({"Name": str(i), "Rank__c": i}),
+        "update": lambda i: salesforce.Account.update(account_id, {"Rank__c": i}),
+        "query": lambda i: salesforce.query(SOQL),
+    }
+
+
+def org_calls(org: VirtualSalesforce, account_id: str):
+    return {
+        "get": lambda i: org.get("Account", account_id),
+        "create": lambda i: org.create("Account", {"Name": str(i), "Rank__c": i}),
+        "update": lambda i: org.update("Account", account_id, {"Rank__c": i}),
+        "query": lambda i: org.query(SOQL),
+    }
+
+
+def per_call(call, calls: int) -> float:
+    """
+    Returns how many microseconds a call takes on average
+    """
+    start = time.perf_counter()
+    for i in range(calls):
+        call(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def measure(transport: str, calls: int):
+    @mock_salesforce(fresh=True, transport=transport)
+    def scenario():
+        salesforce = Salesforce(**CREDENTIALS)
+        account_id = salesforce.Account.create({"Name": "Account", "Rank__c": 0})["id"]
+        return {
+            name: per_call(call, calls)
+            for name, call in api_calls(salesforce, account_id).items()
+        }
+
+    return scenario()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    # every query logs a warning, which would be most of what's measured
+    logging.getLogger("simple_mockforce").setLevel(logging.ERROR)
+
+    org = VirtualSalesforce()
+    account_id = org.create("Account", {"Name": "Account", "Rank__c": 0})
+    direct = {
+        name: per_call(call, args.calls)
+        for name, call in org_calls(org, account_id).items()
+    }
+    timings = {transport: measure(transport, args.calls) for transport in TRANSPORTS}
+
+    print(f"microseconds per call, over {args.calls} calls")
+    print(f"{'call':<8}{'org':>10}" + "".join(f"{t:>12}" for t in TRANSPORTS))
+    for name, took in direct.items():
+        print(
+            f"{name:<8}{took:>10.1f}"
+            + "".join(f"{timings[t][name]:>12.1f}" for t in TRANSPORTS)
+        )
+    print("overhead removed by the adapter, per call")
+    for name in direct:
+        removed = timings[RESPONSES][name] - timings[ADAPTER][name]
+        print(f"{name:<8}{removed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
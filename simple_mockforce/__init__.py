@@ -1,129 +1,77 @@
-import re
-import responses
-
-from decorator import decorator
-
-from simple_mockforce.callbacks import (
-    bulk_callback,
-    bulk_detail_callback,
-    bulk_result_callback,
-    bulk_query_result_callback,
-    create_callback,
-    delete_callback,
-    get_callback,
-    job_callback,
-    job_detail_callback,
-    query_callback,
-    query_all_callback,
-    update_callback,
-)
-from simple_mockforce.constants import (
-    BATCH_DETAIL_URL,
-    BATCH_RESULT_URL,
-    BATCH_QUERY_RESULT_URL,
-    CREATE_URL,
-    JOB_DETAIL_URL,
-    LOGIN_URL,
-    OAUTH_RESPONSE,
-    OAUTH_URL,
-    SOAP_API_LOGIN_RESPONSE,
-    DETAIL_URL,
-    QUERY_URL,
-    QUERY_ALL_URL,
-    JOB_URL,
-    BATCH_URL,
-)
-from simple_mockforce.utils import terminate_regex
-from simple_mockforce.virtual import virtual_salesforce
-
-
-@decorator
-@responses.activate
-def mock_salesforce(func, *args, **kwargs):
-    virtual_salesforce.provision()
-    responses.add(
-        responses.POST,
-        terminate_regex(LOGIN_URL),
-        body=SOAP_API_LOGIN_RESPONSE,
-        content_type="text/xml",
-    )
-    responses.add(
-        responses.POST,
-        terminate_regex(OAUTH_URL),
-        body=OAUTH_RESPONSE,
-        content_type="application/json",
-    )
-    responses.add_callback(
-        responses.GET,
-        re.compile(QUERY_URL),
-        callback=query_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.GET,
-        re.compile(QUERY_ALL_URL),
-        callback=query_all_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.GET,
-        re.compile(DETAIL_URL),
-        callback=get_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.POST,
-        terminate_regex(CREATE_URL),
-        callback=create_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.PATCH,
-        re.compile(DETAIL_URL),
-        callback=update_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.DELETE,
-        terminate_regex(DETAIL_URL),
-        callback=delete_callback,
-        content_type="content/json",
-    )
-    # bulk calls
-    responses.add_callback(
-        responses.GET,
-        terminate_regex(BATCH_RESULT_URL),
-        callback=bulk_result_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.GET,
-        terminate_regex(BATCH_QUERY_RESULT_URL),
-        callback=bulk_query_result_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.GET,
-        terminate_regex(BATCH_DETAIL_URL),
-        callback=bulk_detail_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.POST,
-        terminate_regex(BATCH_URL),
-        callback=bulk_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.POST,
-        terminate_regex(JOB_DETAIL_URL),
-        callback=job_detail_callback,
-        content_type="content/json",
-    )
-    responses.add_callback(
-        responses.POST,
-        terminate_regex(JOB_URL),
-        callback=job_callback,
-        content_type="content/json",
-    )
-    return func(*args, **kwargs)
+from functools import partial
+from inspect import iscoroutinefunction
+from typing import TYPE_CHECKING, Callable, Union
+
+from decorator import decorate
+
+from simple_mockforce.constants import ADAPTER, RESPONSES
+
+if TYPE_CHECKING:
+    from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+
+
+def __getattr__(name: str):
+    # the global org is only created once it's used, rather than when the
+    # package is imported, e.g., by the pytest plugin, before conftest.py has
+    # had a chance to set the environment variables it's configured with
+    if name in ("VirtualSalesforce", "virtual_salesforce"):
+        from simple_mockforce import virtual
+
+        return getattr(virtual, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def mock_salesforce(
+    func: Callable = None,
+    *,
+    org: Union[str, "VirtualSalesforce", None] = None,
+    fresh: bool = False,
+    transport: str = RESPONSES,
+):
+    """
+    Patches calls to the Salesforce API, which go to a virtual org instead
+
+    By default, that's the global `virtual_salesforce`, but the org can also be
+    named, e.g., @mock_salesforce(org="scenario-a"), given as an instance, or
+    be a fresh one for each call, with @mock_salesforce(fresh=True). The org is
+    bound to the current thread or asyncio task, so that scenarios running
+    concurrently in one process each get their own. Coroutine functions are
+    mocked for as long as they run
+
+    Calls are intercepted with responses, which patches requests as a whole,
+    unless the transport is "adapter", see mock_salesforce_adapter
+    """
+    from simple_mockforce.patching import mocking
+
+    if func is None:
+        return partial(mock_salesforce, org=org, fresh=fresh, transport=transport)
+
+    if iscoroutinefunction(func):
+
+        async def caller(func, *args, **kwargs):
+            with mocking(org, fresh, transport):
+                return await func(*args, **kwargs)
+
+    else:
+
+        def caller(func, *args, **kwargs):
+            with mocking(org, fresh, transport):
+                return func(*args, **kwargs)
+
+    return decorate(func, caller)
+
+
+def mock_salesforce_adapter(
+    func: Callable = None,
+    *,
+    org: Union[str, "VirtualSalesforce", None] = None,
+    fresh: bool = False,
+):
+    """
+    Like mock_salesforce, but rather than patching requests with responses, a
+    transport adapter is mounted on the session of each Salesforce instance
+    created while mocking, which calls the virtual org directly. This takes a
+    fraction of the overhead of going through responses, and leaves calls to
+    other APIs alone
+    """
+    return mock_salesforce(func, org=org, fresh=fresh, transport=ADAPTER)
@@ -0,0 +1,62 @@
+import re
+
+from http.client import responses as reasons
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from simple_mockforce.constants import BASE_URL
+from simple_mockforce.routes import router
+
+SALESFORCE_URL = re.compile(f"{BASE_URL}/services/")
+
+
+class SalesforceAdapter(HTTPAdapter):
+    """
+    A requests transport adapter which is mounted on the sessions of Salesforce
+    instances, and calls the callbacks of the virtual org directly, rather than
+    through responses, which matches each call against every registered mock,
+    and records every one of them
+
+    Calls the router has no route for, or made while the adapter is disabled,
+    e.g., by a session which outlived the scenario it was created in, are sent
+    on like any other, and so can still be mocked with responses
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+
+    def send(self, request, **kwargs):
+        route = None
+        if self.enabled and SALESFORCE_URL.match(request.url):
+            url = urlsplit(request.url)
+            route = router.resolve(request.method, url.path)
+        if route is None:
+            return super().send(request, **kwargs)
+
+        callback, parameters = route
+        # as responses would have parsed them
+        request.params = dict(parse_qsl(url.query))
+        status, headers, body = callback(request, **parameters)
+        return self.build_mocked_response(request, status, headers, body)
+
+    def build_mocked_response(self, request, status: int, headers: dict, body):
+        response = Response()
+        response.status_code = status
+        response.reason = reasons.get(status)
+        response.headers = CaseInsensitiveDict({"Content-Type": "content/json"})
+        response.headers.update(headers)
+        response.encoding = "utf-8"
+        response._content = body.encode() if isinstance(body, str) else body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+# the one adapter mounted on every session, which is enabled while mocking
+salesforce_adapter = SalesforceAdapter()
@@ -1,53 +1,108 @@
 import json
 
+from typing import Optional
 from urllib.parse import urlparse
 
-from simple_mockforce.error_codes import NOT_FOUND
-from simple_mockforce.utils import (
-    parse_batch_detail_url,
-    parse_batch_query_result_url,
-    parse_batch_result_url,
-    parse_detail_url,
-    parse_create_url,
-    parse_job_batch_url,
-)
-from simple_mockforce.virtual import virtual_salesforce
+from simple_mockforce.constants import OAUTH_RESPONSE, SOAP_API_LOGIN_RESPONSE
+from simple_mockforce.context import current_org
+from simple_mockforce.cursors import parse_batch_size
+from simple_mockforce.error_codes import INVALID_QUERY_LOCATOR, NOT_FOUND
 
+# the callbacks are given the request, along with the parameters of the route
+# it matched, see simple_mockforce.routes
 
-def query_callback(request):
-    records = virtual_salesforce.query(request.params["q"], include_deleted=False)
 
-    body = {
-        "totalSize": len(records),
-        "done": True,
-        "records": records,
-    }
-    return 200, {}, json.dumps(body),
+def login_callback(request):
+    return (
+        200,
+        {"Content-Type": "text/xml"},
+        SOAP_API_LOGIN_RESPONSE,
+    )
+
+
+def oauth_callback(request):
+    return (
+        200,
+        {"Content-Type": "application/json"},
+        OAUTH_RESPONSE,
+    )
+
+
+def query_callback(request):
+    return _open_query(request, include_deleted=False)
 
 
 def query_all_callback(request):
-    records = virtual_salesforce.query(request.params["q"], include_deleted=True)
+    return _open_query(request, include_deleted=True)
+
+
+def query_more_callback(request, cursor: str):
+    org = current_org()
+    base_path = urlparse(request.url).path.rsplit("/", 1)[0]
+    locator, _, offset = cursor.rpartition("-")
+    if not offset.isdigit():
+        return _invalid_query_locator()
+
+    try:
+        query_cursor = org.query_locators.get(locator)
+    except KeyError:
+        return _invalid_query_locator()
+
+    return _query_page(request, query_cursor, base_path, int(offset))
+
+
+def _invalid_query_locator():
+    return (
+        400,
+        {},
+        json.dumps(
+            [
+                {
+                    "errorCode": INVALID_QUERY_LOCATOR,
+                    "message": "invalid query locator",
+                }
+            ]
+        ),
+    )
+
+
+def _open_query(request, include_deleted: bool):
+    org = current_org()
+    cursor = org.open_query_cursor(request.params["q"], include_deleted=include_deleted)
+    base_path = urlparse(request.url).path.rstrip("/")
+    return _query_page(request, cursor, base_path, 0)
+
+
+def _query_page(request, cursor, base_path: str, offset: int):
+    org = current_org()
+    batch_size = parse_batch_size(request.headers.get("Sforce-Query-Options"))
+    records, next_offset = cursor.fetch(offset, batch_size)
 
     body = {
-        "totalSize": len(records),
-        "done": True,
+        "totalSize": cursor.total_size,
+        "done": next_offset is None,
         "records": records,
     }
-    return 200, {}, json.dumps(body),
+    if next_offset is None:
+        org.query_locators.close(cursor.locator)
+    else:
+        body["nextRecordsUrl"] = f"{base_path}/{cursor.locator}-{next_offset}"
+    return (
+        200,
+        {},
+        json.dumps(body),
+    )
 
 
-def get_callback(request):
-    url = request.url
-    path = urlparse(url).path
-    sobject_name, custom_id_field, record_id = parse_detail_url(path)
+def get_callback(request, sobject: str, record_id: str, id_field: Optional[str] = None):
+    org = current_org()
+    path = urlparse(request.url).path
 
     try:
-        if not custom_id_field:
-            sobject = virtual_salesforce.get(sobject_name, record_id)
+        if not id_field:
+            record = org.get(sobject, record_id)
         else:
-            sobject = virtual_salesforce.get_by_custom_id(
-                sobject_name, record_id, custom_id_field
-            )
+            record = org.get_by_custom_id(sobject, record_id, id_field)
     except (AssertionError, KeyError):
         return (
             404,
@@ -58,18 +113,15 @@ def get_callback(request):
     return (
         200,
         {},
-        json.dumps({"attributes": {"type": sobject_name, "url": path}, **sobject}),
+        json.dumps({"attributes": {"type": sobject, "url": path}, **record}),
     )
 
 
-def create_callback(request):
-    url = request.url
-    path = urlparse(url).path
+def create_callback(request, sobject: str):
+    org = current_org()
     body = json.loads(request.body)
 
-    sobject = parse_create_url(path)
-
-    id_ = virtual_salesforce.create(sobject, body)
+    id_ = org.create(sobject, body)
 
     return (
         200,
@@ -79,16 +131,15 @@ def create_callback(request):
     )
 
 
-def update_callback(request):
-    url = request.url
-    path = urlparse(url).path
+def update_callback(
+    request, sobject: str, record_id: str, id_field: Optional[str] = None
+):
+    org = current_org()
     body = json.loads(request.body)
 
-    sobject, upsert_key, record_id = parse_detail_url(path)
-
-    if not upsert_key:
+    if not id_field:
         try:
-            virtual_salesforce.update(sobject, record_id, body, url)
+            org.update(sobject, record_id, body, request.url)
         except AssertionError:
             return (
                 404,
@@ -96,8 +147,8 @@ def update_callback(request):
                 json.dumps([{"errorCode": NOT_FOUND}]),
             )
     else:
-        salesforce_id, created = virtual_salesforce.upsert(
-            sobject, record_id, body, upsert_key=upsert_key
+        salesforce_id, created = org.upsert(
+            sobject, record_id, body, upsert_key=id_field
         )
         return (
             204,
@@ -114,14 +165,11 @@ def update_callback(request):
     )
 
 
-def delete_callback(request):
-    url = request.url
-    path = urlparse(url).path
-
-    sobject, _, record_id = parse_detail_url(path)
+def delete_callback(request, sobject: str, record_id: str):
+    org = current_org()
 
     try:
-        virtual_salesforce.delete(sobject, record_id)
+        org.delete(sobject, record_id)
     except AssertionError:
         return (
             404,
@@ -137,9 +185,10 @@ def delete_callback(request):
 
 
 def job_callback(request):
+    org = current_org()
     body = json.loads(request.body)
 
-    job = virtual_salesforce.create_job(body)
+    job = org.create_job(body)
 
     return (
         201,
@@ -148,21 +197,18 @@ def job_callback(request):
     )
 
 
-def bulk_callback(request):
-    url = request.url
-    path = urlparse(url).path
-
-    job_id = parse_job_batch_url(path)
-    job = virtual_salesforce.jobs[job_id]
+def bulk_callback(request, job_id: str):
+    org = current_org()
+    job = org.jobs[job_id]
     operation = job["operation"]
 
     if operation == "query":
         # For testing purposes we only return one results set.
-        data = {"752x00000004CJE": virtual_salesforce.query(request.body)}
+        data = {"752x00000004CJE": org.query(request.body)}
     else:
         data = json.loads(request.body)
 
-    batch = virtual_salesforce.create_batch(job_id, data, operation)
+    batch = org.create_batch(job_id, data, operation)
 
     return (
         201,
@@ -171,12 +217,7 @@ def bulk_callback(request):
     )
 
 
-def bulk_detail_callback(request):
-    url = request.url
-    path = urlparse(url).path
-
-    job_id, batch_id = parse_batch_detail_url(path)
-
+def bulk_detail_callback(request, job_id: str, batch_id: str):
     fake_response = {
         "Id": batch_id,
         "jobId": job_id,
@@ -190,57 +231,55 @@ def bulk_detail_callback(request):
     )
 
 
-def bulk_result_callback(request):
-    url = request.url
-    path = urlparse(url).path
-
-    job_id, batch_id = parse_batch_result_url(path)
+def bulk_result_callback(request, job_id: str, batch_id: str):
+    org = current_org()
 
-    job = virtual_salesforce.jobs[job_id]
+    job = org.jobs[job_id]
     sobject_name = job["object"]
     operation = job["operation"]
 
-    data = virtual_salesforce.batch_data[batch_id]
+    data = org.batch_data[batch_id]
 
     if operation == "query":
         return (
             201,
             {},
             # Keys of the query data are result set ids
-            json.dumps(list(data.keys()))
+            json.dumps(list(data.keys())),
         )
 
-
     id_to_created = dict()
 
     duplicate_ids = set()
+    seen_ids = set()
     sfdc_ids = list()
     for sobject in data:
         if operation == "upsert":
             external_field_id = job["externalIdFieldName"]
-            id_, created = virtual_salesforce.upsert(
+            id_, created = org.upsert(
                 sobject_name,
                 sobject[external_field_id],
                 sobject,
                 external_field_id,
             )
             id_to_created[id_] = created
-            if id_ in sfdc_ids:
+            if id_ in seen_ids:
                 duplicate_ids.add(id_)
+            seen_ids.add(id_)
             sfdc_ids.append(id_)
         elif operation == "update":
             # TODO: we'll have to address this if we ever normalize the casing
             id_ = sobject["Id"]
-            virtual_salesforce.update(sobject_name, id_, sobject)
+            org.update(sobject_name, id_, sobject)
             sfdc_ids.append(id_)
         elif operation == "insert":
-            id_ = virtual_salesforce.create(sobject_name, sobject)
+            id_ = org.create(sobject_name, sobject)
             id_to_created[id_] = True
             sfdc_ids.append(id_)
         elif operation == "delete":
             # TODO: we'll have to address this if we ever normalize the casing
             id_ = sobject["Id"]
-            virtual_salesforce.delete(sobject_name, id_)
+            org.delete(sobject_name, id_)
             sfdc_ids.append(id_)
         else:
             raise AssertionError(f"Invalid operation: {operation}")
@@ -280,11 +319,9 @@ def bulk_result_callback(request):
     )
 
 
-def bulk_query_result_callback(request):
-    path = urlparse(request.url).path
-
-    _, batch_id, result_set_id = parse_batch_query_result_url(path)
-    data = virtual_salesforce.batch_data[batch_id][result_set_id]
+def bulk_query_result_callback(request, job_id: str, batch_id: str, result_set_id: str):
+    org = current_org()
+    data = org.batch_data[batch_id][result_set_id]
 
     return (
         201,
@@ -293,7 +330,7 @@ def bulk_query_result_callback(request):
     )
 
 
-def job_detail_callback(request):
+def job_detail_callback(request, job_id: str):
     """
     This is a no-op as far as we're concerned
     """
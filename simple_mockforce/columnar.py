@@ -0,0 +1,519 @@
+import datetime
+
+from collections.abc import MutableMapping
+from itertools import islice
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from python_soql_parser.binops import EQ, NEQ
+from python_soql_parser.core import AND, IN, OR
+
+from simple_mockforce.field_types import (
+    BOOLEAN,
+    DATE,
+    DATETIME,
+    NUMBER,
+    OBJECT,
+    STRING,
+    kind_of,
+    to_native,
+)
+from simple_mockforce.query_algorithms.order_by import sort_by_order_by_clause
+from simple_mockforce.query_algorithms.where import (
+    _COMPARISONS,
+    WherePredicate,
+    _is_condition,
+    _parse_clause,
+)
+from simple_mockforce.soql import OrderingTerm
+
+_DTYPES = {
+    BOOLEAN: np.bool_,
+    NUMBER: np.float64,
+    DATE: "datetime64[D]",
+    DATETIME: "datetime64[us]",
+    OBJECT: object,
+}
+_FILLERS = {
+    BOOLEAN: False,
+    NUMBER: np.nan,
+    DATE: np.datetime64("NaT"),
+    DATETIME: np.datetime64("NaT"),
+    OBJECT: None,
+}
+
+
+class Column:
+    """
+    The values of one field across every record of a table
+
+    The wire values are kept in an object array, to be returned as they were
+    written, while the native values are kept in an array typed after their
+    kind, e.g., datetimes in a datetime64 array, so they can be compared in bulk.
+    A column whose native values are of mixed kinds holds them as objects
+    """
+
+    __slots__ = ("kind", "wire", "natives", "present", "nulls")
+
+    def __init__(self, capacity: int):
+        self.kind: Optional[str] = None
+        self.wire = np.full(capacity, None, dtype=object)
+        self.natives = np.full(capacity, None, dtype=object)
+        # whether or not each record has the field at all, and whether it's null
+        self.present = np.zeros(capacity, dtype=np.bool_)
+        self.nulls = np.ones(capacity, dtype=np.bool_)
+
+    def grow(self, capacity: int):
+        self.wire = _grown(self.wire, capacity, None)
+        self.natives = _grown(self.natives, capacity, _FILLERS.get(self.kind))
+        self.present = _grown(self.present, capacity, False)
+        self.nulls = _grown(self.nulls, capacity, True)
+
+    def set(self, position: int, value, native, field_type: Optional[str]):
+        self.wire[position] = value
+        self.present[position] = True
+        if native is None:
+            self.nulls[position] = True
+            self.natives[position] = _FILLERS.get(self.kind)
+            return
+
+        self.nulls[position] = False
+        kind = _kind_of(native)
+        if self.kind is None:
+            self.kind = kind
+            self.natives = np.full(len(self.wire), _FILLERS[kind], dtype=_DTYPES[kind])
+        elif kind != self.kind and self.kind != OBJECT:
+            self._hold_objects(field_type)
+        self.natives[position] = _to_column_value(native, self.kind)
+
+    def copy(self) -> "Column":
+        column = Column.__new__(Column)
+        column.kind = self.kind
+        column.wire = self.wire.copy()
+        column.natives = self.natives.copy()
+        column.present = self.present.copy()
+        column.nulls = self.nulls.copy()
+        return column
+
+    def unset(self, position: int):
+        self.wire[position] = None
+        self.present[position] = False
+        self.nulls[position] = True
+        self.natives[position] = _FILLERS.get(self.kind)
+
+    def _hold_objects(self, field_type: Optional[str]):
+        self.kind = OBJECT
+        natives = np.full(len(self.wire), None, dtype=object)
+        for position in np.flatnonzero(self.present & ~self.nulls):
+            natives[position] = to_native(self.wire[position], field_type)
+        self.natives = natives
+
+
+class ColumnarRecord(MutableMapping):
+    """
+    A stored record of a columnar table, i.e., a view over one of its rows
+
+    It behaves like the dict it was written as: reading it returns the wire
+    values, and writing to it writes through to the columns
+    """
+
+    __slots__ = ("table", "position")
+
+    def __init__(self, table: "ColumnarSObjectTable", position: int):
+        self.table = table
+        self.position = position
+
+    def __getitem__(self, field: str):
+        column = self.table.columns.get(field)
+        if column is None or not column.present[self.position]:
+            raise KeyError(field)
+        return column.wire[self.position]
+
+    def __contains__(self, field) -> bool:
+        column = self.table.columns.get(field)
+        return column is not None and bool(column.present[self.position])
+
+    def get(self, field: str, default=None):
+        column = self.table.columns.get(field)
+        if column is None or not column.present[self.position]:
+            return default
+        return column.wire[self.position]
+
+    def __setitem__(self, field: str, value):
+        self.table.set(self.position, field, value)
+
+    def __delitem__(self, field: str):
+        if field not in self:
+            raise KeyError(field)
+        self.table.columns[field].unset(self.position)
+
+    def __iter__(self) -> Iterator[str]:
+        for field, column in list(self.table.columns.items()):
+            if column.present[self.position]:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def native(self, field: str):
+        # native values are only materialized for the rows which need them, e.g.,
+        # when a where clause can't be evaluated over whole columns
+        return to_native(self.get(field), self.table.field_types.get(field))
+
+
+class ColumnarSObjectTable:
+    """
+    The records of a single sobject, stored as columns rather than rows
+
+    On top of saving the overhead of a dict per record, this allows where
+    clauses to be evaluated as vectorized masks over whole columns, and
+    order by clauses as a single argsort. Conditions which can't be vectorized,
+    e.g., on relative date tokens, fall back to evaluating records one by one
+    """
+
+    vectorized = True
+
+    def __init__(self, field_types: Optional[Dict[str, str]] = None):
+        self.field_types = field_types if field_types is not None else dict()
+        self.capacity = 0
+        self.size = 0
+        self.positions: Dict[str, int] = dict()
+        self.deleted = np.zeros(0, dtype=np.bool_)
+        self.deleted_count = 0
+        self.columns: Dict[str, Column] = dict()
+        # whether the table is shared with a snapshot, and must be forked before
+        # it's written to
+        self.frozen = False
+
+    def __len__(self):
+        return self.size - self.deleted_count
+
+    def count(self, include_deleted: bool = False) -> int:
+        return self.size if include_deleted else len(self)
+
+    def insert(self, values: dict) -> ColumnarRecord:
+        if self.size == self.capacity:
+            self._grow(max(16, self.capacity * 2))
+        position = self.size
+        self.size += 1
+        self.positions[values["Id"]] = position
+        for field, value in values.items():
+            self.set(position, field, value)
+        return ColumnarRecord(self, position)
+
+    def set(self, position: int, field: str, value):
+        column = self.columns.get(field)
+        if column is None:
+            column = self.columns[field] = Column(self.capacity)
+        field_type = self.field_types.get(field)
+        column.set(position, value, to_native(value, field_type), field_type)
+
+    def get(
+        self, record_id: str, include_deleted: bool = False
+    ) -> Optional[ColumnarRecord]:
+        position = self.positions.get(record_id)
+        if position is None or (self.deleted[position] and not include_deleted):
+            return None
+        return ColumnarRecord(self, position)
+
+    def bury(self, record: ColumnarRecord):
+        self.deleted[record.position] = True
+        self.deleted_count += 1
+
+    def unbury(self, record: ColumnarRecord):
+        self.deleted[record.position] = False
+        self.deleted_count -= 1
+
+    def remove(self, record: ColumnarRecord):
+        """
+        Removes a live record altogether, as if it had never been inserted, which
+        is only possible for the last one, since rows can't be moved around
+        """
+        position = record.position
+        assert (
+            position == self.size - 1
+        ), "Records can only be removed in the reverse order they were inserted"
+        del self.positions[record["Id"]]
+        for column in self.columns.values():
+            column.unset(position)
+        self.size -= 1
+
+    def records(self, include_deleted: bool = False) -> Iterator[ColumnarRecord]:
+        """
+        Iterates over the records; like the default engine, deleted records come last
+        """
+        return self._records(self._positions(include_deleted))
+
+    def retype(self, field: str):
+        column = self.columns.get(field)
+        if column is None:
+            return
+        field_type = self.field_types.get(field)
+        retyped = Column(self.capacity)
+        for position in np.flatnonzero(column.present[: self.size]):
+            value = column.wire[position]
+            retyped.set(position, value, to_native(value, field_type), field_type)
+        self.columns[field] = retyped
+
+    def use_field_types(self, field_types: Dict[str, str]):
+        self.field_types = field_types
+
+    def fork(self) -> "ColumnarSObjectTable":
+        """
+        Returns a writable copy of the table; unlike rows, columns can't be
+        shared one record at a time, so they're copied as a whole
+        """
+        table = ColumnarSObjectTable(self.field_types)
+        table.capacity = self.capacity
+        table.size = self.size
+        table.positions = dict(self.positions)
+        table.deleted = self.deleted.copy()
+        table.deleted_count = self.deleted_count
+        table.columns = {field: column.copy() for field, column in self.columns.items()}
+        return table
+
+    def writable(self, record: ColumnarRecord) -> ColumnarRecord:
+        """
+        Returns a view over the record's row in this table, which may be a
+        fork of the one the record was read from
+        """
+        return ColumnarRecord(self, record.position)
+
+    def select(
+        self,
+        where_predicate: WherePredicate,
+        order_by: Optional[Sequence[OrderingTerm]] = None,
+        include_deleted: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Iterator[ColumnarRecord]:
+        """
+        Returns the records passing the where clause, sorted by the order by
+        clause, if any, skipping the first `offset` of them, up to the `limit`th;
+        sorting stops at the first `limit` records
+        """
+        mask, exact = self._where_mask(where_predicate.where)
+        positions = self._positions(include_deleted, mask)
+        if not exact:
+            positions = np.array(
+                [
+                    position
+                    for position in positions
+                    if where_predicate(ColumnarRecord(self, position))
+                ],
+                dtype=np.intp,
+            )
+
+        if order_by:
+            order = self._argsort(positions, order_by)
+            if order is None:
+                # the values can't be ordered in bulk, e.g., mixed kinds of values
+                records = sort_by_order_by_clause(
+                    self._records(positions), order_by, limit=limit
+                )
+                return islice(records, offset, limit)
+            positions = positions[order]
+        return self._records(positions[offset:limit])
+
+    def _records(self, positions: Sequence[int]) -> Iterator[ColumnarRecord]:
+        return (ColumnarRecord(self, int(position)) for position in positions)
+
+    def _positions(self, include_deleted: bool, mask: np.ndarray = None) -> np.ndarray:
+        deleted = self.deleted[: self.size]
+        if mask is None:
+            mask = np.ones(self.size, dtype=np.bool_)
+        positions = np.flatnonzero(mask & ~deleted)
+        if include_deleted:
+            positions = np.concatenate([positions, np.flatnonzero(mask & deleted)])
+        return positions
+
+    def _grow(self, capacity: int):
+        self.capacity = capacity
+        self.deleted = _grown(self.deleted, capacity, False)
+        for column in self.columns.values():
+            column.grow(capacity)
+
+    # where clauses
+
+    def _where_mask(self, where: tuple) -> Tuple[np.ndarray, bool]:
+        """
+        Returns a mask of the records which may pass the where clause, and
+        whether or not it's exact, i.e., every condition could be vectorized
+        """
+        mask = np.ones(self.size, dtype=np.bool_)
+        exact = True
+        for expression in where:
+            expression_mask = self._expression_mask(expression)
+            if expression_mask is None:
+                exact = False
+            else:
+                mask &= expression_mask
+        return mask, exact
+
+    def _expression_mask(self, expression: tuple) -> Optional[np.ndarray]:
+        """
+        Returns None if the expression can't be vectorized
+        """
+        if _is_condition(expression):
+            return self._condition_mask(*_parse_clause(expression))
+
+        mask = self._expression_mask(expression[0])
+        for idx in range(1, len(expression), 2):
+            other = self._expression_mask(expression[idx + 1])
+            if mask is None or other is None:
+                return None
+            if expression[idx] == AND:
+                mask = mask & other
+            elif expression[idx] == OR:
+                mask = mask | other
+            else:
+                return None
+        return mask
+
+    def _condition_mask(self, field: str, binop: str, value) -> Optional[np.ndarray]:
+        size = self.size
+        if field == "Id" and binop in (EQ, IN):
+            # the Id doubles as the primary key
+            values = value if binop == IN else [value]
+            mask = np.zeros(size, dtype=np.bool_)
+            for literal in values:
+                position = self.positions.get(literal)
+                if position is not None:
+                    mask[position] = True
+            return mask
+
+        column = self.columns.get(field)
+        if column is None:
+            # no record has the field, and records without it never pass
+            return np.zeros(size, dtype=np.bool_)
+        present = column.present[:size]
+        nulls = column.nulls[:size]
+        natives = column.natives[:size]
+
+        if binop == IN:
+            mask = np.zeros(size, dtype=np.bool_)
+            for literal in value:
+                if literal is None:
+                    mask |= nulls
+                    continue
+                if column.kind is None:
+                    continue
+                literal = _to_column_literal(literal, column.kind)
+                if literal is None:
+                    return None
+                mask |= ~nulls & (natives == literal)
+            return present & mask
+
+        compare = _COMPARISONS.get(binop)
+        if compare is None:
+            return None
+
+        if value is None or column.kind is None:
+            # comparing with nulls only holds for (in)equality
+            if binop == EQ:
+                return present & nulls if value is None else np.zeros(size, np.bool_)
+            if binop == NEQ:
+                return present & ~nulls if value is None else present.copy()
+            return np.zeros(size, dtype=np.bool_)
+
+        literal = _to_column_literal(value, column.kind)
+        if literal is None:
+            return None
+
+        values = ~nulls
+        if column.kind == OBJECT:
+            # nulls can't be compared with objects in bulk, so they're left out
+            positions = np.flatnonzero(present & values)
+            try:
+                compared = np.zeros(size, dtype=np.bool_)
+                compared[positions] = np.asarray(
+                    compare(natives[positions], literal), dtype=np.bool_
+                )
+            except TypeError:
+                return None
+        else:
+            compared = compare(natives, literal)
+
+        if binop == NEQ:
+            return present & (nulls | compared)
+        return present & values & compared
+
+    # order by clauses
+
+    def _argsort(
+        self, positions: np.ndarray, order_by: Sequence[OrderingTerm]
+    ) -> Optional[np.ndarray]:
+        """
+        Returns the order of the positions according to the order by clause, or
+        None if its values can't be ordered in bulk
+        """
+        keys = list()
+        for term in order_by:
+            key = self._sort_key(positions, term)
+            if key is None:
+                return None
+            keys.append(key)
+        # lexsort is stable, and sorts by its last key first
+        return np.lexsort(keys[::-1])
+
+    def _sort_key(
+        self, positions: np.ndarray, term: OrderingTerm
+    ) -> Optional[np.ndarray]:
+        column = self.columns.get(term.field)
+        if column is None or column.kind is None:
+            return np.zeros(len(positions), dtype=np.int64)
+
+        nulls = column.nulls[positions] | ~column.present[positions]
+        values = column.natives[positions][~nulls]
+        try:
+            _, ranks = np.unique(values, return_inverse=True)
+        except TypeError:
+            return None
+
+        count = len(values)
+        if term.descending:
+            ranks = count - 1 - ranks
+        key = np.full(len(positions), -1 if term.nulls_first else count, np.int64)
+        key[~nulls] = ranks.reshape(-1)
+        return key
+
+
+def _grown(array: np.ndarray, capacity: int, filler) -> np.ndarray:
+    grown = np.full(capacity, filler, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _kind_of(native) -> str:
+    kind = kind_of(native)
+    # strings are held as objects, like anything else numpy can't compare in bulk
+    return OBJECT if kind == STRING else kind
+
+
+def _to_column_value(native, kind: str):
+    if kind == NUMBER:
+        return float(native)
+    if kind == DATETIME:
+        utc = native.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return np.datetime64(utc, "us")
+    if kind == DATE:
+        return np.datetime64(native, "D")
+    return native
+
+
+def _to_column_literal(literal, kind: str):
+    """
+    Converts a literal to a column's kind, or returns None if it's of another
+    kind, in which case comparing it in bulk isn't guaranteed to behave the
+    same as comparing the native values one by one
+    """
+    literal_kind = _kind_of(literal)
+    if kind == OBJECT:
+        return literal
+    if literal_kind != kind:
+        return None
+    return _to_column_value(literal, kind)
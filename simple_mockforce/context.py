@@ -0,0 +1,66 @@
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator
+
+from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+
+# the org the mocked calls of the current thread or asyncio task go to, which
+# is the global one unless another was bound, e.g., by @mock_salesforce(fresh=True)
+_current_org: ContextVar[VirtualSalesforce] = ContextVar(
+    "current_org", default=virtual_salesforce
+)
+
+# name -> org, for orgs which outlive the scenarios using them
+_named_orgs: Dict[str, VirtualSalesforce] = dict()
+_named_orgs_lock = threading.Lock()
+
+
+def current_org() -> VirtualSalesforce:
+    """
+    Returns the virtual org bound to the current context, i.e., thread or asyncio task
+    """
+    return _current_org.get()
+
+
+@contextmanager
+def use_org(org: VirtualSalesforce) -> Iterator[VirtualSalesforce]:
+    """
+    Binds the org to the current context for the duration of a with block
+
+    New threads start from an empty context, and so from the global org, unless
+    they're started with e.g. contextvars.copy_context().run; asyncio tasks,
+    and asyncio.to_thread, inherit the context they're created from
+    """
+    token = _current_org.set(org)
+    try:
+        yield org
+    finally:
+        _current_org.reset(token)
+
+
+def new_org() -> VirtualSalesforce:
+    """
+    Returns an org of its own, which uses the same storage engine as the global
+    org and starts from its baseline, if it has one
+    """
+    org = VirtualSalesforce(storage_engine=virtual_salesforce.storage_engine)
+    org.baseline = virtual_salesforce.baseline
+    return org
+
+
+def named_org(name: str) -> VirtualSalesforce:
+    """
+    Returns the org of the given name, which is created the first time it's asked for
+    """
+    with _named_orgs_lock:
+        org = _named_orgs.get(name)
+        if org is None:
+            org = _named_orgs[name] = new_org()
+        return org
+
+
+def drop_named_org(name: str):
+    with _named_orgs_lock:
+        _named_orgs.pop(name, None)
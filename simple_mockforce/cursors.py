@@ -0,0 +1,133 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+# Salesforce keeps query locators around for 15 minutes of inactivity
+DEFAULT_QUERY_LOCATOR_TTL = 15 * 60
+DEFAULT_MAX_OPEN_QUERY_LOCATORS = 50
+
+DEFAULT_BATCH_SIZE = 2000
+MAX_BATCH_SIZE = 2000
+
+
+class QueryCursor:
+    """
+    The server-side state behind a query locator: the records matching the
+    query, and the function which turns a batch of stored records into query results
+    """
+
+    __slots__ = ("locator", "sobjects", "project", "expires_at", "total_size")
+
+    def __init__(
+        self,
+        locator: str,
+        sobjects: List[dict],
+        project: Callable[[List[dict]], List[dict]],
+        expires_at: float,
+        total_size: Optional[int] = None,
+    ):
+        self.locator = locator
+        self.sobjects = sobjects
+        self.project = project
+        self.expires_at = expires_at
+        # COUNT() queries have a size, but no records
+        self.total_size = len(sobjects) if total_size is None else total_size
+
+    def fetch(self, offset: int, batch_size: int) -> Tuple[List[dict], Optional[int]]:
+        """
+        Returns a page of results, along with the offset of the next page,
+        which is None once the cursor is exhausted
+        """
+        end = offset + batch_size
+        records = self.project(self.sobjects[offset:end])
+        next_offset = end if end < len(self.sobjects) else None
+        return records, next_offset
+
+
+class QueryLocators:
+    """
+    The open query cursors of a virtual Salesforce instance, keyed by locator
+
+    Cursors which aren't paged through to the end are evicted once they've
+    been idle for longer than the TTL, or when too many are open at once
+    """
+
+    def __init__(
+        self,
+        id_factory: Callable[[], str],
+        ttl: float = DEFAULT_QUERY_LOCATOR_TTL,
+        max_open: int = DEFAULT_MAX_OPEN_QUERY_LOCATORS,
+    ):
+        self._id_factory = id_factory
+        self.ttl = ttl
+        self.max_open = max_open
+        self.cursors: "OrderedDict[str, QueryCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cursors)
+
+    def open(
+        self,
+        sobjects: List[dict],
+        project: Callable[[List[dict]], List[dict]],
+        total_size: Optional[int] = None,
+    ) -> QueryCursor:
+        # query locators start with the key prefix of the QueryLocator object
+        locator = f"01g{self._id_factory()[:15]}"
+        cursor = QueryCursor(
+            locator, sobjects, project, time.monotonic() + self.ttl, total_size
+        )
+        with self._lock:
+            self._evict()
+            self.cursors[locator] = cursor
+            while len(self.cursors) > self.max_open:
+                self.cursors.popitem(last=False)
+        return cursor
+
+    def get(self, locator: str) -> QueryCursor:
+        """
+        Raises a KeyError if the locator is unknown or has expired
+        """
+        with self._lock:
+            self._evict()
+            cursor = self.cursors[locator]
+            cursor.expires_at = time.monotonic() + self.ttl
+            self.cursors.move_to_end(locator)
+            return cursor
+
+    def close(self, locator: str):
+        with self._lock:
+            self.cursors.pop(locator, None)
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [
+            locator
+            for locator, cursor in self.cursors.items()
+            if cursor.expires_at <= now
+        ]
+        for locator in expired:
+            del self.cursors[locator]
+
+
+def parse_batch_size(query_options: Optional[str]) -> int:
+    """
+    Reads the batch size out of a Sforce-Query-Options header, e.g., batchSize=500
+
+    Unlike Salesforce, batch sizes under 200 are honored, which makes it
+    cheap to exercise paging in tests
+    """
+    if not query_options:
+        return DEFAULT_BATCH_SIZE
+    for option in query_options.split(","):
+        name, _, value = option.strip().partition("=")
+        if name.strip() == "batchSize":
+            return max(1, min(int(value), MAX_BATCH_SIZE))
+    return DEFAULT_BATCH_SIZE
@@ -1 +1,2 @@
 NOT_FOUND = "NOT_FOUND"
+INVALID_QUERY_LOCATOR = "INVALID_QUERY_LOCATOR"
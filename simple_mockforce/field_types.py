@@ -0,0 +1,128 @@
+import datetime
+import re
+
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from dateutil.parser import isoparse
+
+# the field types values are coerced to; anything else is stored as is
+STRING = "string"
+DATE = "date"
+DATETIME = "datetime"
+DECIMAL = "decimal"
+FIELD_TYPES = (STRING, DATE, DATETIME, DECIMAL)
+
+# the kinds of native values, by which the storage engines hold them in bulk,
+# besides the strings, dates and datetimes above
+BOOLEAN = "boolean"
+NUMBER = "number"
+OBJECT = "object"
+
+# integers beyond this can't be held by a float without losing precision
+MAX_EXACT_INTEGER = 2**53
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}$")
+DATETIME_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$"
+)
+
+
+def infer_field_type(value) -> Optional[str]:
+    """
+    Infers the type of a field from one of its values in their wire form,
+    e.g., 2022-06-03T20:42:04.000+0000 is a datetime and 10.5 is a decimal
+    """
+    if isinstance(value, float):
+        return DECIMAL
+    if isinstance(value, str):
+        if DATE_PATTERN.match(value):
+            return DATE
+        if DATETIME_PATTERN.match(value):
+            return DATETIME
+    return None
+
+
+def to_native(value, field_type: Optional[str] = None):
+    """
+    Coerces a value from its wire form to a native date, timezone aware datetime
+    or Decimal, according to the given field type, or the inferred one
+
+    Values which can't be coerced, including nulls, are returned as is
+    """
+    if value is None or field_type == STRING:
+        return value
+    if field_type is None:
+        field_type = infer_field_type(value)
+    try:
+        if field_type == DATE:
+            if isinstance(value, datetime.date):
+                return value
+            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        if field_type == DATETIME:
+            if isinstance(value, datetime.datetime):
+                native = value
+            else:
+                native = _parse_datetime(value)
+            # like Salesforce, datetimes without an offset are assumed to be in UTC
+            if native.tzinfo is None:
+                native = native.replace(tzinfo=datetime.timezone.utc)
+            return native
+        if field_type == DECIMAL and not isinstance(value, bool):
+            # going through str keeps e.g. 0.1 from becoming 0.1000000000000000055...
+            return Decimal(str(value))
+    except (ValueError, TypeError, OverflowError, InvalidOperation):
+        pass
+    return value
+
+
+def _parse_datetime(value: str) -> datetime.datetime:
+    try:
+        # much faster, but only handles every ISO 8601 form from Python 3.11 on
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return isoparse(value)
+
+
+def native_value(sobject: dict, field: str):
+    """
+    The value a field is compared and sorted by in a query
+
+    Stored records know their native values already; values of any other
+    dict are coerced on the fly
+    """
+    native = getattr(sobject, "native", None)
+    if native is not None:
+        return native(field)
+    return to_native(sobject.get(field))
+
+
+def kind_of(native) -> str:
+    """
+    The kind of a native value, which values of the same kind can be compared
+    with, however they're held
+    """
+    if isinstance(native, bool):
+        return BOOLEAN
+    if isinstance(native, datetime.datetime):
+        # naive datetimes can't be compared with the aware ones literals are parsed as
+        return DATETIME if native.tzinfo is not None else OBJECT
+    if isinstance(native, datetime.date):
+        return DATE
+    if isinstance(native, (int, float, Decimal)) and fits_a_float(native):
+        return NUMBER
+    if isinstance(native, str):
+        return STRING
+    return OBJECT
+
+
+def fits_a_float(number) -> bool:
+    """
+    Whether or not a number survives being held by a float, which keeps
+    comparing it in bulk exactly the same as comparing the number itself
+    """
+    if isinstance(number, int):
+        return abs(number) <= MAX_EXACT_INTEGER
+    if isinstance(number, float):
+        return number == number and abs(number) != float("inf")
+    return number.is_finite() and Decimal(repr(float(number))) == number
@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+import pickle
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from simple_mockforce.snapshots import Snapshot
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+CSV_SUFFIXES = (".csv",)
+
+# bumped whenever the way records are stored changes, which invalidates every cache
+FIXTURE_CACHE_VERSION = 1
+# how long to wait for another process to load the fixtures, in seconds, before
+# loading them regardless
+FIXTURE_CACHE_LOCK_TIMEOUT = 300
+FIXTURE_CACHE_LOCK_POLL_INTERVAL = 0.05
+
+FixturePath = Union[str, Path]
+
+
+def read_fixture(path: FixturePath) -> Iterator[dict]:
+    """
+    Streams the records of a fixture file, one at a time, picking the format
+    from the file's extension: NDJSON (.ndjson or .jsonl) or CSV (.csv)
+
+    NDJSON records are written just like they would be through the API, e.g.,
+    {"Name": "Google", "Parent__r": {"External_ID__c": "1"}}, whereas CSV files
+    follow the Data Loader: the header holds the field names, relations pushed
+    via an external key are written as e.g. Parent__r.External_ID__c, empty
+    values are nulls, and true and false are booleans
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in NDJSON_SUFFIXES:
+        return _read_ndjson(path)
+    if suffix in CSV_SUFFIXES:
+        return _read_csv(path)
+    raise AssertionError(f"{path} is neither an NDJSON nor a CSV file")
+
+
+def _read_ndjson(path: Path) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_csv(path: Path) -> Iterator[dict]:
+    # utf-8-sig skips the byte order mark spreadsheet software likes to add
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [_split_column(column) for column in header]
+
+        for row in reader:
+            sobject = dict()
+            for (field, external_id_field), value in zip(columns, row):
+                value = _from_csv(value)
+                if external_id_field is None:
+                    sobject[field] = value
+                elif value is not None:
+                    sobject[field] = {external_id_field: value}
+            yield sobject
+
+
+def _split_column(column: str) -> Tuple[str, Optional[str]]:
+    """
+    Splits e.g. Parent__r.External_ID__c into the relation and the external id field
+    """
+    field, _, external_id_field = column.strip().partition(".")
+    return field, external_id_field or None
+
+
+def _from_csv(value: str):
+    if value == "":
+        return None
+    lowered = value.lower()
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    return value
+
+
+def fixture_cache_key(
+    fixtures: Dict[str, FixturePath],
+    storage_engine: str,
+    field_types: Dict[str, Dict[str, str]],
+    relations_file: dict,
+) -> tuple:
+    """
+    Everything the loaded records depend on, i.e., the fixtures, down to their
+    modification times, and how their values are stored and related
+    """
+    files = list()
+    for sobject_name, path in fixtures.items():
+        stat = os.stat(path)
+        files.append(
+            (sobject_name, str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        )
+    return (
+        FIXTURE_CACHE_VERSION,
+        storage_engine,
+        tuple(files),
+        # sobjects without any declared type don't matter
+        json.dumps(
+            {name: types for name, types in field_types.items() if types},
+            sort_keys=True,
+        ),
+        json.dumps(relations_file, sort_keys=True),
+    )
+
+
+def read_fixture_cache(cache_path: FixturePath, key: tuple) -> Optional[Snapshot]:
+    """
+    Returns the cached snapshot, or None if there's none, or it's stale
+    """
+    try:
+        with open(cache_path, "rb") as file:
+            # the key comes first, so that a stale snapshot is never unpickled
+            if pickle.load(file) != key:
+                return None
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def write_fixture_cache(cache_path: FixturePath, key: tuple, snapshot: Snapshot):
+    # written next to the cache first, so that it's replaced in one go and
+    # concurrent test runs never read half of it
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(key, file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, cache_path)
+
+
+@contextmanager
+def fixture_cache_lock(
+    cache_path: FixturePath, timeout: float = FIXTURE_CACHE_LOCK_TIMEOUT
+) -> Iterator[bool]:
+    """
+    Holds a lock file next to the cache, so that only one process at a time,
+    e.g., one pytest-xdist worker, loads the fixtures and writes the cache,
+    while the others wait to read it instead. Yields whether the lock was
+    acquired: it's given up on once the timeout elapses, and a lock left behind
+    by a process which is gone is broken
+    """
+    lock_path = f"{cache_path}.lock"
+    deadline = time.monotonic() + timeout
+    acquired = False
+    while True:
+        try:
+            descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if _is_stale(lock_path):
+                _remove(lock_path)
+                continue
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(FIXTURE_CACHE_LOCK_POLL_INTERVAL)
+        else:
+            with os.fdopen(descriptor, "w") as file:
+                file.write(str(os.getpid()))
+            acquired = True
+            break
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _remove(lock_path)
+
+
+def _is_stale(lock_path: str) -> bool:
+    """
+    Whether the process holding the lock is gone, which can only be told on
+    POSIX, where signal 0 checks a process exists without signalling it
+    """
+    if os.name != "posix":
+        return False
+    try:
+        with open(lock_path) as file:
+            pid = int(file.read())
+    except (OSError, ValueError):
+        # gone already, or still being written
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,306 @@
+import copy
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, MutableMapping, Optional, Set, Tuple
+
+from python_soql_parser.binops import GT, GTE, LT, LTE
+
+from simple_mockforce.field_types import native_value
+from simple_mockforce.overlays import layered
+
+
+class FieldIndex:
+    """
+    A hash index over one field of one sobject, i.e., value -> {Id: record}
+
+    Records are keyed by their native values, e.g., dates rather than date
+    strings, since that's what where clauses compare them by
+
+    Only records which haven't been deleted are indexed. Buckets are dicts
+    rather than lists so that removing a record is O(1) while still preserving
+    insertion order, which keeps lookups returning the first matching record
+    """
+
+    # whether or not the index can serve range conditions
+    orderable = False
+
+    def __init__(self, field: str):
+        self.field = field
+        self.buckets: MutableMapping[object, Dict[str, dict]] = dict()
+        # whether the index is shared with a snapshot, and must be forked before
+        # it's written to
+        self.frozen = False
+        # the keys of the buckets which can be written to in place, or None if
+        # they all can, i.e., the index doesn't share any with a snapshot
+        self.owned: Optional[Set[object]] = None
+
+    def fork(self) -> "FieldIndex":
+        """
+        Returns a writable copy of the index, layered over this one's buckets,
+        each of which is shared until it's written to
+        """
+        index = copy.copy(self)
+        index.frozen = False
+        index.buckets = layered(self.buckets)
+        index.owned = set()
+        return index
+
+    def add(self, record: dict):
+        try:
+            bucket = self._writable_bucket(native_value(record, self.field))
+        except TypeError:
+            # unhashable values, e.g., compound fields such as BillingAddress,
+            # can never be matched by an external id lookup anyways
+            return
+        bucket[record["Id"]] = record
+
+    def remove(self, record: dict):
+        key = native_value(record, self.field)
+        try:
+            if key not in self.buckets:
+                return
+        except TypeError:
+            return
+        bucket = self._writable_bucket(key)
+        bucket.pop(record["Id"], None)
+        if not bucket:
+            del self.buckets[key]
+
+    def lookup(self, value) -> List[dict]:
+        try:
+            bucket = self.buckets.get(value)
+        except TypeError:
+            return []
+        return list(bucket.values()) if bucket else []
+
+    def first(self, value) -> Optional[dict]:
+        try:
+            bucket = self.buckets.get(value)
+        except TypeError:
+            return None
+        if not bucket:
+            return None
+        return next(iter(bucket.values()))
+
+    def _writable_bucket(self, key) -> Dict[str, dict]:
+        """
+        Returns the bucket of the key, ready to be written to in place: if it's
+        shared with a snapshot, it's replaced with a copy of its own first
+        """
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = dict()
+        elif self.owned is not None and key not in self.owned:
+            bucket = self.buckets[key] = dict(bucket)
+        else:
+            return bucket
+        if self.owned is not None:
+            self.owned.add(key)
+        return bucket
+
+
+class OrderedFieldIndex(FieldIndex):
+    """
+    A hash index which also keeps the field's values sorted, so it can
+    serve range conditions (<, <=, >, >=) on top of equality lookups
+
+    The sorted keys are the same native values the hash buckets are keyed by,
+    besides nulls. If the field holds values which can't be ordered against one
+    another, the index gives up on ordering and is no longer usable for ranges
+
+    Forks share the sorted keys too, until a record with a new key is added or
+    the last one with a key is removed, which copies them
+    """
+
+    def __init__(self, field: str):
+        super().__init__(field)
+        self.orderable = True
+        self.keys: list = list()
+        # whether the sorted keys are shared with a snapshot
+        self.shares_keys = False
+
+    def add(self, record: dict):
+        key = self._key(record)
+        new = key is not None and key not in self.buckets
+        super().add(record)
+        if not self.orderable or not new:
+            return
+        try:
+            insort(self._writable_keys(), key)
+        except TypeError:
+            self._give_up_ordering()
+
+    def fork(self) -> "OrderedFieldIndex":
+        index = super().fork()
+        index.shares_keys = True
+        return index
+
+    def remove(self, record: dict):
+        key = self._key(record)
+        indexed = key is not None and key in self.buckets
+        super().remove(record)
+        if not self.orderable or not indexed or key in self.buckets:
+            return
+        keys = self._writable_keys()
+        del keys[bisect_left(keys, key)]
+
+    def range(self, binop: str, value) -> List[object]:
+        """
+        Returns the sorted keys satisfying `key <binop> value`
+        """
+        if binop == GT:
+            return self.keys[bisect_right(self.keys, value) :]
+        elif binop == GTE:
+            return self.keys[bisect_left(self.keys, value) :]
+        elif binop == LT:
+            return self.keys[: bisect_left(self.keys, value)]
+        elif binop == LTE:
+            return self.keys[: bisect_right(self.keys, value)]
+        raise AssertionError(f"{binop} is not a range operator")
+
+    def _key(self, record: dict):
+        try:
+            key = native_value(record, self.field)
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _writable_keys(self) -> list:
+        if self.shares_keys:
+            self.keys = list(self.keys)
+            self.shares_keys = False
+        return self.keys
+
+    def _give_up_ordering(self):
+        self.orderable = False
+        self.keys = list()
+        self.shares_keys = False
+
+
+class IndexRegistry:
+    """
+    Keeps track of the secondary indexes of a virtual Salesforce instance
+
+    Indexes are either declared ahead of time or built lazily the first time
+    a (sobject, field) pair is looked up. The owner is responsible for calling
+    `add` and `remove` whenever a record is written, so that every index stays in sync
+
+    Storage engines which index records themselves, e.g., in a database, provide
+    their own indexes through the index factory, which returns None otherwise
+    """
+
+    def __init__(
+        self,
+        records_provider: Callable[[str], Iterable[dict]],
+        index_factory: Callable[[str, str, bool], Optional[FieldIndex]] = None,
+    ):
+        self._records_provider = records_provider
+        self._index_factory = index_factory
+        # (sobject, field) -> whether or not the index is ordered
+        self.declared: Dict[Tuple[str, str], bool] = dict()
+        self.indexes: Dict[str, Dict[str, FieldIndex]] = defaultdict(dict)
+
+    def declare(
+        self, sobject_name: str, field: str, ordered: bool = False
+    ) -> FieldIndex:
+        self.declared[(sobject_name, field)] = ordered
+        index = self.indexes[sobject_name].get(field)
+        if ordered and not isinstance(index, OrderedFieldIndex):
+            # replace a lazily built hash index with an ordered one
+            self.indexes[sobject_name].pop(field, None)
+        return self.get_index(sobject_name, field)
+
+    def drop(self, sobject_name: str, field: str):
+        self.declared.pop((sobject_name, field), None)
+        self.indexes.get(sobject_name, {}).pop(field, None)
+
+    def get_index(self, sobject_name: str, field: str) -> FieldIndex:
+        index = self.indexes[sobject_name].get(field)
+        if index is None:
+            ordered = self.declared.get((sobject_name, field), False)
+            index = self._engine_index(sobject_name, field, ordered)
+            if index is None:
+                index = OrderedFieldIndex(field) if ordered else FieldIndex(field)
+                for record in self._records_provider(sobject_name):
+                    index.add(record)
+            self.indexes[sobject_name][field] = index
+        return index
+
+    def find_index(self, sobject_name: str, field: str) -> Optional[FieldIndex]:
+        """
+        Returns the index if it has already been built, without building it,
+        unless it's declared, e.g., after restoring a snapshot taken before it was
+        """
+        index = self.indexes.get(sobject_name, {}).get(field)
+        if index is None and (sobject_name, field) in self.declared:
+            return self.get_index(sobject_name, field)
+        return index
+
+    def has_index(self, sobject_name: str, field: str) -> bool:
+        return field in self.indexes.get(sobject_name, {})
+
+    def reindex(self, sobject_name: str, field: str):
+        """
+        Rebuilds the index of a field, if any, e.g., after its values were coerced again
+        """
+        if self.indexes.get(sobject_name, {}).pop(field, None) is not None:
+            self.get_index(sobject_name, field)
+
+    def lookup(self, sobject_name: str, field: str, value) -> Optional[dict]:
+        return self.get_index(sobject_name, field).first(value)
+
+    def add(self, sobject_name: str, record: dict):
+        for index in self._writable_indexes(sobject_name):
+            index.add(record)
+
+    def remove(self, sobject_name: str, record: dict):
+        for index in self._writable_indexes(sobject_name):
+            index.remove(record)
+
+    def snapshot(self) -> Dict[str, Dict[str, FieldIndex]]:
+        """
+        Marks every index as shared, so that it's forked before it's written to
+        again, and returns them
+        """
+        indexes = dict()
+        for sobject_name, fields in self.indexes.items():
+            for index in fields.values():
+                index.frozen = True
+            indexes[sobject_name] = dict(fields)
+        return indexes
+
+    def restore(self, indexes: Dict[str, Dict[str, FieldIndex]]):
+        """
+        Shares the indexes of a snapshot; declared indexes the snapshot doesn't
+        have are built the next time they're used
+        """
+        self.indexes = defaultdict(dict)
+        for sobject_name, fields in indexes.items():
+            self.indexes[sobject_name] = dict(fields)
+
+    def _writable_indexes(self, sobject_name: str) -> Iterable[FieldIndex]:
+        indexes = self.indexes.get(sobject_name, {})
+        for field, index in indexes.items():
+            if index.frozen:
+                indexes[field] = index.fork()
+        return indexes.values()
+
+    def clear(self):
+        """
+        Drops every lazily built index, and empties the declared ones
+        """
+        self.indexes = defaultdict(dict)
+        for (sobject_name, field), ordered in self.declared.items():
+            index = self._engine_index(sobject_name, field, ordered)
+            if index is None:
+                index = OrderedFieldIndex(field) if ordered else FieldIndex(field)
+            self.indexes[sobject_name][field] = index
+
+    def _engine_index(
+        self, sobject_name: str, field: str, ordered: bool
+    ) -> Optional[FieldIndex]:
+        if self._index_factory is None:
+            return None
+        return self._index_factory(sobject_name, field, ordered)
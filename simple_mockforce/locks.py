@@ -0,0 +1,185 @@
+import threading
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ReadWriteLock:
+    """
+    A reentrant reader/writer lock: any number of threads can hold it for
+    reading at once, while a thread holding it for writing holds it alone
+
+    A thread may take the lock again while it holds it, and upgrade a read to a
+    write, once it's the only reader left; two readers upgrading at once would
+    deadlock, so the second one raises a RuntimeError instead. New readers yield
+    to waiting writers, so that writers aren't starved
+    """
+
+    def __init__(self, holds_family: Optional[Callable[[int], bool]] = None):
+        # the condition is only entered to wait, so that taking a lock nobody
+        # contends for only takes the mutex
+        self._mutex = threading.Lock()
+        self._condition = threading.Condition(self._mutex)
+        self._waiting = 0
+        # thread id -> how many times it holds the lock for reading
+        self._readers: Dict[int, int] = dict()
+        self._writer: Optional[int] = None
+        self._writes = 0
+        self._waiting_writers = 0
+        self._upgrading: Optional[int] = None
+        # whether a thread holds any lock of the same family, e.g., of an org
+        self._holds_family = holds_family or self.holds
+
+    def acquire_read(self):
+        thread = threading.get_ident()
+        with self._mutex:
+            if self._writer != thread and thread not in self._readers:
+                while self._writer is not None or (
+                    self._waiting_writers and not self._holds_family(thread)
+                ):
+                    self._wait()
+            self._readers[thread] = self._readers.get(thread, 0) + 1
+
+    def release_read(self):
+        thread = threading.get_ident()
+        with self._mutex:
+            count = self._readers[thread] - 1
+            if count:
+                self._readers[thread] = count
+            else:
+                del self._readers[thread]
+                self._notify()
+
+    def acquire_write(self):
+        thread = threading.get_ident()
+        with self._mutex:
+            if self._writer != thread:
+                upgrading = thread in self._readers
+                if upgrading:
+                    if self._upgrading is not None:
+                        raise RuntimeError(
+                            "Two readers can't upgrade the same lock at once"
+                        )
+                    self._upgrading = thread
+                self._waiting_writers += 1
+                try:
+                    # an upgrading reader waits for every other reader to leave
+                    while self._writer is not None or len(self._readers) > upgrading:
+                        self._wait()
+                finally:
+                    self._waiting_writers -= 1
+                    if upgrading:
+                        self._upgrading = None
+                self._writer = thread
+            self._writes += 1
+
+    def release_write(self):
+        with self._mutex:
+            self._writes -= 1
+            if not self._writes:
+                self._writer = None
+                self._notify()
+
+    def holds(self, thread: int) -> bool:
+        # only the thread itself changes the answer, so it needs no mutex
+        return thread in self._readers or self._writer == thread
+
+    def _wait(self):
+        self._waiting += 1
+        try:
+            self._condition.wait()
+        finally:
+            self._waiting -= 1
+
+    def _notify(self):
+        if self._waiting:
+            self._condition.notify_all()
+
+
+class Holding:
+    """
+    Holds a set of locks, taken in order, for the duration of a with block;
+    it can be entered any number of times, including by several threads at once
+    """
+
+    __slots__ = ("readers", "writers")
+
+    def __init__(
+        self,
+        readers: List[ReadWriteLock],
+        writers: Iterable[ReadWriteLock] = (),
+    ):
+        self.readers = readers
+        self.writers = list(writers)
+
+    def __enter__(self):
+        acquired = list()
+        try:
+            for lock in self.readers:
+                lock.acquire_read()
+                acquired.append(lock.release_read)
+            for lock in self.writers:
+                lock.acquire_write()
+                acquired.append(lock.release_write)
+        except BaseException:
+            for release in reversed(acquired):
+                release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.writers):
+            lock.release_write()
+        for lock in reversed(self.readers):
+            lock.release_read()
+
+
+class OrgLocks:
+    """
+    The locks of a virtual Salesforce instance: a reader/writer lock per
+    sobject, so that reads of an sobject never wait on one another, and one
+    for the org as a whole, which operations on sobjects share, while
+    operations on the whole org, e.g., restoring a snapshot, hold it alone
+
+    Locks on sobjects are always taken in the same order, after the org's. A
+    thread already holding some of them doesn't yield to waiting writers when
+    it takes another one for reading, since they may well be waiting on it.
+    Bulk jobs and batches have a lock of their own, which is taken after the
+    org's too, but never along with any sobject's
+    """
+
+    def __init__(self):
+        self.org = ReadWriteLock(self._holds_any)
+        self.jobs = ReadWriteLock(self._holds_any)
+        self._sobjects: Dict[str, ReadWriteLock] = dict()
+        self._mutex = threading.Lock()
+
+    def reading(self, *sobject_names: str) -> Holding:
+        return Holding([self.org] + self._locks(sobject_names))
+
+    def writing(self, sobject_name: str) -> Holding:
+        return Holding([self.org], self._locks((sobject_name,)))
+
+    def writing_jobs(self) -> Holding:
+        return Holding([self.org], [self.jobs])
+
+    def exclusive(self) -> Holding:
+        return Holding([], [self.org])
+
+    def _locks(self, sobject_names: Iterable[str]) -> List[ReadWriteLock]:
+        locks = list()
+        for sobject_name in sorted(set(sobject_names)):
+            lock = self._sobjects.get(sobject_name)
+            if lock is None:
+                with self._mutex:
+                    lock = self._sobjects.setdefault(
+                        sobject_name, ReadWriteLock(self._holds_any)
+                    )
+            locks.append(lock)
+        return locks
+
+    def _holds_any(self, thread: int) -> bool:
+        return (
+            self.org.holds(thread)
+            or self.jobs.holds(thread)
+            or any(lock.holds(thread) for lock in list(self._sobjects.values()))
+        )
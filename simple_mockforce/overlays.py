@@ -0,0 +1,113 @@
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from typing import Dict, Set
+
+_MISSING = object()
+
+
+class Overlay(MutableMapping):
+    """
+    A dict layered over a shared one, which it never writes to: only what's
+    written to the overlay is held by it, so layering one takes constant time,
+    however large the shared dict is
+
+    It iterates in the same order a copy of the shared dict would, i.e.,
+    replaced keys keep their place, and added keys come last
+    """
+
+    def __init__(self, base: Mapping):
+        self.base = base
+        # values written over keys of the base
+        self.replaced: Dict = dict()
+        # keys of the base deleted from the overlay
+        self.removed: Set = set()
+        # keys the base doesn't have, or had deleted, in the order they were written
+        self.added: Dict = dict()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.added.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self.removed:
+            return default
+        value = self.replaced.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self.base.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.added or (key not in self.removed and key in self.base)
+
+    def __setitem__(self, key, value):
+        if key in self.added or key in self.removed or key not in self.base:
+            self.added[key] = value
+        else:
+            self.replaced[key] = value
+
+    def __delitem__(self, key):
+        if key in self.added:
+            del self.added[key]
+        elif key in self.removed or key not in self.base:
+            raise KeyError(key)
+        else:
+            self.removed.add(key)
+            self.replaced.pop(key, None)
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def __iter__(self):
+        removed = self.removed
+        for key in self.base:
+            if key not in removed:
+                yield key
+        yield from self.added
+
+    def values(self) -> ValuesView:
+        return _OverlayValues(self)
+
+    def items(self) -> ItemsView:
+        return _OverlayItems(self)
+
+    def copy(self) -> "Overlay":
+        """
+        Returns an overlay over the same base, with everything written to this
+        one so far, which takes time proportional to the writes rather than to the
+        size of the base
+        """
+        overlay = Overlay(self.base)
+        overlay.replaced = dict(self.replaced)
+        overlay.removed = set(self.removed)
+        overlay.added = dict(self.added)
+        return overlay
+
+
+class _OverlayItems(ItemsView):
+    def __iter__(self):
+        overlay = self._mapping
+        removed, replaced = overlay.removed, overlay.replaced
+        for key, value in overlay.base.items():
+            if key not in removed:
+                yield key, replaced.get(key, value)
+        yield from overlay.added.items()
+
+
+class _OverlayValues(ValuesView):
+    def __iter__(self):
+        for _, value in _OverlayItems(self._mapping):
+            yield value
+
+
+def layered(mapping: Mapping) -> Overlay:
+    """
+    Returns an overlay over the mapping, which never grows deeper than one layer:
+    overlays are copied over their own base instead
+    """
+    if isinstance(mapping, Overlay):
+        return mapping.copy()
+    return Overlay(mapping)
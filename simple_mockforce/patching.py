@@ -0,0 +1,151 @@
+import re
+import threading
+
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator, Union
+from urllib.parse import urlsplit
+
+import requests
+import responses
+
+from simple_mockforce.adapter import salesforce_adapter
+from simple_mockforce.constants import ADAPTER, BASE_URL, RESPONSES, TRANSPORTS
+from simple_mockforce.context import named_org, new_org, use_org
+from simple_mockforce.routes import router
+from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+
+
+class SalesforceDispatcher(responses.CallbackResponse):
+    """
+    The one response registered with responses, which matches any call to
+    the Salesforce API the router has a route for, and dispatches it to the
+    route's callback; other calls are left to whatever else is registered
+    """
+
+    def __init__(self):
+        # the method is left to the router
+        super().__init__(
+            responses.GET,
+            re.compile(f"{BASE_URL}/services/"),
+            callback=self.dispatch,
+            content_type="content/json",
+        )
+
+    def matches(self, request):
+        if not self._url_matches(self.url, request.url):
+            return False, "URL does not match"
+        route = router.resolve(request.method, urlsplit(request.url).path)
+        if route is None:
+            return False, "No route for the method and path"
+        # saves resolving the route again once it's dispatched
+        request.mockforce_route = route
+        return True, ""
+
+    @staticmethod
+    def dispatch(request):
+        callback, parameters = request.mockforce_route
+        return callback(request, **parameters)
+
+
+# how many scenarios are mocking at once through each transport, e.g., from
+# several threads; the transport is patched in by the first one, and patched
+# out by the last one
+_activations = {transport: 0 for transport in TRANSPORTS}
+_activations_lock = threading.Lock()
+# Salesforce.__init__, while the adapter's patched in
+_salesforce_init = None
+
+
+@contextmanager
+def mocking(
+    org: Union[str, VirtualSalesforce, None], fresh: bool, transport: str = RESPONSES
+) -> Iterator[VirtualSalesforce]:
+    """
+    Patches calls to the Salesforce API for the duration of a with block, and
+    binds the org they go to, which is reset first, or rolled back afterwards
+    if it's journaled; see mock_salesforce for what the org can be
+    """
+    assert not (org and fresh), "An org can't be both given and fresh"
+    if fresh:
+        org = new_org()
+    elif isinstance(org, str):
+        org = named_org(org)
+    elif org is None:
+        org = virtual_salesforce
+
+    activate(transport)
+    try:
+        with use_org(org):
+            # a journaled org is rolled back to where it was when the scenario
+            # started, rather than started from scratch
+            savepoint = None
+            if org.journal is None:
+                org.reset()
+            else:
+                savepoint = org.savepoint()
+            try:
+                yield org
+            finally:
+                if savepoint is not None:
+                    org.rollback_to(savepoint)
+    finally:
+        deactivate(transport)
+
+
+def activate(transport: str = RESPONSES):
+    """
+    Patches calls to the Salesforce API, until deactivated as many times
+    """
+    assert transport in TRANSPORTS, f"{transport} isn't one of {TRANSPORTS}"
+    with _activations_lock:
+        if not _activations[transport]:
+            if transport == RESPONSES:
+                responses.start()
+                responses.add(SalesforceDispatcher())
+            else:
+                _mount_adapter()
+        _activations[transport] += 1
+
+
+def deactivate(transport: str = RESPONSES):
+    with _activations_lock:
+        _activations[transport] -= 1
+        if not _activations[transport]:
+            if transport == RESPONSES:
+                responses.stop()
+                responses.reset()
+            else:
+                _unmount_adapter()
+
+
+def _mount_adapter():
+    global _salesforce_init
+    from simple_salesforce import Salesforce
+
+    _salesforce_init = Salesforce.__init__
+
+    @wraps(_salesforce_init)
+    def __init__(self, *args, session=None, proxies=None, **kwargs):
+        if session is None:
+            session = requests.Session()
+            # spares reading proxies and the like from the environment on
+            # every call, which takes longer than the mocked call itself
+            session.trust_env = False
+            # proxies would be ignored, with a warning, now that there's a session
+            session.proxies = proxies or session.proxies
+            proxies = None
+        session.mount("https://", salesforce_adapter)
+        session.mount("http://", salesforce_adapter)
+        _salesforce_init(self, *args, session=session, proxies=proxies, **kwargs)
+
+    Salesforce.__init__ = __init__
+    salesforce_adapter.enabled = True
+
+
+def _unmount_adapter():
+    from simple_salesforce import Salesforce
+
+    Salesforce.__init__ = _salesforce_init
+    # sessions which outlive their scenarios go back to sending calls on
+    salesforce_adapter.enabled = False
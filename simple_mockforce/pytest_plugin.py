@@ -0,0 +1,109 @@
+"""
+A pytest plugin, registered through the pytest11 entry point, which provides
+the `mockforce` fixture: a virtual org which the Salesforce API is mocked with
+
+The API is patched once per session, the first time the fixture is used, and
+only the org's records are reset from one test to the next. Each pytest-xdist
+worker is a process of its own, with an org of its own, seeded from fixture
+files, which are only read once, by whichever worker gets to them first, while
+the others wait on a lock file, and then unpickle the cache the workers share
+"""
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+import pytest
+
+from simple_mockforce.constants import RESPONSES, TRANSPORTS
+from simple_mockforce.fixtures import FixturePath
+
+if TYPE_CHECKING:
+    from simple_mockforce.virtual import VirtualSalesforce
+
+# pytest loads plugins before any conftest.py, which may set the environment
+# variables the global org is configured with, e.g., MOCKFORCE_STORAGE_ENGINE,
+# so nothing which would create it is imported until a fixture is used
+
+
+def pytest_addoption(parser):
+    parser.addini(
+        "mockforce_fixtures",
+        type="linelist",
+        help="fixture files to seed the mockforce org from, one per line, as "
+        "Sobject = path, relative to the rootdir, and loaded in order",
+    )
+    parser.addini(
+        "mockforce_fixture_cache",
+        help="where the loaded fixtures are cached, relative to the rootdir; "
+        "defaults to the pytest cache directory",
+    )
+    parser.addini(
+        "mockforce_transport",
+        help=f"how calls to the Salesforce API are intercepted, one of {TRANSPORTS}; "
+        "defaults to responses",
+        default=RESPONSES,
+    )
+
+
+@pytest.fixture(scope="session")
+def mockforce_fixtures(pytestconfig) -> Dict[str, FixturePath]:
+    """
+    The fixture files the org is seeded from, keyed by sobject name; override
+    this fixture to pick them some other way
+    """
+    fixtures = dict()
+    for line in pytestconfig.getini("mockforce_fixtures"):
+        sobject_name, _, path = line.partition("=")
+        assert path, f"{line} isn't of the form Sobject = path"
+        fixtures[sobject_name.strip()] = Path(pytestconfig.rootpath) / path.strip()
+    return fixtures
+
+
+@pytest.fixture(scope="session")
+def mockforce_session(
+    pytestconfig, mockforce_fixtures: Dict[str, FixturePath]
+) -> Iterator["VirtualSalesforce"]:
+    """
+    Patches the Salesforce API for the rest of the session, and returns the
+    org of the worker, seeded from the fixtures, if there are any
+    """
+    from simple_mockforce.context import current_org
+    from simple_mockforce.patching import activate, deactivate
+
+    org = current_org()
+    baseline = org.baseline
+    if mockforce_fixtures:
+        org.load_fixtures(mockforce_fixtures, cache_path=_cache_path(pytestconfig))
+        org.baseline = org.snapshot()
+    transport = pytestconfig.getini("mockforce_transport")
+    activate(transport)
+    try:
+        yield org
+    finally:
+        deactivate(transport)
+        org.baseline = baseline
+
+
+@pytest.fixture
+def mockforce(
+    pytestconfig, mockforce_session: "VirtualSalesforce"
+) -> Iterator["VirtualSalesforce"]:
+    """
+    The worker's org, reset to its seeded records before the test, or rolled
+    back once it's done if it's journaled
+    """
+    from simple_mockforce.patching import mocking
+
+    transport = pytestconfig.getini("mockforce_transport")
+    with mocking(mockforce_session, fresh=False, transport=transport) as org:
+        yield org
+
+
+def _cache_path(config) -> Optional[Path]:
+    cache_path = config.getini("mockforce_fixture_cache")
+    if cache_path:
+        return Path(config.rootpath) / cache_path
+    if getattr(config, "cache", None) is None:
+        # the cache provider plugin is disabled
+        return None
+    return config.cache.mkdir("simple_mockforce") / "fixtures.pickle"
@@ -1,3 +1,15 @@
-from simple_mockforce.query_algorithms.parent_attrs import add_parent_object_attributes
+from simple_mockforce.query_algorithms.aggregate import AggregateQuery
+from simple_mockforce.query_algorithms.parent_attrs import (
+    add_parent_object_attributes,
+    resolve_parent_relationships,
+)
 from simple_mockforce.query_algorithms.order_by import sort_by_order_by_clause
-from simple_mockforce.query_algorithms.where import filter_by_where_clause
\ No newline at end of file
+from simple_mockforce.query_algorithms.child_relationships import (
+    add_child_relationship_records,
+    resolve_child_relationships,
+)
+from simple_mockforce.query_algorithms.where import (
+    compile_where_clause,
+    filter_by_where_clause,
+)
+from simple_mockforce.query_algorithms.planner import count_matches, plan_candidates
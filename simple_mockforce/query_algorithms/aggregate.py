@@ -0,0 +1,309 @@
+import datetime
+
+from decimal import Decimal
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from simple_mockforce.field_types import native_value
+from simple_mockforce.query_algorithms.where import _is_condition, compile_where_clause
+from simple_mockforce.soql import DATE_FUNCTIONS, ParsedQuery, split_function_label
+
+AGGREGATE_RESULT = "AggregateResult"
+
+
+class AggregateRow:
+    """
+    A single group of an aggregate query
+
+    Like a stored record, it holds both the native values of its grouped fields
+    and aggregates, which HAVING and ORDER BY clauses compare, and their wire
+    forms, which are returned. Both are keyed by label, e.g., SUM(Amount), and
+    by alias
+    """
+
+    __slots__ = ("natives", "wire")
+
+    def __init__(self):
+        self.natives: dict = dict()
+        self.wire: dict = dict()
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.natives
+
+    def __setitem__(self, label: str, values: Tuple[object, object]):
+        self.natives[label], self.wire[label] = values
+
+    def get(self, label: str, default=None):
+        return self.wire.get(label, default)
+
+    def native(self, label: str):
+        return self.natives.get(label)
+
+
+class _Count:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, native, wire):
+        if native is not None:
+            self.count += 1
+
+    def result(self):
+        return self.count, self.count
+
+
+class _CountDistinct:
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, native, wire):
+        if native is not None:
+            self.values.add(_hashable(native))
+
+    def result(self):
+        return len(self.values), len(self.values)
+
+
+class _Sum:
+    __slots__ = ("total", "count")
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, native, wire):
+        if _is_number(native):
+            self.total += native
+            self.count += 1
+
+    def result(self):
+        if not self.count:
+            return None, None
+        return self.total, _to_wire(self.total)
+
+
+class _Avg(_Sum):
+    __slots__ = ()
+
+    def result(self):
+        if not self.count:
+            return None, None
+        average = Decimal(self.total) / self.count
+        return average, _to_wire(average)
+
+
+class _Min:
+    __slots__ = ("best", "wire")
+
+    def __init__(self):
+        self.best = None
+        self.wire = None
+
+    def add(self, native, wire):
+        # the wire form of the lowest value is kept, e.g., the datetime as it was written
+        if native is not None and (self.best is None or self.is_better(native)):
+            self.best = native
+            self.wire = wire
+
+    def is_better(self, native) -> bool:
+        return native < self.best
+
+    def result(self):
+        return self.best, self.wire
+
+
+class _Max(_Min):
+    __slots__ = ()
+
+    def is_better(self, native) -> bool:
+        return native > self.best
+
+
+_ACCUMULATORS = {
+    "COUNT": _Count,
+    "COUNT_DISTINCT": _CountDistinct,
+    "SUM": _Sum,
+    "AVG": _Avg,
+    "MIN": _Min,
+    "MAX": _Max,
+}
+
+
+def _calendar_year(native) -> Optional[int]:
+    if isinstance(native, datetime.date):
+        return native.year
+    return None
+
+
+def _calendar_month(native) -> Optional[int]:
+    if isinstance(native, datetime.date):
+        return native.month
+    return None
+
+
+_DATE_FUNCTIONS: Dict[str, Callable[[object], Optional[int]]] = {
+    "CALENDAR_YEAR": _calendar_year,
+    "CALENDAR_MONTH": _calendar_month,
+}
+
+
+class AggregateQuery:
+    """
+    The aggregate functions, GROUP BY and HAVING clauses of a query, e.g.,
+    SELECT StageName, COUNT(Id), SUM(Amount) FROM Opportunity GROUP BY StageName
+
+    Records are aggregated in a single pass, hashing each one into its group,
+    whose aggregates are updated in place, so that the records are never collected
+    """
+
+    def __init__(self, parsed_query: ParsedQuery):
+        functions = {function.label: function for function in parsed_query.functions}
+        group_by = parsed_query.group_by or ()
+
+        # (label, the function computing its native value from a record, and
+        # whether it's a field, whose wire value is returned, or a date function)
+        self.groupings: List[Tuple[str, Callable[[dict], object], bool]] = [
+            (label, _grouping(label), split_function_label(label) is None)
+            for label in group_by
+        ]
+        # (label, the aggregated field, the accumulator's class)
+        self.aggregates = list()
+        # (label, the name it's returned under)
+        self.columns: List[Tuple[str, str]] = list()
+        self.aliases: Dict[str, str] = dict()
+
+        expression_count = 0
+        for field in parsed_query.fields:
+            function = functions.get(field)
+            if function is None or function.function in DATE_FUNCTIONS:
+                assert (
+                    field in group_by
+                ), f"{field} must either be grouped by or aggregated"
+            else:
+                self.aggregates.append(
+                    (field, function.field, _ACCUMULATORS[function.function])
+                )
+            if function is None:
+                self.columns.append((field, field))
+                continue
+            # like Salesforce, functions without an alias are named expr0, expr1...
+            name = function.alias or f"expr{expression_count}"
+            expression_count += function.alias is None
+            self.columns.append((field, name))
+            if function.alias:
+                self.aliases[function.alias] = field
+
+        # HAVING and ORDER BY clauses may use aggregates which aren't selected
+        aggregated = {label for label, _, _ in self.aggregates}
+        order_by = parsed_query.order_by or ()
+        for label in chain(
+            _labels_of(parsed_query.having), (term.field for term in order_by)
+        ):
+            function_and_field = split_function_label(label)
+            if function_and_field is None or label in aggregated:
+                continue
+            function, field = function_and_field
+            if function in _ACCUMULATORS:
+                self.aggregates.append((label, field, _ACCUMULATORS[function]))
+                aggregated.add(label)
+
+        self.having_predicate = compile_where_clause(parsed_query.having)
+
+    def aggregate(self, sobjects: Iterable[dict]) -> List[AggregateRow]:
+        """
+        Returns the groups passing the HAVING clause, in the order they were first met
+        """
+        groups: Dict[tuple, tuple] = dict()
+        if not self.groupings:
+            # without a GROUP BY, there's always a single group, even without records
+            groups[()] = self._new_group((), ())
+
+        for sobject in sobjects:
+            natives = tuple(grouping(sobject) for _, grouping, _ in self.groupings)
+            key = _hashable(natives)
+            group = groups.get(key)
+            if group is None:
+                wires = tuple(
+                    sobject.get(label) if is_field else native
+                    for (label, _, is_field), native in zip(self.groupings, natives)
+                )
+                group = groups[key] = self._new_group(natives, wires)
+
+            for (_, field, _), accumulator in zip(self.aggregates, group[2]):
+                accumulator.add(native_value(sobject, field), sobject.get(field))
+
+        rows = [self._to_row(*group) for group in groups.values()]
+        return [row for row in rows if self.having_predicate(row)]
+
+    def project(self, rows: List[AggregateRow]) -> List[dict]:
+        return [
+            {
+                "attributes": {"type": AGGREGATE_RESULT},
+                **{name: row.get(label) for label, name in self.columns},
+            }
+            for row in rows
+        ]
+
+    def _new_group(self, natives: tuple, wires: tuple) -> tuple:
+        accumulators = [accumulator() for _, _, accumulator in self.aggregates]
+        return natives, wires, accumulators
+
+    def _to_row(self, natives: tuple, wires: tuple, accumulators: list) -> AggregateRow:
+        row = AggregateRow()
+        for (label, _, _), native, wire in zip(self.groupings, natives, wires):
+            row[label] = native, wire
+        for (label, _, _), accumulator in zip(self.aggregates, accumulators):
+            row[label] = accumulator.result()
+        for alias, label in self.aliases.items():
+            row[alias] = row.native(label), row.get(label)
+        return row
+
+
+def _grouping(label: str) -> Callable[[dict], object]:
+    function_and_field = split_function_label(label)
+    if function_and_field is None:
+
+        def field_value(sobject: dict):
+            return native_value(sobject, label)
+
+        return field_value
+
+    function, field = function_and_field
+    assert function in _DATE_FUNCTIONS, f"Records can't be grouped by {function}"
+    date_function = _DATE_FUNCTIONS[function]
+
+    def date_function_value(sobject: dict):
+        return date_function(native_value(sobject, field))
+
+    return date_function_value
+
+
+def _labels_of(expressions: tuple) -> Iterator[str]:
+    for expression in expressions:
+        if _is_condition(expression):
+            yield expression[0]
+        else:
+            yield from _labels_of(expression[0::2])
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        # e.g., compound fields such as addresses
+        return repr(value)
+    return value
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _to_wire(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
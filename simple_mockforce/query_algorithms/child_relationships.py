@@ -0,0 +1,171 @@
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from simple_mockforce.query_algorithms.order_by import sort_by_order_by_clause
+from simple_mockforce.query_algorithms.parent_attrs import (
+    ParentRelationship,
+    _lookup_id,
+    resolve_parent_relationships,
+)
+from simple_mockforce.query_algorithms.where import (
+    WherePredicate,
+    compile_where_clause,
+)
+from simple_mockforce.soql import OrderingTerm, ParsedQuery
+
+
+class ChildRelationship(NamedTuple):
+    """
+    A child relationship subquery, e.g., (SELECT Id, Name FROM Contacts)
+
+    As with parent relationships, the lookup field pointing back to the parent
+    can only be told apart from its variants by looking at the child records,
+    so every candidate is kept, in order
+    """
+
+    name: str
+    sobject_name: str
+    lookup_fields: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    parent_relationships: List[ParentRelationship]
+    where_predicate: WherePredicate
+    order_by: Optional[Tuple[OrderingTerm, ...]]
+    limit: Optional[int]
+
+
+def resolve_child_relationships(
+    subqueries: Sequence[ParsedQuery], sobject_name: str, virtual_salesforce: object
+) -> List[ChildRelationship]:
+    """
+    Resolves each subquery to its child object and lookup field once for the whole query
+    """
+    relationships = list()
+    for subquery in subqueries:
+        parent_fields = [field for field in subquery.fields if "." in field]
+        relationships.append(
+            ChildRelationship(
+                name=subquery.sobject,
+                sobject_name=_child_object_name(subquery.sobject, virtual_salesforce),
+                lookup_fields=_lookup_fields(sobject_name, virtual_salesforce),
+                fields=tuple(field for field in subquery.fields if "." not in field),
+                parent_relationships=resolve_parent_relationships(
+                    parent_fields, virtual_salesforce
+                ),
+                where_predicate=compile_where_clause(subquery.where),
+                order_by=subquery.order_by,
+                limit=subquery.limit,
+            )
+        )
+    return relationships
+
+
+def add_child_relationship_records(
+    sobjects: Sequence[dict],
+    records: Sequence[dict],
+    relationships: Sequence[ChildRelationship],
+    virtual_salesforce: object,
+    include_deleted: bool = False,
+    children_by_relationship: Optional[Dict[str, Dict[str, List[dict]]]] = None,
+):
+    """
+    Fills in the subquery results of a batch of records
+
+    Each child object is scanned once per query rather than once per parent,
+    grouping the children passing the subquery's where clause by their parent's
+    Id into children_by_relationship, which later batches of the same query
+    reuse. Like Salesforce, a record without children gets a null relationship
+    """
+    if children_by_relationship is None:
+        children_by_relationship = dict()
+
+    for relationship in relationships:
+        children_by_parent_id = children_by_relationship.get(relationship.name)
+        if children_by_parent_id is None:
+            children_by_parent_id = _group_children(
+                relationship, virtual_salesforce, include_deleted
+            )
+            children_by_relationship[relationship.name] = children_by_parent_id
+
+        grouped_children = list()
+        for sobject in sobjects:
+            children = children_by_parent_id.get(sobject["Id"], list())
+            if relationship.order_by:
+                children = sort_by_order_by_clause(
+                    children, relationship.order_by, limit=relationship.limit
+                )
+            elif relationship.limit is not None:
+                children = children[: relationship.limit]
+            grouped_children.append(children)
+
+        # the children of the whole batch are projected at once, so that their
+        # own parent fields are joined once too
+        projected = iter(
+            virtual_salesforce._project(
+                [child for children in grouped_children for child in children],
+                relationship.fields,
+                relationship.parent_relationships,
+            )
+        )
+        for record, children in zip(records, grouped_children):
+            if not children:
+                record[relationship.name] = None
+                continue
+            child_records = [next(projected) for _ in children]
+            record[relationship.name] = {
+                "totalSize": len(child_records),
+                "done": True,
+                "records": child_records,
+            }
+
+
+def _group_children(
+    relationship: ChildRelationship, virtual_salesforce: object, include_deleted: bool
+) -> Dict[str, List[dict]]:
+    children_by_parent_id = defaultdict(list)
+    table = virtual_salesforce.data.get(relationship.sobject_name)
+    if table is None:
+        return children_by_parent_id
+    for child in table.records(include_deleted=include_deleted):
+        parent_id = _lookup_id(child, relationship)
+        if parent_id is not None and relationship.where_predicate(child):
+            children_by_parent_id[parent_id].append(child)
+    return children_by_parent_id
+
+
+def _child_object_name(relationship_name: str, virtual_salesforce: object) -> str:
+    """
+    Finds the child object from the relationship's name, which Salesforce
+    derives from the child's plural label, e.g., Contacts or Opportunities
+    """
+    custom = relationship_name.endswith("__r")
+    plural = relationship_name[:-3] if custom else relationship_name
+
+    candidates = list()
+    if plural.endswith("ies"):
+        candidates.append(f"{plural[:-3]}y")
+    if plural.endswith("s"):
+        candidates.append(plural[:-1])
+    candidates.append(plural)
+    if custom:
+        candidates = [f"{candidate}__c" for candidate in candidates]
+
+    # copied, since another thread may create a table in the meantime
+    sobject_names = {name.lower(): name for name in list(virtual_salesforce.data)}
+    for candidate in candidates:
+        if candidate.lower() in sobject_names:
+            return sobject_names[candidate.lower()]
+    # no such records exist yet, so every parent simply has no children
+    return candidates[0]
+
+
+def _lookup_fields(sobject_name: str, virtual_salesforce: object) -> Tuple[str, ...]:
+    lookup_fields = [f"{sobject_name}Id", sobject_name, f"{sobject_name}__c"]
+    # custom lookups to standard objects, e.g., Company__c pointing to an Account
+    relations_file = virtual_salesforce.relations_file
+    for relationship_name, related_object_name in relations_file.items():
+        if related_object_name == sobject_name:
+            lookup_field = virtual_salesforce._related_object_name_to_object_name(
+                relationship_name
+            )
+            lookup_fields.append(lookup_field)
+    return tuple(lookup_fields)
@@ -1,47 +1,70 @@
-from typing import List
+import heapq
 
-from python_soql_parser.core import ASC, DESC
+from typing import Callable, Iterable, List, Optional, Sequence
 
+from simple_mockforce.field_types import native_value
+from simple_mockforce.soql import OrderingTerm
 
-class Sortable:
-    def __init__(self, value):
-        self.value = value
 
-    def __eq__(self, other):
-        return other.value == self.value
+def sort_by_order_by_clause(
+    sobjects: Iterable[dict],
+    order_by: Sequence[OrderingTerm],
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    Returns a new list with the objects sorted by the order by clause; the
+    given objects are left untouched
 
-    def __lt__(self, other):
-        return self.value < other.value
+    If a limit is given, only that many of the first objects are returned, which
+    are selected with a heap rather than by sorting all of the objects
+    """
+    descending = order_by[0].descending
+    if all(term.descending == descending for term in order_by):
+        key = _sort_key(order_by, reverse=descending)
+        if limit is None:
+            return sorted(sobjects, key=key, reverse=descending)
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, sobjects, key=key)
 
-    def __repr__(self) -> str:
-        return str(self.value)
+    # native keys can't invert the order of e.g. strings, so mixed directions
+    # are handled by a stable sort per term, starting from the least significant one
+    sorted_sobjects = list(sobjects)
+    for term in reversed(order_by):
+        key = _sort_key((term,), reverse=term.descending)
+        sorted_sobjects.sort(key=key, reverse=term.descending)
+    if limit is not None:
+        return sorted_sobjects[:limit]
+    return sorted_sobjects
 
 
-class ReverseSortable(Sortable):
-    def __lt__(self, other):
-        # This is backwards from the parent class
-        return other.value < self.value
+def _sort_key(order_by: Sequence[OrderingTerm], reverse: bool) -> Callable:
+    # each value is paired with a rank, so that nulls are never compared with
+    # actual values; sorting in reverse also reverses where the nulls end up.
+    # Like where clauses, values are sorted by their native values, e.g., datetimes
+    # with different offsets are ordered chronologically
+    columns = [
+        (term.field, 0 if term.nulls_first != reverse else 2) for term in order_by
+    ]
 
-    def __repr__(self) -> str:
-        # add a - to denote reverse (negative) sorting
-        return f"-{self.value}"
+    if len(columns) == 1:
+        field, null_rank = columns[0]
 
+        def single_column_key(sobject: dict):
+            value = native_value(sobject, field)
+            if value is None:
+                return (null_rank, None)
+            return (1, value)
 
-def sort_by_order_by_clause(sobjects: List[dict], order_by_clauses: list):
-    sort_keys = list()
-    for order in order_by_clauses[0]:
-        direction = ASC
-        if order[-1] == DESC or order[-1] == ASC:
-            direction = order.pop()
-        sort_keys.append((order, direction))
+        return single_column_key
 
-    def order_records(record):
+    def key(sobject: dict):
         sort_tuple = tuple()
-        for sort_key in sort_keys:
-            for key in sort_key[0]:
-                SortableClass = ReverseSortable if sort_key[1] == DESC else Sortable
-                sortable_value = SortableClass(record[key])
-                sort_tuple += (sortable_value,)
+        for field, null_rank in columns:
+            value = native_value(sobject, field)
+            if value is None:
+                sort_tuple += (null_rank, None)
+            else:
+                sort_tuple += (1, value)
         return sort_tuple
 
-    sobjects.sort(key=order_records)
\ No newline at end of file
+    return key
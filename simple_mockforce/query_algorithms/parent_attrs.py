@@ -1,30 +1,111 @@
-def add_parent_object_attributes(
-    sobject: dict, record: dict, parent_fields: list, virtual_salesforce: object
-):
-    for parent_field in parent_fields:
-        parent_sobject_name, parent_field = parent_field.split(".")
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+
+class ParentRelationship(NamedTuple):
+    """
+    A parent relationship used in a SELECT, e.g., Account in Account.Name
 
-        is_custom_lookup_to_standard_object = parent_sobject_name in virtual_salesforce.relations_file
+    The lookup field can only be told apart from its Id-suffixed variant by
+    looking at the records themselves, so both candidates are kept, in order
+    """
 
-        normalized_parent_sobject_name = (
-            virtual_salesforce._related_object_name_to_object_name(parent_sobject_name)
-            if not is_custom_lookup_to_standard_object
-            else virtual_salesforce.relations_file[parent_sobject_name]
+    name: str
+    sobject_name: str
+    lookup_fields: Tuple[str, ...]
+    fields: Tuple[str, ...]
+
+
+def resolve_parent_relationships(
+    parent_fields: Sequence[str], virtual_salesforce: object
+) -> List[ParentRelationship]:
+    """
+    Groups the parent fields of a query by relationship, and resolves each
+    relationship to its parent object and lookup field once for the whole query
+    """
+    fields_by_relationship: Dict[str, List[str]] = dict()
+    for parent_field in parent_fields:
+        parent_sobject_name, parent_field = parent_field.split(".")
+        fields_by_relationship.setdefault(parent_sobject_name, list()).append(
+            parent_field
         )
-        # for some standard lookup fields, we need to append 'Id'
-        lookup_field_name = (
-            normalized_parent_sobject_name
-            if normalized_parent_sobject_name in sobject
-            else f"{normalized_parent_sobject_name}Id"
+
+    relationships = list()
+    for parent_sobject_name, fields in fields_by_relationship.items():
+        related_object_name = virtual_salesforce._related_object_name_to_object_name(
+            parent_sobject_name
         )
 
-        if is_custom_lookup_to_standard_object:
-            lookup_field_name = virtual_salesforce._related_object_name_to_object_name(parent_sobject_name)
+        if parent_sobject_name in virtual_salesforce.relations_file:
+            # a custom lookup to a standard object, e.g., Company__r -> Account
+            normalized_parent_sobject_name = virtual_salesforce.relations_file[
+                parent_sobject_name
+            ]
+            lookup_fields = (related_object_name,)
+        else:
+            normalized_parent_sobject_name = related_object_name
+            # for some standard lookup fields, we need to append 'Id'
+            lookup_fields = (
+                normalized_parent_sobject_name,
+                f"{normalized_parent_sobject_name}Id",
+            )
 
-        parent_object = virtual_salesforce.get(
-            normalized_parent_sobject_name,
-            sobject[lookup_field_name],
+        relationships.append(
+            ParentRelationship(
+                name=parent_sobject_name,
+                sobject_name=normalized_parent_sobject_name,
+                lookup_fields=lookup_fields,
+                fields=tuple(fields),
+            )
         )
-        if parent_sobject_name not in record:
-            record[parent_sobject_name] = dict()
-        record[parent_sobject_name][parent_field] = parent_object[parent_field]
+    return relationships
+
+
+def add_parent_object_attributes(
+    sobjects: Sequence[dict],
+    records: Sequence[dict],
+    relationships: Sequence[ParentRelationship],
+    virtual_salesforce: object,
+):
+    """
+    Fills in the parent fields of a batch of records as a hash join: the
+    lookup Ids of the whole batch are collected first, and each parent is
+    then fetched once, however many records point to it
+
+    Like Salesforce, a record without a parent gets a null relationship
+    """
+    for relationship in relationships:
+        lookup_ids = [_lookup_id(sobject, relationship) for sobject in sobjects]
+
+        parents = dict()
+        table = virtual_salesforce.data.get(relationship.sobject_name)
+        if table is not None:
+            for lookup_id, parent in _fetch_parents(table, lookup_ids).items():
+                parents[lookup_id] = {
+                    field: parent.get(field) for field in relationship.fields
+                }
+
+        for record, lookup_id in zip(records, lookup_ids):
+            parent = parents.get(lookup_id)
+            # each record gets a copy, so that results never share state
+            record[relationship.name] = dict(parent) if parent is not None else None
+
+
+def _lookup_id(sobject: dict, relationship: ParentRelationship):
+    for lookup_field in relationship.lookup_fields:
+        if lookup_field in sobject:
+            return sobject[lookup_field]
+    return None
+
+
+def _fetch_parents(table: object, lookup_ids: Sequence[str]) -> Dict[str, dict]:
+    lookup_ids = {lookup_id for lookup_id in lookup_ids if lookup_id is not None}
+    get_many = getattr(table, "get_many", None)
+    if get_many is not None:
+        # e.g., sqlite tables fetch the parents of a whole batch in one query
+        return get_many(lookup_ids)
+    parents = dict()
+    for lookup_id in lookup_ids:
+        parent = table.get(lookup_id)
+        if parent is not None:
+            parents[lookup_id] = parent
+    return parents
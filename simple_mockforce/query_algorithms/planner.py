@@ -0,0 +1,153 @@
+from itertools import chain
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from python_soql_parser.binops import EQ, GT, GTE, LT, LTE
+from python_soql_parser.core import IN
+
+from simple_mockforce.query_algorithms.date_token import SalesforceDateToken
+from simple_mockforce.query_algorithms.where import WherePredicate, _is_condition
+
+RANGE_OPERATORS = (GT, GTE, LT, LTE)
+
+# (estimated number of candidate records, a thunk that fetches them)
+AccessPath = Tuple[int, Callable[[], Iterable[dict]]]
+
+
+def plan_candidates(
+    virtual_salesforce: object,
+    sobject_name: str,
+    where_predicate: WherePredicate,
+    include_deleted: bool = False,
+) -> Iterable[dict]:
+    """
+    Returns the records which may pass the where clause
+
+    Every condition which all passing records must satisfy is checked against
+    the available indexes, and the one yielding the fewest candidates wins. If
+    no index can be used, this falls back to all of the sobject's records.
+    Candidates still have to be filtered by the where clause
+    """
+    best: Optional[AccessPath] = None
+    for field, binop, value in where_predicate.conditions:
+        access_path = _access_path(
+            virtual_salesforce, sobject_name, field, binop, value, include_deleted
+        )
+        if access_path is None:
+            continue
+        if best is None or access_path[0] < best[0]:
+            best = access_path
+
+    if best is None:
+        return virtual_salesforce.get_sobjects(
+            sobject_name, include_deleted=include_deleted
+        )
+    return best[1]()
+
+
+def count_matches(
+    virtual_salesforce: object,
+    sobject_name: str,
+    where_predicate: WherePredicate,
+    include_deleted: bool = False,
+) -> Optional[int]:
+    """
+    Counts the records passing the where clause without fetching them, which
+    can be done when there's no where clause, from the size of the table, or
+    when the where clause is a single condition an index fully covers, from
+    the size of the index's buckets, or by the storage engine itself, e.g., in
+    a database. Returns None otherwise
+    """
+    table = virtual_salesforce.data[sobject_name]
+    where = where_predicate.where
+    if not where:
+        return table.count(include_deleted=include_deleted)
+
+    # storage engines which evaluate where clauses themselves may count them too
+    count_where = getattr(table, "count_where", None)
+    if count_where is not None:
+        return count_where(where_predicate, include_deleted=include_deleted)
+
+    if len(where) > 1 or not _is_condition(where[0]):
+        return None
+    field, binop, value = where_predicate.conditions[0]
+    access_path = _access_path(
+        virtual_salesforce, sobject_name, field, binop, value, include_deleted
+    )
+    if access_path is None:
+        return None
+    if field == "Id":
+        # the estimate counts the Ids asked for, rather than the ones which exist
+        return len(access_path[1]())
+    return access_path[0]
+
+
+def _access_path(
+    virtual_salesforce: object,
+    sobject_name: str,
+    field: str,
+    binop: str,
+    value,
+    include_deleted: bool,
+) -> Optional[AccessPath]:
+    # relative date tokens are compared with truncated dates, which no index holds
+    if value is None or isinstance(value, SalesforceDateToken):
+        return None
+
+    values = _equality_values(binop, value)
+
+    if field == "Id" and values is not None:
+        table = virtual_salesforce.data[sobject_name]
+        return len(values), lambda: _fetch_by_ids(table, values, include_deleted)
+
+    # secondary indexes only hold records which haven't been deleted
+    if include_deleted:
+        return None
+
+    index = virtual_salesforce.indexes.find_index(sobject_name, field)
+    if index is None:
+        return None
+
+    if values is not None:
+        buckets = [index.buckets.get(literal) for literal in values]
+        buckets = [bucket for bucket in buckets if bucket]
+        return sum(len(bucket) for bucket in buckets), lambda: _fetch(buckets)
+
+    if binop in RANGE_OPERATORS and index.orderable:
+        try:
+            keys = index.range(binop, value)
+        except TypeError:
+            # the literal can't be compared with the field's values
+            return None
+        buckets = [index.buckets[key] for key in keys]
+        return sum(len(bucket) for bucket in buckets), lambda: _fetch(buckets)
+
+    return None
+
+
+def _equality_values(binop: str, value) -> Optional[List[object]]:
+    if binop == EQ:
+        values = [value]
+    elif binop == IN:
+        # keep the order the values were written in, but skip any duplicates
+        values = list(dict.fromkeys(value))
+    else:
+        return None
+    try:
+        for literal in values:
+            hash(literal)
+    except TypeError:
+        return None
+    return values
+
+
+def _fetch_by_ids(table: object, record_ids: List[str], include_deleted: bool):
+    records = list()
+    for record_id in record_ids:
+        record = table.get(record_id, include_deleted=include_deleted)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def _fetch(buckets: List[dict]) -> List[dict]:
+    return list(chain.from_iterable(bucket.values() for bucket in buckets))
@@ -1,8 +1,9 @@
 import datetime
+import operator
 
 # explicity import this so we can monkeypatch it in the tests
 from datetime import date
-from typing import List, Tuple, Union
+from typing import Callable, List, Union
 
 from dateutil.relativedelta import relativedelta
 
@@ -17,6 +18,13 @@ from python_soql_parser.tokens import (
     LAST_MONTH,
 )
 
+from simple_mockforce.field_types import (
+    DATETIME,
+    DATETIME_PATTERN,
+    DECIMAL,
+    native_value,
+    to_native,
+)
 from simple_mockforce.query_algorithms.date_token import SalesforceDateToken
 
 
@@ -24,55 +32,107 @@ def filter_by_where_clause(sobject: dict, where: list) -> bool:
     """
     Return True if the object passes the where clause
     Return False if it should be excluded
+
+    Prefer compiling the where clause once with `compile_where_clause`
+    when filtering more than a single object
     """
-    if where:
-        results = list()
-        _dive_into_clause(sobject, where, results)
-        passes = not any(not x for x in results)
-        return passes
-    return True
+    return compile_where_clause(where)(sobject)
+
+
+def compile_where_clause(where: list) -> "WherePredicate":
+    return WherePredicate(where)
 
 
-def _dive_into_clause(
-    sobject: dict, where: list, results: List[bool], previous: list = []
-):
-    for clause in where:
-        is_list = type(clause) == list
-        if is_list and _needs_another_dive(clause):
-            _dive_into_clause(sobject, clause, results, previous)
-        elif is_list:
-            field, binop, value = _parse_clause(clause)
-            passes = _evaluate_condition(sobject, field, binop, value)
-            if previous:
-                passes = _evaluate_boolean_expression(previous, passes)
-            results.append(passes)
+class WherePredicate:
+    """
+    A where clause compiled into a single callable, which returns True
+    if the object passes the where clause and False if it should be excluded
+
+    Literals, IN sets and date tokens are resolved once, at compile time.
+    Since date tokens such as TODAY are relative, a predicate which uses them
+    goes stale as soon as the date changes, and must then be recompiled
+    """
+
+    def __init__(self, where: list):
+        # kept around for storage engines which evaluate where clauses themselves
+        self.where = where
+        self.compiled_on = date.today()
+        self.depends_on_today = False
+        if where:
+            predicates = [self._compile_expression(expression) for expression in where]
+            self._predicate = _all_of(predicates)
         else:
-            previous_evaluation = results.pop()
-            previous.append((previous_evaluation, clause))
+            self._predicate = _always_passes
+        # the (field, binop, value) conditions every passing object must satisfy,
+        # which is what the query planner can use to pick an index
+        self.conditions = _conjunctive_conditions(where)
 
+    def __call__(self, sobject: dict) -> bool:
+        return self._predicate(sobject)
 
-def _evaluate_boolean_expression(previous: list, current_bool: bool):
-    previous_condition: Tuple[bool, str] = previous[0]
-    previous_result, boolean_operator = previous_condition
-    if boolean_operator == AND:
-        passes = current_bool and previous_result
-    elif boolean_operator == OR:
-        passes = current_bool or previous_result
-    else:
-        raise AssertionError(f"{previous_condition[1]} is not yet handled")
-    # previous is a pass by reference hack to allow us to keep track of
-    # whether or not we need to account for a boolean in the where condition
-    # Clear the data stored in the reference once it's been accounted for
-    # TODO: just use a class; would be cleaner to track state in an instance rather than this
-    previous.clear()
-    return passes
+    def is_stale(self) -> bool:
+        return self.depends_on_today and self.compiled_on != date.today()
+
+    def _compile_expression(self, expression: tuple) -> Callable[[dict], bool]:
+        if _is_condition(expression):
+            field, binop, value = _parse_clause(expression)
+            if isinstance(value, (datetime.date, SalesforceDateToken)):
+                self.depends_on_today = True
+            return _compile_condition(field, binop, value)
+
+        # a chain of expressions joined by boolean operators, e.g., A AND B AND C;
+        # SOQL requires parentheses when mixing ANDs and ORs, so folding left to right is safe
+        predicate = self._compile_expression(expression[0])
+        for idx in range(1, len(expression), 2):
+            boolean_operator = expression[idx]
+            other = self._compile_expression(expression[idx + 1])
+            if boolean_operator == AND:
+                predicate = _both(predicate, other)
+            elif boolean_operator == OR:
+                predicate = _either(predicate, other)
+            else:
+                raise AssertionError(f"{boolean_operator} is not yet handled")
+        return predicate
+
+
+def _conjunctive_conditions(expressions: tuple) -> List[tuple]:
+    conditions = list()
+    for expression in expressions:
+        if _is_condition(expression):
+            conditions.append(_parse_clause(expression))
+        elif all(boolean_operator == AND for boolean_operator in expression[1::2]):
+            conditions.extend(_conjunctive_conditions(expression[0::2]))
+    return conditions
+
+
+def _always_passes(sobject: dict) -> bool:
+    return True
+
+
+def _all_of(predicates: List[Callable[[dict], bool]]) -> Callable[[dict], bool]:
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda sobject: all(predicate(sobject) for predicate in predicates)
 
 
-def parse_date(value: str):
+def _both(left: Callable[[dict], bool], right: Callable[[dict], bool]):
+    return lambda sobject: left(sobject) and right(sobject)
+
+
+def _either(left: Callable[[dict], bool], right: Callable[[dict], bool]):
+    return lambda sobject: left(sobject) or right(sobject)
+
+
+def _is_condition(expression: tuple) -> bool:
+    return not isinstance(expression[0], (list, tuple))
+
+
+def _contains(field_value, values) -> bool:
     try:
-        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
-    except (ValueError, TypeError):
-        return None
+        return field_value in values
+    except TypeError:
+        # unhashable field values, e.g., compound fields, can't be in a set of literals
+        return False
 
 
 def parse_date_token(value):
@@ -81,60 +141,69 @@ def parse_date_token(value):
     return None
 
 
-def _evaluate_condition(
-    sobject: dict, field: str, binop: str, value: Union[str, List[str]]
-):
-    if field not in sobject:
-        return False
-    field_value = sobject[field]
+def _compile_condition(
+    field: str, binop: str, value: Union[str, List[str]]
+) -> Callable[[dict], bool]:
+    if binop == IN:
+        compare = _contains
+        try:
+            value = frozenset(value)
+        except TypeError:
+            pass
+    else:
+        compare = _COMPARISONS.get(binop)
+        if compare is None:
+            raise AssertionError(f"{binop} not yet handled")
 
-    date_value = parse_date(field_value)
     date_token = parse_date_token(value)
-    if date_value and not date_token:
-        field_value = date_value
-    elif date_value and date_token:
-        field_value = date_token.truncate_date(date_value)
-        value = date_token.date_token_date
-    # if our value isn't a date, but we have a date token, time to leave
-    elif date_token:
-        return False
+    if date_token:
+        token_date = date_token.date_token_date
 
-    # check if we're comparing None to a date
-    if not field_value and isinstance(value, datetime.date):
-        return False
+        def passes_date_token(sobject: dict) -> bool:
+            if field not in sobject:
+                return False
+            date_value = native_value(sobject, field)
+            if isinstance(date_value, datetime.datetime):
+                date_value = date_value.date()
+            # if our value isn't a date, but we have a date token, time to leave
+            elif not isinstance(date_value, datetime.date):
+                return False
+            return compare(date_token.truncate_date(date_value), token_date)
 
-    if binop == EQ:
-        return field_value == value
-    elif binop == IN:
-        return field_value in value
-    elif binop == NEQ:
-        return field_value != value
-    elif binop == LT:
-        return field_value < value
-    elif binop == LTE:
-        return field_value <= value
-    elif binop == GT:
-        return field_value > value
-    elif binop == GTE:
-        return field_value >= value
-    else:
-        raise AssertionError(f"{binop} not yet handled")
+        return passes_date_token
+
+    def passes(sobject: dict) -> bool:
+        if field not in sobject:
+            return False
+        try:
+            return compare(native_value(sobject, field), value)
+        except TypeError:
+            # e.g., comparing a null, or a string, to a date
+            return False
+
+    return passes
 
 
-def _needs_another_dive(clause: list):
-    return type(clause[0]) != str
+_COMPARISONS = {
+    EQ: operator.eq,
+    NEQ: operator.ne,
+    LT: operator.lt,
+    LTE: operator.le,
+    GT: operator.gt,
+    GTE: operator.ge,
+}
 
 
 def _parse_clause(clause: list) -> Union[str, List[str]]:
     field = clause[0]
     binop = clause[1]
     dirty_value = clause[2]
-    if type(dirty_value) == list:
+    if isinstance(dirty_value, (list, tuple)):
         if dirty_value[0] == "(" and dirty_value[-1] == ")":
             values = dirty_value[1:-1]
-            value = [_clean_string(value) for value in values]
+            value = [_to_native_literal(value) for value in values]
     else:
-        value = _clean_string(dirty_value)
+        value = _to_native_literal(dirty_value)
     return field, binop, _to_python(value)
 
 
@@ -144,6 +213,18 @@ def _clean_string(value):
     return value
 
 
+def _to_native_literal(value):
+    """
+    Literals are compared with the native values of the fields, so datetime
+    literals become datetimes, and decimal literals become Decimals
+    """
+    if isinstance(value, float):
+        return to_native(value, DECIMAL)
+    if type(value) == str and DATETIME_PATTERN.match(value):
+        return to_native(value, DATETIME)
+    return _clean_string(value)
+
+
 def _to_python(value: Union[str, list]):
     if type(value) == list:
         return [x if x != NULL else None for x in value]
@@ -0,0 +1,96 @@
+import threading
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from simple_mockforce.query_algorithms import compile_where_clause
+from simple_mockforce.query_algorithms.where import WherePredicate
+from simple_mockforce.soql import ParsedQuery, parse_soql
+
+DEFAULT_QUERY_CACHE_SIZE = 512
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class CachedQuery:
+    """
+    A parsed query, alongside the artifacts compiled from it
+    """
+
+    __slots__ = ("parsed_query", "_where_predicate")
+
+    def __init__(self, parsed_query: ParsedQuery):
+        self.parsed_query = parsed_query
+        self._where_predicate = None
+
+    def where_predicate(self) -> WherePredicate:
+        if self._where_predicate is None or self._where_predicate.is_stale():
+            self._where_predicate = compile_where_clause(self.parsed_query.where)
+        return self._where_predicate
+
+
+class QueryCache:
+    """
+    A bounded LRU cache of parsed SOQL, keyed by the query's text
+
+    Parsing is by far the most expensive step of mocking a query, and test
+    suites tend to issue the same handful of queries over and over. The
+    compiled where clause is cached along with the parse results
+
+    Queries are parsed under a lock, since the parser's memoization isn't thread-safe
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_QUERY_CACHE_SIZE):
+        assert maxsize >= 0, "The query cache size must be a non-negative value"
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedQuery]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, soql: str) -> CachedQuery:
+        with self._lock:
+            cached_query = self._entries.get(soql)
+            if cached_query is not None:
+                self.hits += 1
+                self._entries.move_to_end(soql)
+                return cached_query
+
+            self.misses += 1
+            cached_query = CachedQuery(parse_soql(soql))
+            if self.maxsize:
+                self._entries[soql] = cached_query
+                self._evict()
+            return cached_query
+
+    def resize(self, maxsize: int):
+        assert maxsize >= 0, "The query cache size must be a non-negative value"
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=self.maxsize,
+            currsize=len(self._entries),
+        )
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
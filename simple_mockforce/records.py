@@ -0,0 +1,163 @@
+import sys
+
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+
+from simple_mockforce.field_types import to_native
+
+
+class _Missing:
+    def __reduce__(self):
+        # pickled by name, so that it stays a singleton once unpickled
+        return "_MISSING"
+
+    def __repr__(self):
+        return "<missing>"
+
+
+# marks the fields a record doesn't have, as opposed to the ones it has set to null
+_MISSING = _Missing()
+
+
+class FieldTable:
+    """
+    The fields of a single sobject, each mapped to the position of its value in
+    the sobject's records
+
+    Every record of the sobject shares this table, so field names are stored
+    once, and interned, rather than once per record
+    """
+
+    __slots__ = ("positions", "fields", "field_types")
+
+    def __init__(self, field_types: Optional[Dict[str, str]] = None):
+        self.positions: Dict[str, int] = dict()
+        self.fields: List[str] = list()
+        self.field_types = field_types if field_types is not None else dict()
+
+    def __len__(self):
+        return len(self.fields)
+
+    def add(self, field: str) -> int:
+        position = self.positions.get(field)
+        if position is None:
+            field = sys.intern(field)
+            position = self.positions[field] = len(self.fields)
+            self.fields.append(field)
+        return position
+
+
+class Record(MutableMapping):
+    """
+    A stored record
+
+    Its values are kept in a list, ordered after its sobject's field table,
+    which grows whenever a new field appears. It behaves like the dict it was
+    written as, holding the field values in their wire form, exactly as they
+    were written and will be returned by the API. Alongside, it keeps the
+    native values of the fields which could be coerced, e.g., to dates, which
+    are computed once, whenever a field is written, rather than every time
+    it's queried. Writes happen in place
+    """
+
+    __slots__ = ("schema", "values", "natives")
+
+    def __init__(self, values: dict, schema: FieldTable):
+        self.schema = schema
+        self.values: list = list()
+        # only allocated once a value is coerced; None means the native
+        # value is the wire value itself
+        self.natives: Optional[list] = None
+        for field, value in values.items():
+            self[field] = value
+
+    def copy(self) -> "Record":
+        record = Record.__new__(Record)
+        record.schema = self.schema
+        record.values = list(self.values)
+        record.natives = None if self.natives is None else list(self.natives)
+        return record
+
+    def __reduce__(self):
+        # the native values are pickled along, rather than coerced again once unpickled
+        return (_unpickle_record, (self.schema, self.values, self.natives))
+
+    def __getitem__(self, field: str):
+        value = self.get(field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def get(self, field: str, default=None):
+        position = self.schema.positions.get(field)
+        if position is None or position >= len(self.values):
+            return default
+        value = self.values[position]
+        return default if value is _MISSING else value
+
+    def __contains__(self, field) -> bool:
+        return self.get(field, _MISSING) is not _MISSING
+
+    def __setitem__(self, field: str, value):
+        position = self.schema.add(field)
+        values = self.values
+        if position >= len(values):
+            values.extend([_MISSING] * (position + 1 - len(values)))
+        values[position] = value
+        self._coerce(field, position, value)
+
+    def __delitem__(self, field: str):
+        if field not in self:
+            raise KeyError(field)
+        position = self.schema.positions[field]
+        self.values[position] = _MISSING
+        self._coerce(field, position, None)
+
+    def __iter__(self) -> Iterator[str]:
+        for field, value in zip(self.schema.fields, self.values):
+            if value is not _MISSING:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for value in self.values if value is not _MISSING)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def native(self, field: str):
+        natives = self.natives
+        if natives is not None:
+            position = self.schema.positions.get(field)
+            if position is not None and position < len(natives):
+                native = natives[position]
+                if native is not None:
+                    return native
+        return self.get(field)
+
+    def retype(self, field: str):
+        """
+        Coerces a field again, after its declared type changed
+        """
+        if field in self:
+            self._coerce(field, self.schema.positions[field], self[field])
+
+    def _coerce(self, field: str, position: int, value):
+        native = to_native(value, self.schema.field_types.get(field))
+        natives = self.natives
+        if native is value:
+            if natives is not None and position < len(natives):
+                natives[position] = None
+            return
+        if natives is None:
+            natives = self.natives = list()
+        if position >= len(natives):
+            natives.extend([None] * (position + 1 - len(natives)))
+        natives[position] = native
+
+
+def _unpickle_record(schema: FieldTable, values: list, natives: Optional[list]):
+    record = Record.__new__(Record)
+    record.schema = schema
+    record.values = values
+    record.natives = natives
+    return record
@@ -0,0 +1,93 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Route(NamedTuple):
+    handler: Callable
+    # the names of the route's parameters, in the order they appear in its path,
+    # where wildcards are None
+    parameters: Tuple[Optional[str], ...]
+
+
+class RouteNode:
+    """
+    A node of the router's trie, i.e., a path segment
+    """
+
+    __slots__ = ("children", "parameter", "routes")
+
+    def __init__(self):
+        # literal segment -> node
+        self.children: Dict[str, RouteNode] = dict()
+        # the node any other segment leads to, if a route has a parameter there
+        self.parameter: Optional[RouteNode] = None
+        # method -> the route ending at this node
+        self.routes: Dict[str, Route] = dict()
+
+
+class Router:
+    """
+    Routes requests to handlers by their method and path, through a trie of
+    path segments, which are either literals, parameters, or wildcards, i.e.,
+    parameters which aren't extracted, e.g., /services/data/*/sobjects/{sobject}/
+
+    A path is matched in a single pass over its segments, which also extracts
+    the parameters. Literal segments take precedence over parameters. A
+    trailing slash is an empty segment, so /query/ and /query/{locator} are
+    different routes
+    """
+
+    def __init__(self):
+        self.root = RouteNode()
+
+    def add(self, method: str, pattern: str, handler: Callable):
+        node = self.root
+        parameters = list()
+        for segment in pattern.split("/"):
+            if segment == "*" or (segment.startswith("{") and segment.endswith("}")):
+                # wildcards are left out of the parameters
+                parameters.append(segment[1:-1] if segment != "*" else None)
+                if node.parameter is None:
+                    node.parameter = RouteNode()
+                node = node.parameter
+            else:
+                node = node.children.setdefault(segment, RouteNode())
+        assert method not in node.routes, f"{method} {pattern} is already routed"
+        node.routes[method] = Route(handler, tuple(parameters))
+
+    def resolve(self, method: str, path: str) -> Optional[Tuple[Callable, dict]]:
+        """
+        Returns the handler of the route matching the request, along with the
+        route's parameters, or None if no route matches
+        """
+        values: List[str] = list()
+        route = _resolve(self.root, method, path.split("/"), 0, values)
+        if route is None:
+            return None
+        parameters = {
+            name: value
+            for name, value in zip(route.parameters, values)
+            if name is not None
+        }
+        return route.handler, parameters
+
+
+def _resolve(
+    node: RouteNode, method: str, segments: List[str], depth: int, values: List[str]
+) -> Optional[Route]:
+    if depth == len(segments):
+        return node.routes.get(method)
+
+    segment = segments[depth]
+    child = node.children.get(segment)
+    if child is not None:
+        route = _resolve(child, method, segments, depth + 1, values)
+        if route is not None:
+            return route
+    # parameters are never empty, which leaves trailing slashes to literals
+    if node.parameter is not None and segment:
+        values.append(segment)
+        route = _resolve(node.parameter, method, segments, depth + 1, values)
+        if route is not None:
+            return route
+        values.pop()
+    return None
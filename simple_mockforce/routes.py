@@ -0,0 +1,45 @@
+from simple_mockforce.callbacks import (
+    bulk_callback,
+    bulk_detail_callback,
+    bulk_result_callback,
+    bulk_query_result_callback,
+    create_callback,
+    delete_callback,
+    get_callback,
+    job_callback,
+    job_detail_callback,
+    login_callback,
+    oauth_callback,
+    query_callback,
+    query_all_callback,
+    query_more_callback,
+    update_callback,
+)
+from simple_mockforce.router import Router
+
+DATA = "/services/data/*"
+SOBJECTS = f"{DATA}/sobjects/{{sobject}}"
+JOB = "/services/async/*/job/{job_id}"
+BATCH = f"{JOB}/batch/{{batch_id}}"
+
+# the endpoints of the Salesforce API which are mocked
+router = Router()
+router.add("POST", "/services/Soap/u/*", login_callback)
+router.add("POST", "/services/oauth2/token", oauth_callback)
+router.add("GET", f"{DATA}/query/", query_callback)
+router.add("GET", f"{DATA}/queryAll/", query_all_callback)
+router.add("GET", f"{DATA}/query/{{cursor}}", query_more_callback)
+router.add("GET", f"{DATA}/queryAll/{{cursor}}", query_more_callback)
+router.add("POST", f"{SOBJECTS}/", create_callback)
+router.add("GET", f"{SOBJECTS}/{{record_id}}", get_callback)
+router.add("GET", f"{SOBJECTS}/{{id_field}}/{{record_id}}", get_callback)
+router.add("PATCH", f"{SOBJECTS}/{{record_id}}", update_callback)
+router.add("PATCH", f"{SOBJECTS}/{{id_field}}/{{record_id}}", update_callback)
+router.add("DELETE", f"{SOBJECTS}/{{record_id}}", delete_callback)
+# bulk calls
+router.add("POST", "/services/async/*/job", job_callback)
+router.add("POST", JOB, job_detail_callback)
+router.add("POST", f"{JOB}/batch", bulk_callback)
+router.add("GET", BATCH, bulk_detail_callback)
+router.add("GET", f"{BATCH}/result", bulk_result_callback)
+router.add("GET", f"{BATCH}/result/{{result_set_id}}", bulk_query_result_callback)
@@ -0,0 +1,19 @@
+from typing import Dict, NamedTuple
+
+
+class Snapshot(NamedTuple):
+    """
+    The state of a virtual Salesforce instance at a point in time
+
+    Its tables and indexes are shared with the instance, and with every instance
+    it's restored to, rather than copied. Shared tables and indexes are frozen,
+    i.e., they're forked the first time they're written to, and a forked table
+    keeps sharing its records until they're written to themselves
+    """
+
+    storage_engine: str
+    tables: Dict[str, object]
+    indexes: Dict[str, Dict[str, object]]
+    jobs: Dict[str, dict]
+    batches: Dict[str, dict]
+    batch_data: Dict[str, object]
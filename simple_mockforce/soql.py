@@ -0,0 +1,262 @@
+import re
+
+from typing import NamedTuple, Optional, Tuple
+
+from pyparsing import CaselessKeyword, Group, Optional as OptionalClause, Suppress
+from pyparsing import delimitedList, infixNotation, opAssoc
+from python_soql_parser.core import (
+    AND,
+    ASC,
+    BY,
+    DESC,
+    FROM,
+    OR,
+    ORDER,
+    SELECT,
+    binop,
+    field_name_list,
+    field_right_value,
+    identifier,
+    limit_clause,
+    offset_clause,
+    sobject_name,
+    where_clause,
+)
+
+# python-soql-parser's grammar, extended with the bits of SOQL it doesn't support yet
+
+NULLS, FIRST, LAST = map(CaselessKeyword, "nulls first last".split())
+GROUP, HAVING = map(CaselessKeyword, "group having".split())
+
+# aggregate functions, and the date functions records can be grouped by
+COUNT, COUNT_DISTINCT, SUM, AVG, MIN, MAX = map(
+    CaselessKeyword, "COUNT COUNT_DISTINCT SUM AVG MIN MAX".split()
+)
+CALENDAR_YEAR, CALENDAR_MONTH = map(
+    CaselessKeyword, "CALENDAR_YEAR CALENDAR_MONTH".split()
+)
+AGGREGATE_FUNCTIONS = ("COUNT", "COUNT_DISTINCT", "SUM", "AVG", "MIN", "MAX")
+DATE_FUNCTIONS = ("CALENDAR_YEAR", "CALENDAR_MONTH")
+
+function_name = (
+    COUNT_DISTINCT | COUNT | SUM | AVG | MIN | MAX | CALENDAR_YEAR | CALENDAR_MONTH
+)
+
+# a function in the select list, with an optional alias, e.g., SUM(Amount) total
+selected_function = Group(
+    function_name("function")
+    + Suppress("(")
+    + identifier("field")
+    + Suppress(")")
+    + OptionalClause(~FROM + identifier("alias"))
+)
+
+# COUNT() only counts the matching records, rather than returning them
+COUNT_ROWS = "COUNT()"
+count_rows = (COUNT + Suppress("(") + Suppress(")")).setParseAction(
+    lambda tokens: COUNT_ROWS
+)
+
+# a function anywhere else, e.g., in a GROUP BY, HAVING or ORDER BY clause, is
+# referred to by its label, e.g., SUM(Amount), so that it can be used like a field
+function_label = (
+    function_name + Suppress("(") + identifier + Suppress(")")
+).setParseAction(lambda tokens: function_label_of(tokens[0], tokens[1]))
+
+group_by_clause = OptionalClause(
+    Suppress(GROUP) + Suppress(BY) + Group(delimitedList(function_label | identifier))
+)
+
+having_condition = Group((function_label | identifier) + binop + field_right_value)
+having_clause = OptionalClause(
+    Suppress(HAVING)
+    + infixNotation(
+        having_condition,
+        [
+            (AND, 2, opAssoc.LEFT),
+            (OR, 2, opAssoc.LEFT),
+        ],
+    ),
+    None,
+)
+
+# unlike python-soql-parser, each ordering term holds a single field, so that
+# a direction applies to its own field only, e.g., ORDER BY Name, CreatedDate DESC
+ordering_term = Group(
+    (function_label("field") | identifier("field"))
+    + OptionalClause(ASC | DESC)("direction")
+    + OptionalClause(Suppress(NULLS) + (FIRST | LAST)("nulls"))
+)
+
+order_clause = OptionalClause(
+    Suppress(ORDER) + Suppress(BY) + Group(delimitedList(ordering_term))
+)
+
+# a child relationship subquery, e.g., (SELECT Id, Name FROM Contacts)
+subquery = Group(
+    Suppress("(")
+    + SELECT
+    + field_name_list("fields")
+    + FROM
+    + sobject_name("sobject")
+    + where_clause("where")
+    + order_clause("order_by")
+    + limit_clause("limit")
+    + Suppress(")")
+)
+
+select_statement = (
+    SELECT
+    + Group(delimitedList(subquery | count_rows | selected_function | identifier))(
+        "fields"
+    )
+    + FROM
+    + sobject_name("sobject")
+    + where_clause("where")
+    + group_by_clause("group_by")
+    + having_clause("having")
+    + order_clause("order_by")
+    + limit_clause("limit")
+    + offset_clause("offset")
+)
+
+
+class OrderingTerm(NamedTuple):
+    field: str
+    descending: bool
+    nulls_first: bool
+
+
+class SelectedFunction(NamedTuple):
+    """
+    A function in the select list, e.g., SUM(Amount) or CALENDAR_YEAR(CloseDate)
+    """
+
+    label: str
+    function: str
+    field: str
+    alias: Optional[str]
+
+
+class ParsedQuery(NamedTuple):
+    """
+    An immutable snapshot of a parsed query
+
+    Every nested list in the parse results is converted to a tuple, so a
+    ParsedQuery can be cached and shared between calls without risk of one
+    query's execution mutating another's
+    """
+
+    sobject: str
+    fields: Tuple[str, ...]
+    where: tuple
+    order_by: Optional[Tuple[OrderingTerm, ...]]
+    limit: Optional[int]
+    offset: Optional[int]
+    # child relationship subqueries, whose sobject is the relationship's name
+    subqueries: Tuple["ParsedQuery", ...] = ()
+    # the functions of the select list, whose labels are among the fields
+    functions: Tuple[SelectedFunction, ...] = ()
+    group_by: Optional[Tuple[str, ...]] = None
+    having: tuple = ()
+
+    @property
+    def is_count(self) -> bool:
+        return self.fields == (COUNT_ROWS,)
+
+    @property
+    def is_aggregate(self) -> bool:
+        return bool(self.group_by) or any(
+            function.function in AGGREGATE_FUNCTIONS for function in self.functions
+        )
+
+
+def parse_soql(soql: str) -> ParsedQuery:
+    return _to_parsed_query(select_statement.parseString(soql))
+
+
+def _to_parsed_query(parse_results) -> ParsedQuery:
+    limit = parse_results["limit"].asList() if "limit" in parse_results else []
+    offset = parse_results["offset"].asList() if "offset" in parse_results else []
+
+    # TODO: why do we need to check?
+    order_by = (
+        tuple(_to_ordering_term(term) for term in parse_results["order_by"][0])
+        if "order_by" in parse_results
+        else None
+    )
+
+    fields = list()
+    subqueries = list()
+    functions = list()
+    for field in parse_results["fields"]:
+        if isinstance(field, str):
+            fields.append(field)
+        elif "function" in field:
+            function = _to_selected_function(field)
+            fields.append(function.label)
+            functions.append(function)
+        else:
+            subqueries.append(_to_parsed_query(field))
+
+    group_by = (
+        tuple(parse_results["group_by"][0]) if "group_by" in parse_results else None
+    )
+    having = parse_results["having"].asList() if "having" in parse_results else []
+
+    return ParsedQuery(
+        sobject=parse_results["sobject"],
+        fields=tuple(fields),
+        where=_freeze(parse_results["where"].asList()),
+        order_by=order_by,
+        limit=limit[0] if limit else None,
+        offset=offset[0] if offset else None,
+        subqueries=tuple(subqueries),
+        functions=tuple(functions),
+        group_by=group_by,
+        having=_freeze(having),
+    )
+
+
+FUNCTION_LABEL = re.compile(r"(\w+)\((.*)\)$")
+
+
+def function_label_of(function: str, field: str) -> str:
+    return f"{function}({field})"
+
+
+def split_function_label(label: str) -> Optional[Tuple[str, str]]:
+    """
+    Splits a function's label, e.g., CALENDAR_YEAR(CloseDate), into the function
+    and its field, or returns None if the label is that of a field
+    """
+    match = FUNCTION_LABEL.match(label)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def _to_selected_function(field) -> SelectedFunction:
+    return SelectedFunction(
+        label=function_label_of(field["function"], field["field"]),
+        function=field["function"],
+        field=field["field"],
+        alias=field["alias"] if "alias" in field else None,
+    )
+
+
+def _to_ordering_term(term) -> OrderingTerm:
+    descending = "direction" in term and term["direction"] == DESC
+    # like Salesforce, nulls come first when sorting ascending, and last when descending
+    nulls_first = term["nulls"] == FIRST if "nulls" in term else not descending
+    return OrderingTerm(
+        field=term["field"],
+        descending=descending,
+        nulls_first=nulls_first,
+    )
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,781 @@
+import datetime
+import json
+import pickle
+import sqlite3
+import threading
+import uuid
+import weakref
+
+from collections.abc import MutableMapping
+from decimal import Decimal
+from itertools import chain, islice
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from python_soql_parser.binops import EQ, GT, GTE, LT, LTE, NEQ
+from python_soql_parser.core import AND, IN, OR
+
+from simple_mockforce.field_types import (
+    BOOLEAN,
+    DATE,
+    DATETIME,
+    NUMBER,
+    OBJECT,
+    STRING,
+    kind_of,
+    to_native,
+)
+from simple_mockforce.query_algorithms.order_by import sort_by_order_by_clause
+from simple_mockforce.query_algorithms.where import (
+    WherePredicate,
+    _is_condition,
+    _parse_clause,
+)
+from simple_mockforce.soql import OrderingTerm
+
+_OPERATORS = {EQ: "=", NEQ: "!=", LT: "<", LTE: "<=", GT: ">", GTE: ">="}
+
+# the number of rows fetched from the database at a time
+_FETCH_SIZE = 500
+
+# the default database is a temporary file, deleted once it's closed, which
+# SQLite only pages in and out of its cache, rather than holding it all in memory
+TEMPORARY_FILE = ""
+IN_MEMORY = ":memory:"
+
+
+class SQLiteDatabase:
+    """
+    The database the tables of a virtual instance are stored in
+
+    It's disposable: nothing is ever synced to disk, and the database is gone
+    once it's closed, which happens as soon as none of its tables are in use.
+    When it's a file of its own, e.g., MOCKFORCE_SQLITE_DATABASE=/tmp/mf.db,
+    the names of its tables are unique to it, so that several instances, e.g.,
+    the org of each scenario, or of each run, can share the file
+    """
+
+    def __init__(self, path: str = TEMPORARY_FILE):
+        # autocommit, since the virtual instance doesn't roll back through transactions
+        self.connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.table_count = 0
+        self.table_prefix = f"sobject_{uuid.uuid4().hex[:12]}"
+        # the tables of different sobjects may be written to by different threads
+        # at once, whereas the table count and the last inserted row are shared
+        self.lock = threading.Lock()
+        # the tables which are no longer used, and can be dropped
+        self.garbage: List[str] = list()
+
+    def table(self, field_types: Optional[Dict[str, str]] = None):
+        return SQLiteSObjectTable(self, field_types)
+
+    def execute(self, sql: str, parameters: Sequence = ()) -> sqlite3.Cursor:
+        return self.connection.execute(sql, parameters)
+
+    def insert(self, sql: str, parameters: Sequence = ()) -> int:
+        """
+        Inserts a row, and returns its rowid
+        """
+        with self.lock:
+            return self.connection.execute(sql, parameters).lastrowid
+
+    def create_table(self, table: "SQLiteSObjectTable") -> str:
+        with self.lock:
+            self._collect_garbage()
+            self.table_count += 1
+            name = f"{self.table_prefix}_{self.table_count}"
+        weakref.finalize(table, self.garbage.append, name)
+        return name
+
+    def _collect_garbage(self):
+        while self.garbage:
+            try:
+                self.execute(f"DROP TABLE IF EXISTS {self.garbage[-1]}")
+            except sqlite3.OperationalError:
+                # the database is locked by a query which is still being iterated
+                return
+            self.garbage.pop()
+
+
+class SQLiteRecord(MutableMapping):
+    """
+    A stored record of an SQLite table, i.e., a view over one of its rows
+
+    It behaves like the dict it was written as: reading it returns the wire
+    values, and writing to it writes through to the database. The row is
+    fetched once, and again only after the table was written to
+    """
+
+    __slots__ = ("table", "position", "version", "row")
+
+    def __init__(self, table: "SQLiteSObjectTable", position: int, row=None):
+        self.table = table
+        self.position = position
+        self.version = table.version
+        # the wire values of the row, in the order of the table's fields
+        self.row = row
+
+    def _row(self) -> tuple:
+        if self.row is None or self.version != self.table.version:
+            self.row = self.table.fetch_row(self.position)
+            self.version = self.table.version
+        return self.row
+
+    def _raw(self, field: str):
+        number = self.table.field_numbers.get(field)
+        if number is None:
+            return None
+        row = self._row()
+        return row[number] if number < len(row) else None
+
+    def __getitem__(self, field: str):
+        raw = self._raw(field)
+        if raw is None:
+            raise KeyError(field)
+        return _decode(raw)
+
+    def __contains__(self, field) -> bool:
+        return self._raw(field) is not None
+
+    def get(self, field: str, default=None):
+        raw = self._raw(field)
+        return default if raw is None else _decode(raw)
+
+    def __setitem__(self, field: str, value):
+        self.table.set(self.position, field, value)
+
+    def __delitem__(self, field: str):
+        if field not in self:
+            raise KeyError(field)
+        self.table.unset(self.position, field)
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._row()
+        for field, raw in zip(self.table.fields, row):
+            if raw is not None:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def native(self, field: str):
+        return to_native(self.get(field), self.table.field_types.get(field))
+
+
+class SQLiteSObjectTable:
+    """
+    The records of a single sobject, stored as a table of an SQLite database
+
+    Each field is stored twice: its wire values, as JSON, to be returned as they
+    were written, and its native values, e.g., datetimes as UTC timestamps, to
+    be compared and indexed by. Where and order by clauses are translated to
+    SQL, along with the limit and offset of the query, as long as the field's
+    native values are all of the same kind, which SQL compares just like Python
+    does. Anything else, e.g., relative date tokens, falls back to evaluating
+    records one by one
+    """
+
+    vectorized = True
+
+    def __init__(
+        self, database: SQLiteDatabase, field_types: Optional[Dict[str, str]] = None
+    ):
+        self.field_types = field_types if field_types is not None else dict()
+        self.database = database
+        self.name = database.create_table(self)
+        # each field is stored in the w<number> and n<number> columns
+        self.fields: List[str] = list()
+        self.field_numbers: Dict[str, int] = dict()
+        # the kind of the native values of each field, None while they're all nulls
+        self.kinds: Dict[str, Optional[str]] = dict()
+        # the fields with an index on their native values
+        self.indexed: Set[str] = set()
+        self.size = 0
+        self.deleted_count = 0
+        # bumped by every write, so that records know to fetch their row again
+        self.version = 0
+        # whether the table is shared with a snapshot, and must be forked before
+        # it's written to
+        self.frozen = False
+        self.database.execute(
+            f"CREATE TABLE {self.name} ("
+            "position INTEGER PRIMARY KEY, "
+            "record_id TEXT NOT NULL UNIQUE, "
+            "deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def __len__(self):
+        return self.size - self.deleted_count
+
+    def count(self, include_deleted: bool = False) -> int:
+        return self.size if include_deleted else len(self)
+
+    def insert(self, values: dict) -> SQLiteRecord:
+        columns = ["record_id"]
+        parameters = [values["Id"]]
+        for field, value in values.items():
+            number = self._field_number(field)
+            columns.append(f"w{number}")
+            columns.append(f"n{number}")
+            parameters.append(_encode(value))
+            parameters.append(self._to_column_value(field, value))
+        placeholders = ", ".join("?" * len(columns))
+        position = self.database.insert(
+            f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({placeholders})",
+            parameters,
+        )
+        self.size += 1
+        self.version += 1
+        return SQLiteRecord(self, position)
+
+    def set(self, position: int, field: str, value):
+        number = self._field_number(field)
+        self.database.execute(
+            f"UPDATE {self.name} SET w{number} = ?, n{number} = ? WHERE position = ?",
+            (_encode(value), self._to_column_value(field, value), position),
+        )
+        self.version += 1
+
+    def unset(self, position: int, field: str):
+        number = self.field_numbers[field]
+        self.database.execute(
+            f"UPDATE {self.name} SET w{number} = NULL, n{number} = NULL "
+            "WHERE position = ?",
+            (position,),
+        )
+        self.version += 1
+
+    def fetch_row(self, position: int) -> tuple:
+        row = self.database.execute(
+            f"SELECT {self._wire_columns()} FROM {self.name} WHERE position = ?",
+            (position,),
+        ).fetchone()
+        # a removed record has no fields left
+        return row[1:] if row is not None else ()
+
+    def get(
+        self, record_id: str, include_deleted: bool = False
+    ) -> Optional[SQLiteRecord]:
+        row = self.database.execute(
+            f"SELECT deleted, {self._wire_columns()} FROM {self.name} "
+            "WHERE record_id = ?",
+            (record_id,),
+        ).fetchone()
+        if row is None or (row[0] and not include_deleted):
+            return None
+        return SQLiteRecord(self, row[1], row[2:])
+
+    def get_many(
+        self, record_ids: Sequence[str], include_deleted: bool = False
+    ) -> Dict[str, SQLiteRecord]:
+        """
+        Returns the records with the given Ids, keyed by Id, fetching them in as
+        few statements as possible
+        """
+        records = dict()
+        record_ids = list(record_ids)
+        for start in range(0, len(record_ids), _FETCH_SIZE):
+            chunk = record_ids[start : start + _FETCH_SIZE]
+            sql = (
+                f"SELECT record_id, {self._wire_columns()} FROM {self.name} "
+                f"WHERE record_id IN ({', '.join('?' * len(chunk))})"
+            )
+            if not include_deleted:
+                sql += " AND deleted = 0"
+            for row in self.database.execute(sql, chunk):
+                records[row[0]] = SQLiteRecord(self, row[1], row[2:])
+        return records
+
+    def bury(self, record: SQLiteRecord):
+        self._set_deleted(record, True)
+        self.deleted_count += 1
+
+    def unbury(self, record: SQLiteRecord):
+        self._set_deleted(record, False)
+        self.deleted_count -= 1
+
+    def remove(self, record: SQLiteRecord):
+        """
+        Removes a live record altogether, as if it had never been inserted
+        """
+        self.database.execute(
+            f"DELETE FROM {self.name} WHERE position = ?", (record.position,)
+        )
+        self.size -= 1
+        self.version += 1
+
+    def records(self, include_deleted: bool = False) -> Iterator[SQLiteRecord]:
+        """
+        Iterates over the records; like the default engine, deleted records come last
+        """
+        if include_deleted:
+            sql = f"SELECT {self._wire_columns()} FROM {self.name} ORDER BY deleted, position"
+        else:
+            sql = (
+                f"SELECT {self._wire_columns()} FROM {self.name} "
+                "WHERE deleted = 0 ORDER BY position"
+            )
+        return self._records(sql, ())
+
+    def retype(self, field: str):
+        number = self.field_numbers.get(field)
+        if number is None:
+            return
+        self.kinds[field] = None
+        rows = self.database.execute(
+            f"SELECT position, w{number} FROM {self.name} WHERE w{number} IS NOT NULL"
+        ).fetchall()
+        self.database.connection.executemany(
+            f"UPDATE {self.name} SET n{number} = ? WHERE position = ?",
+            [
+                (self._to_column_value(field, _decode(raw)), position)
+                for position, raw in rows
+            ],
+        )
+        self.version += 1
+
+    def use_field_types(self, field_types: Dict[str, str]):
+        self.field_types = field_types
+
+    def create_index(self, field: str):
+        """
+        Indexes the native values of a field, unless they already are
+        """
+        if field in self.indexed:
+            return
+        number = self._field_number(field)
+        self.database.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.name}_n{number} "
+            f"ON {self.name} (n{number})"
+        )
+        self.indexed.add(field)
+
+    def lookup(self, field: str, value, limit: Optional[int] = None) -> List[dict]:
+        """
+        Returns the records whose field's native value equals the given one, in
+        the order they were inserted, like a hash index would
+        """
+        if field not in self.field_numbers:
+            # like a hash index, records without the field are keyed by null
+            return list(islice(self.records(), limit)) if value is None else []
+        kind = self.kinds[field]
+        if kind == OBJECT or (
+            value is not None and kind is not None and kind_of(value) != kind
+        ):
+            # the values can't be matched in the database
+            matches = (
+                record
+                for record in self.records()
+                if _hash_equal(record.native(field), value)
+            )
+            return list(islice(matches, limit))
+        if value is not None and kind is None:
+            return []
+
+        self.create_index(field)
+        native = f"n{self.field_numbers[field]}"
+        sql = f"SELECT {self._wire_columns()} FROM {self.name} WHERE deleted = 0 AND "
+        if value is None:
+            sql += f"{native} IS NULL"
+            parameters = []
+        else:
+            sql += f"{native} = ?"
+            parameters = [_to_sql_value(value, kind)]
+        sql += " ORDER BY position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return list(self._records(sql, parameters))
+
+    def fork(self) -> "SQLiteSObjectTable":
+        """
+        Returns a writable copy of the table, copied within the database
+        """
+        table = SQLiteSObjectTable(self.database, self.field_types)
+        for field in self.fields:
+            table._field_number(field)
+        self.database.execute(
+            f"INSERT INTO {table.name} SELECT * FROM {self.name} ORDER BY position"
+        )
+        table.kinds = dict(self.kinds)
+        table.size = self.size
+        table.deleted_count = self.deleted_count
+        for field in self.indexed:
+            table.create_index(field)
+        return table
+
+    def writable(self, record: SQLiteRecord) -> SQLiteRecord:
+        """
+        Returns a view over the record's row in this table, which may be a
+        fork of the one the record was read from
+        """
+        return SQLiteRecord(self, record.position)
+
+    def select(
+        self,
+        where_predicate: WherePredicate,
+        order_by: Optional[Sequence[OrderingTerm]] = None,
+        include_deleted: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Iterator[SQLiteRecord]:
+        """
+        Returns the records passing the where clause, sorted by the order by
+        clause, if any, skipping the first `offset` of them, up to the `limit`th
+
+        The whole query is evaluated by the database when every condition and
+        ordering term translates to SQL, in which case only the records which
+        are returned are ever fetched
+        """
+        where, parameters, exact = self._where(where_predicate.where)
+        if not include_deleted:
+            where.append("deleted = 0")
+        sql = f"SELECT {self._wire_columns()} FROM {self.name}"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+
+        ordering = self._order_by(order_by or (), include_deleted)
+        if ordering is not None:
+            sql += f" ORDER BY {ordering}"
+        if exact and ordering is not None:
+            sql += " LIMIT ? OFFSET ?"
+            parameters.extend((-1 if limit is None else limit - offset, offset))
+            return self._records(sql, parameters)
+
+        records = self._records(sql, parameters)
+        if not exact:
+            records = filter(where_predicate, records)
+        if ordering is None:
+            # e.g., values of mixed kinds, which can't be compared in the database
+            records = iter(sort_by_order_by_clause(records, order_by, limit=limit))
+        return islice(records, offset, limit)
+
+    def count_where(
+        self, where_predicate: WherePredicate, include_deleted: bool = False
+    ) -> Optional[int]:
+        """
+        Counts the records passing the where clause in the database, or returns
+        None if it can't be translated to SQL
+        """
+        where, parameters, exact = self._where(where_predicate.where)
+        if not exact:
+            return None
+        if not include_deleted:
+            where.append("deleted = 0")
+        sql = f"SELECT COUNT(*) FROM {self.name}"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        return self.database.execute(sql, parameters).fetchone()[0]
+
+    def _records(self, sql: str, parameters: Sequence) -> Iterator[SQLiteRecord]:
+        cursor = self.database.execute(sql, parameters)
+        rows = iter(lambda: cursor.fetchmany(_FETCH_SIZE), [])
+        return (
+            SQLiteRecord(self, row[0], row[1:]) for row in chain.from_iterable(rows)
+        )
+
+    def _wire_columns(self) -> str:
+        return ", ".join(
+            chain(("position",), (f"w{number}" for number in range(len(self.fields))))
+        )
+
+    def _field_number(self, field: str) -> int:
+        number = self.field_numbers.get(field)
+        if number is None:
+            number = len(self.fields)
+            self.database.execute(f"ALTER TABLE {self.name} ADD COLUMN w{number}")
+            self.database.execute(f"ALTER TABLE {self.name} ADD COLUMN n{number}")
+            self.fields.append(field)
+            self.field_numbers[field] = number
+            self.kinds[field] = None
+            self.version += 1
+        return number
+
+    def _to_column_value(self, field: str, value):
+        """
+        Returns the native value of a field as it's stored in the database, and
+        keeps track of the kind of the field's values along the way
+        """
+        native = to_native(value, self.field_types.get(field))
+        if native is None:
+            return None
+        kind = kind_of(native)
+        known_kind = self.kinds[field]
+        if known_kind is None:
+            self.kinds[field] = known_kind = kind
+        elif kind != known_kind:
+            # from now on, the field can only be compared in Python
+            self.kinds[field] = known_kind = OBJECT
+        if known_kind == OBJECT:
+            return None
+        return _to_sql_value(native, kind)
+
+    def _set_deleted(self, record: SQLiteRecord, deleted: bool):
+        self.database.execute(
+            f"UPDATE {self.name} SET deleted = ? WHERE position = ?",
+            (int(deleted), record.position),
+        )
+        self.version += 1
+
+    # where clauses
+
+    def _where(self, where: tuple) -> Tuple[List[str], list, bool]:
+        """
+        Returns the SQL conditions the records passing the where clause satisfy,
+        their parameters, and whether or not they're exact, i.e., every
+        condition could be translated
+        """
+        conditions = list()
+        parameters = list()
+        exact = True
+        for expression in where:
+            translated = self._expression(expression)
+            if translated is None:
+                exact = False
+                continue
+            condition, expression_parameters = translated
+            conditions.append(condition)
+            parameters.extend(expression_parameters)
+        return conditions, parameters, exact
+
+    def _expression(self, expression: tuple) -> Optional[Tuple[str, list]]:
+        """
+        Returns None if the expression can't be translated to SQL
+        """
+        if _is_condition(expression):
+            return self._condition(*_parse_clause(expression))
+
+        translated = self._expression(expression[0])
+        if translated is None:
+            return None
+        conditions = [translated[0]]
+        parameters = list(translated[1])
+        for idx in range(1, len(expression), 2):
+            if expression[idx] not in (AND, OR):
+                return None
+            other = self._expression(expression[idx + 1])
+            if other is None:
+                return None
+            conditions.append(expression[idx])
+            conditions.append(other[0])
+            parameters.extend(other[1])
+        return f"({' '.join(conditions)})", parameters
+
+    def _condition(self, field: str, binop: str, value) -> Optional[Tuple[str, list]]:
+        if field == "Id" and binop in (EQ, IN):
+            # the Id doubles as the primary key
+            values = [
+                literal for literal in _literals(binop, value) if literal is not None
+            ]
+            if not all(isinstance(literal, str) for literal in values):
+                return None
+            return f"record_id IN ({', '.join('?' * len(values))})", values
+
+        number = self.field_numbers.get(field)
+        if number is None:
+            # no record has the field, and records without it never pass
+            return "0", []
+        kind = self.kinds[field]
+        if kind == OBJECT:
+            return None
+        present = f"w{number} IS NOT NULL"
+        null = f"{present} AND n{number} IS NULL"
+        native = f"n{number}"
+
+        if binop == IN:
+            conditions = list()
+            literals = list()
+            for literal in _literals(binop, value):
+                if literal is None:
+                    conditions.append(f"({null})")
+                    continue
+                if kind is None:
+                    continue
+                if kind_of(literal) != kind:
+                    return None
+                literals.append(_to_sql_value(literal, kind))
+            if literals:
+                conditions.append(f"{native} IN ({', '.join('?' * len(literals))})")
+            if not conditions:
+                return "0", []
+            return f"({' OR '.join(conditions)})", literals
+
+        operator = _OPERATORS.get(binop)
+        if operator is None or not _is_literal(value):
+            return None
+
+        if value is None or kind is None:
+            # comparing with nulls only holds for (in)equality
+            if binop == EQ:
+                return (f"({null})", []) if value is None else ("0", [])
+            if binop == NEQ:
+                condition = f"{native} IS NOT NULL" if value is None else present
+                return f"({condition})", []
+            return "0", []
+
+        if kind_of(value) != kind:
+            return None
+        literal = _to_sql_value(value, kind)
+        if binop == NEQ:
+            return f"({present} AND ({native} IS NULL OR {native} != ?))", [literal]
+        return f"{native} {operator} ?", [literal]
+
+    # order by clauses
+
+    def _order_by(
+        self, order_by: Sequence[OrderingTerm], include_deleted: bool
+    ) -> Optional[str]:
+        """
+        Returns the SQL ordering, or None if the values can't be ordered in the
+        database. Ties are broken by the order records were inserted in, like
+        the stable sort of the default engine
+        """
+        terms = list()
+        for term in order_by:
+            number = self.field_numbers.get(term.field)
+            if number is None or self.kinds[term.field] is None:
+                # every record sorts as a null
+                continue
+            if self.kinds[term.field] == OBJECT:
+                return None
+            native = f"n{number}"
+            terms.append(f"{native} IS NULL {'DESC' if term.nulls_first else 'ASC'}")
+            terms.append(f"{native} {'DESC' if term.descending else 'ASC'}")
+        if include_deleted:
+            terms.append("deleted")
+        terms.append("position")
+        return ", ".join(terms)
+
+    # pickling, e.g., for the fixture cache, copies the rows out of the database
+
+    def __getstate__(self):
+        rows = self.database.execute(
+            f"SELECT * FROM {self.name} ORDER BY position"
+        ).fetchall()
+        return {
+            "field_types": self.field_types,
+            "fields": self.fields,
+            "kinds": self.kinds,
+            "indexed": self.indexed,
+            "deleted_count": self.deleted_count,
+            "rows": rows,
+        }
+
+    def __setstate__(self, state: dict):
+        self.__init__(SQLiteDatabase(), state["field_types"])
+        for field in state["fields"]:
+            self._field_number(field)
+        self.kinds = state["kinds"]
+        rows = state["rows"]
+        if rows:
+            placeholders = ", ".join("?" * len(rows[0]))
+            self.database.connection.executemany(
+                f"INSERT INTO {self.name} VALUES ({placeholders})", rows
+            )
+        self.size = len(rows)
+        self.deleted_count = state["deleted_count"]
+        for field in state["indexed"]:
+            self.create_index(field)
+
+
+class SQLiteFieldIndex:
+    """
+    Stands in for the secondary index of a field of an SQLite table, which the
+    database maintains itself, so that records are never indexed in Python
+
+    The table is resolved every time the index is used, since it's replaced
+    whenever it's forked or the virtual instance is provisioned
+    """
+
+    # the query planner isn't used for tables which evaluate where clauses themselves
+    orderable = False
+
+    def __init__(
+        self,
+        table_provider: Callable[[], Optional[SQLiteSObjectTable]],
+        field: str,
+    ):
+        self.table_provider = table_provider
+        self.field = field
+        self.frozen = False
+        table = table_provider()
+        if table is not None:
+            table.create_index(field)
+
+    def fork(self) -> "SQLiteFieldIndex":
+        return SQLiteFieldIndex(self.table_provider, self.field)
+
+    def add(self, record: SQLiteRecord):
+        # e.g., a declared index whose table didn't exist yet when it was declared
+        record.table.create_index(self.field)
+
+    def remove(self, record: dict):
+        pass
+
+    def lookup(self, value) -> List[dict]:
+        table = self.table_provider()
+        if table is None:
+            return []
+        return table.lookup(self.field, value)
+
+    def first(self, value) -> Optional[dict]:
+        table = self.table_provider()
+        if table is None:
+            return None
+        records = table.lookup(self.field, value, limit=1)
+        return records[0] if records else None
+
+
+def _encode(value):
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError):
+        # e.g., dates written straight to the virtual instance rather than via the API
+        return pickle.dumps(value)
+
+
+def _decode(raw):
+    if isinstance(raw, bytes):
+        return pickle.loads(raw)
+    return json.loads(raw)
+
+
+def _literals(binop: str, value) -> list:
+    return list(value) if binop == IN else [value]
+
+
+def _is_literal(value) -> bool:
+    # relative date tokens are compared with truncated dates
+    return value is None or isinstance(
+        value, (bool, int, float, Decimal, str, datetime.date)
+    )
+
+
+def _hash_equal(native, value) -> bool:
+    try:
+        return hash(native) == hash(value) and native == value
+    except TypeError:
+        return False
+
+
+def _to_sql_value(native, kind: str):
+    """
+    Converts a native value to one SQLite compares and sorts the same way, e.g.,
+    datetimes to UTC timestamps, which sort as text just like they do in time
+    """
+    if kind == BOOLEAN:
+        return int(native)
+    if kind == NUMBER:
+        return float(native)
+    if kind == DATETIME:
+        utc = native.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return utc.isoformat(timespec="microseconds")
+    if kind == DATE:
+        return native.isoformat()
+    return native
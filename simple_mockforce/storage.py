@@ -0,0 +1,205 @@
+import os
+
+from itertools import chain
+from typing import Callable, Dict, Iterable, MutableMapping, Optional, Set
+
+from simple_mockforce.overlays import layered
+from simple_mockforce.records import FieldTable, Record
+
+# the available storage engines, which can be picked per virtual instance
+ROWS = "rows"
+COLUMNAR = "columnar"
+SQLITE = "sqlite"
+STORAGE_ENGINES = (ROWS, COLUMNAR, SQLITE)
+
+
+class SObjectTable:
+    """
+    The records of a single sobject, partitioned into live records and
+    tombstones (soft-deleted records). Both partitions are keyed by Id, so they
+    double as the primary key index, and reads never need to filter on IsDeleted
+    """
+
+    # whether or not the table evaluates where and order by clauses itself,
+    # rather than having its records planned, filtered and sorted one by one
+    vectorized = False
+
+    def __init__(self, field_types: Optional[Dict[str, str]] = None):
+        self.field_types = field_types if field_types is not None else dict()
+        # shared by every record of the sobject
+        self.schema = FieldTable(self.field_types)
+        self.live: MutableMapping[str, Record] = dict()
+        self.tombstones: MutableMapping[str, Record] = dict()
+        # whether the table is shared with a snapshot, and must be forked before
+        # it's written to
+        self.frozen = False
+        # the Ids of the records which can be written to in place, or None if
+        # they all can, i.e., the table doesn't share any with a snapshot
+        self.owned: Optional[Set[str]] = None
+
+    def __len__(self):
+        return len(self.live)
+
+    def count(self, include_deleted: bool = False) -> int:
+        if include_deleted:
+            return len(self.live) + len(self.tombstones)
+        return len(self.live)
+
+    def insert(self, values: dict) -> Record:
+        """
+        Stores a new record, and returns it as stored
+        """
+        record = Record(values, self.schema)
+        self.live[record["Id"]] = record
+        if self.owned is not None:
+            self.owned.add(record["Id"])
+        return record
+
+    def get(self, record_id: str, include_deleted: bool = False) -> Optional[dict]:
+        record = self.live.get(record_id)
+        if record is None and include_deleted:
+            return self.tombstones.get(record_id)
+        return record
+
+    def bury(self, record: dict):
+        """
+        Moves a live record to the tombstones
+        """
+        record_id = record["Id"]
+        del self.live[record_id]
+        self.tombstones[record_id] = record
+
+    def unbury(self, record: dict):
+        """
+        Moves a record back from the tombstones
+        """
+        record_id = record["Id"]
+        del self.tombstones[record_id]
+        self.live[record_id] = record
+
+    def remove(self, record: dict):
+        """
+        Removes a live record altogether, as if it had never been inserted
+        """
+        record_id = record["Id"]
+        del self.live[record_id]
+        if self.owned is not None:
+            self.owned.discard(record_id)
+
+    def records(self, include_deleted: bool = False) -> Iterable[dict]:
+        """
+        Iterates over the records without copying them; deleted records come last
+        """
+        if include_deleted:
+            return chain(self.live.values(), self.tombstones.values())
+        return self.live.values()
+
+    def retype(self, field: str):
+        """
+        Coerces a field of every record again, after its declared type changed
+        """
+        for record in list(self.records(include_deleted=True)):
+            self.writable(record).retype(field)
+
+    def use_field_types(self, field_types: Dict[str, str]):
+        """
+        Shares the declared field types of a virtual instance, e.g., once unpickled
+        """
+        self.field_types = self.schema.field_types = field_types
+
+    def fork(self) -> "SObjectTable":
+        """
+        Returns a writable copy of the table, which shares its records, and its
+        field table, until they're written to
+
+        Its partitions are overlays over the table's, so forking takes time
+        proportional to what was written since the first fork, not to the
+        number of records
+        """
+        table = SObjectTable(self.field_types)
+        table.schema = self.schema
+        table.live = layered(self.live)
+        table.tombstones = layered(self.tombstones)
+        table.owned = set()
+        return table
+
+    def writable(self, record: Record) -> Record:
+        """
+        Returns the record, ready to be written to in place: if it's shared with
+        a snapshot, it's replaced with a copy of its own first
+        """
+        if self.owned is None:
+            return record
+        record_id = record["Id"]
+        if record_id in self.owned:
+            return record
+        partition = self.live if record_id in self.live else self.tombstones
+        record = partition[record_id] = record.copy()
+        self.owned.add(record_id)
+        return record
+
+
+class SObjectTables(dict):
+    """
+    The tables of a virtual instance, keyed by sobject name
+
+    Like a defaultdict, a table is created the first time its sobject is used,
+    sharing the sobject's declared field types
+    """
+
+    def __init__(
+        self,
+        table_factory: Callable[[Dict[str, str]], object],
+        field_types: Dict[str, Dict[str, str]],
+    ):
+        super().__init__()
+        self.table_factory = table_factory
+        self.field_types = field_types
+
+    def __missing__(self, sobject_name: str):
+        table = self[sobject_name] = self.table_factory(self.field_types[sobject_name])
+        return table
+
+    def writable(self, sobject_name: str):
+        """
+        Returns the table of the sobject, ready to be written to: if it's shared
+        with a snapshot, it's replaced with a fork of its own first
+        """
+        table = self[sobject_name]
+        if table.frozen:
+            table = self[sobject_name] = table.fork()
+        return table
+
+    def freeze(self) -> Dict[str, object]:
+        """
+        Marks every table as shared, so that it's forked before it's written to
+        again, and returns them
+        """
+        for table in self.values():
+            table.frozen = True
+        return dict(self)
+
+
+def get_storage_engine(name: str) -> Callable[[Dict[str, str]], object]:
+    """
+    Returns the table class of the given storage engine
+    """
+    if name == ROWS:
+        return SObjectTable
+    if name == COLUMNAR:
+        # numpy is an optional dependency, which only the columnar engine needs
+        try:
+            from simple_mockforce.columnar import ColumnarSObjectTable
+        except ImportError as e:
+            raise ImportError(
+                "The columnar storage engine requires numpy: "
+                "pip install simple-mockforce[columnar]"
+            ) from e
+        return ColumnarSObjectTable
+    if name == SQLITE:
+        from simple_mockforce.sqlite import TEMPORARY_FILE, SQLiteDatabase
+
+        # every table of the virtual instance lives in the same, new database
+        path = os.getenv("MOCKFORCE_SQLITE_DATABASE", TEMPORARY_FILE)
+        return SQLiteDatabase(path).table
+    raise AssertionError(f"{name} is not one of {', '.join(STORAGE_ENGINES)}")
@@ -5,18 +5,41 @@ import os
 import random
 import string
 from collections import defaultdict
+from functools import partial
+from itertools import chain, islice
 
 from pathlib import Path
-
-from python_soql_parser import parse
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from simple_salesforce.exceptions import SalesforceResourceNotFound
 from simple_mockforce.query_algorithms import (
+    AggregateQuery,
+    add_child_relationship_records,
     add_parent_object_attributes,
-    filter_by_where_clause,
+    count_matches,
+    plan_candidates,
+    resolve_child_relationships,
+    resolve_parent_relationships,
     sort_by_order_by_clause,
 )
-from simple_mockforce.utils import find_object_and_index
+from simple_mockforce.cursors import DEFAULT_BATCH_SIZE, QueryCursor, QueryLocators
+from simple_mockforce.field_types import FIELD_TYPES, to_native
+from simple_mockforce.fixtures import (
+    FixturePath,
+    fixture_cache_key,
+    fixture_cache_lock,
+    read_fixture,
+    read_fixture_cache,
+    write_fixture_cache,
+)
+from simple_mockforce.indexes import IndexRegistry
+from simple_mockforce.locks import Holding, OrgLocks
+from simple_mockforce.query_algorithms.where import WherePredicate
+from simple_mockforce.query_cache import DEFAULT_QUERY_CACHE_SIZE, QueryCache
+from simple_mockforce.snapshots import Snapshot
+from simple_mockforce.soql import OrderingTerm
+from simple_mockforce.sqlite import SQLiteFieldIndex
+from simple_mockforce.storage import ROWS, SQLITE, SObjectTables, get_storage_engine
 
 from logging import getLogger
 
@@ -29,9 +52,31 @@ class VirtualSalesforce:
 
     As of now, all objects are assumed to exist (and provisioned if they don't already).
     This class does not yet mimic any of the validation you'd see with Salesforce server-side
+
+    It can be used from several threads at once: reads of an sobject never wait
+    on one another, only on writes to it, whereas operations on the whole
+    instance, e.g., restoring a snapshot, wait for every read and write
     """
 
-    def __init__(self):
+    def __init__(self, storage_engine: str = None):
+        # the default engine keeps records as rows; the columnar one needs numpy
+        self.storage_engine = storage_engine or os.getenv(
+            "MOCKFORCE_STORAGE_ENGINE", ROWS
+        )
+        self.indexes = IndexRegistry(self.get_sobjects, self._engine_index)
+        # sobject -> field -> declared type, which, like declared indexes, survive provision
+        self.field_types: Dict[str, Dict[str, str]] = defaultdict(dict)
+        # parsed queries don't depend on the org's data, so this cache isn't reset by provision
+        self.query_cache = QueryCache(
+            maxsize=int(
+                os.getenv("MOCKFORCE_QUERY_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE)
+            )
+        )
+        # the snapshot each @mock_salesforce test starts from, rather than from scratch
+        self.baseline: Optional[Snapshot] = None
+        # the undo entries of every write, most recent last, when journaling
+        self.journal: Optional[List[Callable[[], None]]] = None
+        self.locks = OrgLocks()
         self.provision()
 
         # temporary support for related object field names that don't
@@ -50,157 +95,609 @@ class VirtualSalesforce:
         """
         Starts a virtual Salesforce instance from scratch. Useful to prevent test pollution
         """
-        self.data = defaultdict(list)
-        self.jobs = dict()
-        self.batches = dict()
-        self.batch_data = dict()
+        with self.locks.exclusive():
+            self.data = SObjectTables(
+                get_storage_engine(self.storage_engine), self.field_types
+            )
+            self.indexes.clear()
+            self.query_locators = QueryLocators(id_factory=self._generate_sfdc_id)
+            self.jobs = dict()
+            self.batches = dict()
+            self.batch_data = dict()
+            self._restart_journal()
+
+    def snapshot(self) -> Snapshot:
+        """
+        Takes a snapshot of the virtual instance's records, indexes and bulk jobs
+
+        Nothing is copied: the snapshot shares the instance's tables, which are
+        forked the next time they're written to, so taking it is roughly constant
+        time, however many records there are
+        """
+        with self.locks.exclusive():
+            return Snapshot(
+                storage_engine=self.storage_engine,
+                tables=self.data.freeze(),
+                indexes=self.indexes.snapshot(),
+                jobs=dict(self.jobs),
+                batches=dict(self.batches),
+                batch_data=dict(self.batch_data),
+            )
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Brings the virtual instance back to the state of the snapshot, which can
+        be restored any number of times
+
+        Like taking a snapshot, this shares its tables rather than copying them.
+        The first write to an sobject then forks its table, which is layered over
+        the shared one rather than copying its Ids or records, each of which is
+        only copied when it's written to; columnar and SQLite tables are copied whole
+        """
+        with self.locks.exclusive():
+            self.storage_engine = snapshot.storage_engine
+            self.data = SObjectTables(
+                get_storage_engine(self.storage_engine), self.field_types
+            )
+            self.data.update(snapshot.tables)
+            self.indexes.restore(snapshot.indexes)
+            self.query_locators = QueryLocators(id_factory=self._generate_sfdc_id)
+            self.jobs = dict(snapshot.jobs)
+            self.batches = dict(snapshot.batches)
+            self.batch_data = dict(snapshot.batch_data)
+            self._restart_journal()
+
+    def reset(self):
+        """
+        Starts from the baseline snapshot, if one is set, or from scratch otherwise
+        """
+        with self.locks.exclusive():
+            if self.baseline is None:
+                self.provision()
+            else:
+                self.restore(self.baseline)
+
+    def start_journal(self):
+        """
+        Journals every write from now on, i.e., creates, updates, deletes and bulk
+        jobs and batches, so that they can be rolled back
+
+        While journaling, @mock_salesforce tests roll back whatever they wrote
+        when they're done, rather than starting from scratch, so that an org
+        seeded once stays seeded, at a cost proportional to what the tests wrote
+        """
+        with self.locks.exclusive():
+            if self.journal is None:
+                self.journal = list()
+
+    def stop_journal(self):
+        with self.locks.exclusive():
+            self.journal = None
+
+    def savepoint(self) -> int:
+        """
+        Returns a savepoint to roll back to; only valid until the org is
+        provisioned or restored from a snapshot
+        """
+        with self.locks.reading():
+            assert (
+                self.journal is not None
+            ), "Savepoints require the journal to be started"
+            return len(self.journal)
+
+    def rollback_to(self, savepoint: int):
+        """
+        Undoes every write made since the savepoint, most recent first, keeping
+        the indexes in sync
+        """
+        with self.locks.exclusive():
+            assert (
+                self.journal is not None
+            ), "Rolling back requires the journal to be started"
+            while len(self.journal) > savepoint:
+                undo = self.journal.pop()
+                undo()
+
+    def use_storage_engine(self, storage_engine: str):
+        """
+        Switches to another storage engine, i.e., rows, columnar or sqlite, starting
+        from scratch
+        """
+        with self.locks.exclusive():
+            self.storage_engine = storage_engine
+            self.provision()
 
     # SOQL
 
     def query(self, soql: str, include_deleted: bool = False):
+        return list(self.iter_query(soql, include_deleted=include_deleted))
+
+    def iter_query(
+        self,
+        soql: str,
+        include_deleted: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[dict]:
+        """
+        Lazily executes a query as a pipeline of scan -> filter -> project -> parent join
+
+        Records flow through the pipeline in batches of up to batch_size, so that
+        parents are joined once per batch, and scanning stops as soon as
+        OFFSET + LIMIT records have been produced. Records skipped by the OFFSET
+        are never projected. Only an ORDER BY needs every matching record up front
+
+        Like with a query cursor, the matching records are pinned up front, and
+        each batch is projected as it's iterated over, under the read locks of
+        the sobjects the query reads from, which are never held in between, so
+        that an unfinished iterator never holds up other threads
+        """
+        reading = self._reading_query(soql)
+        with reading:
+            sobjects, project = self._plan_query(soql, include_deleted=include_deleted)
+            sobjects = list(sobjects)
+        return self._iter_query(reading, sobjects, project, batch_size)
+
+    @staticmethod
+    def _iter_query(
+        reading: Holding,
+        sobjects: List[dict],
+        project: Callable[[List[dict]], List[dict]],
+        batch_size: int,
+    ) -> Iterator[dict]:
+        for start in range(0, len(sobjects), batch_size):
+            with reading:
+                records = project(sobjects[start : start + batch_size])
+            yield from records
+
+    def count(self, soql: str, include_deleted: bool = False) -> int:
+        """
+        Returns the number of records matching a COUNT() query, e.g.,
+        SELECT COUNT() FROM Lead WHERE IsConverted = false
+
+        Records are never projected nor collected. When there's no where clause,
+        or an index fully covers it, they aren't even fetched; declaring an index
+        on a field counts are often filtered by makes them independent of the
+        number of records
+        """
+        cached_query = self.query_cache.get(soql)
+        parsed_query = cached_query.parsed_query
+        assert parsed_query.is_count, f"{soql} is not a COUNT() query"
+        sobject = self._find_sobject_name(parsed_query.sobject)
+        where_predicate = cached_query.where_predicate()
+
+        with self.locks.reading(sobject):
+            total_size = count_matches(
+                self, sobject, where_predicate, include_deleted=include_deleted
+            )
+            if total_size is None:
+                sobjects = self._scan(
+                    sobject, where_predicate, None, include_deleted, None
+                )
+                total_size = sum(1 for _ in sobjects)
+        if parsed_query.offset:
+            total_size = max(0, total_size - parsed_query.offset)
+        if parsed_query.limit is not None:
+            total_size = min(total_size, parsed_query.limit)
+        return total_size
+
+    def open_query_cursor(
+        self, soql: str, include_deleted: bool = False
+    ) -> QueryCursor:
+        """
+        Runs a query for paging through with a query locator
+
+        The matching records are pinned when the cursor is opened, so that the
+        cursor knows its total size, but each one is only projected and joined
+        with its parents once the page it's on is fetched
+        """
+        if self.query_cache.get(soql).parsed_query.is_count:
+            return self.query_locators.open(
+                list(),
+                _no_records,
+                total_size=self.count(soql, include_deleted=include_deleted),
+            )
+        reading = self._reading_query(soql)
+        with reading:
+            sobjects, project = self._plan_query(soql, include_deleted=include_deleted)
+            sobjects = list(sobjects)
+
+        def project_page(sobjects: List[dict]) -> List[dict]:
+            with reading:
+                return project(sobjects)
+
+        return self.query_locators.open(sobjects, project_page)
+
+    def _reading_query(self, soql: str) -> Holding:
+        """
+        Returns the locks to hold while running the query, i.e., the read locks
+        of its sobject, and of the parents and children it selects fields from
+        """
+        parsed_query = self.query_cache.get(soql).parsed_query
+        sobject = self._find_sobject_name(parsed_query.sobject)
+        if parsed_query.is_count or parsed_query.is_aggregate:
+            return self.locks.reading(sobject)
+
+        parent_fields = [field for field in parsed_query.fields if "." in field]
+        relationships = chain(
+            resolve_parent_relationships(parent_fields, self),
+            resolve_child_relationships(parsed_query.subqueries, sobject, self),
+        )
+        return self.locks.reading(
+            sobject, *(relationship.sobject_name for relationship in relationships)
+        )
+
+    def _plan_query(
+        self, soql: str, include_deleted: bool
+    ) -> Tuple[Iterator[dict], Callable[[List[dict]], List[dict]]]:
+        """
+        Returns the lazily evaluated records matching the query, windowed by its
+        OFFSET and LIMIT, along with the function projecting batches of them
+        into results
+        """
         logger.warning(
             "Mocking 'query' is not yet fully supported. You should watch your tests closely if you're using this feature."
         )
-        parse_results = parse(soql)
-        parsed_sobject = parse_results["sobject"]
+        cached_query = self.query_cache.get(soql)
+        parsed_query = cached_query.parsed_query
+        sobject = self._find_sobject_name(parsed_query.sobject)
 
-        sobject = None
-        for sobject_name in self.data.keys():
-            if sobject_name.lower() == parsed_sobject.lower():
-                sobject = sobject_name
+        if parsed_query.is_count:
+            # COUNT() queries return no records, only their size
+            return iter(()), _no_records
 
-        # TODO: throw some Salesforce error about the object not existing?
-        assert (
-            sobject
-        ), f"{parsed_sobject} not present in the virtual Salesforce objects"
-
-        all_fields = parse_results["fields"].asList()
         fields = list()
         parent_fields = list()
 
-        for field in all_fields:
+        for field in parsed_query.fields:
             if "." in field:
                 parent_fields.append(field)
             else:
                 fields.append(field)
 
-        where = parse_results["where"].asList()
+        where_predicate = cached_query.where_predicate()
+        limit = parsed_query.limit
+        offset = parsed_query.offset or 0
+        order_by = parsed_query.order_by
 
-        limit = parse_results["limit"].asList()
-
-        offset = parse_results["offset"].asList()
+        # negative limit and offset values are invalid in soql
+        assert offset > -1, "SOQL offset must be a non-negative value"
+        if limit is not None:
+            assert limit > -1, "Limit must be a non-negative value"
+        stop = None if limit is None else offset + limit
+
+        if parsed_query.is_aggregate:
+            # the records are grouped in a single pass, in no particular order;
+            # it's the groups which are then sorted, offset and limited
+            aggregate_query = AggregateQuery(parsed_query)
+            groups = aggregate_query.aggregate(
+                self._scan(sobject, where_predicate, None, include_deleted, None)
+            )
+            if order_by:
+                groups = sort_by_order_by_clause(groups, order_by, limit=stop)
+            return islice(groups, offset, stop), aggregate_query.project
 
-        # TODO: why do we need to check?
-        order_by = (
-            parse_results["order_by"].asList() if "order_by" in parse_results else None
+        sobjects = self._scan(
+            sobject, where_predicate, order_by, include_deleted, stop, offset=offset
         )
-        sobjects = self.get_sobjects(sobject, include_deleted=include_deleted)
 
-        records = list()
+        relationships = resolve_parent_relationships(parent_fields, self)
+        child_relationships = resolve_child_relationships(
+            parsed_query.subqueries, sobject, self
+        )
 
-        if order_by:
-            sort_by_order_by_clause(sobjects, order_by)
+        # the children of every batch are grouped by their parents once
+        children_by_relationship = dict()
+
+        def project(sobjects: List[dict]) -> List[dict]:
+            records = self._project(sobjects, fields, relationships)
+            if child_relationships:
+                add_child_relationship_records(
+                    sobjects,
+                    records,
+                    child_relationships,
+                    self,
+                    include_deleted=include_deleted,
+                    children_by_relationship=children_by_relationship,
+                )
+            return records
+
+        return sobjects, project
+
+    def _insert(self, sobject_name: str, sobject: dict) -> str:
+        # the table stores its own copy of the record, which is what gets indexed
+        sobject = self.data.writable(sobject_name).insert(sobject)
+        self.indexes.add(sobject_name, sobject)
+        self._journal(self._undo_create, sobject_name, sobject["Id"])
+        return sobject["Id"]
 
-        for sobject in sobjects:
-            passes = filter_by_where_clause(sobject, where)
-            if not passes:
-                continue
+    def _find_sobject_name(self, parsed_sobject: str) -> str:
+        sobject = None
+        # copied, since another thread may create a table in the meantime
+        for sobject_name in list(self.data):
+            if sobject_name.lower() == parsed_sobject.lower():
+                sobject = sobject_name
 
-            record = {field: sobject.get(field) for field in fields}
+        # TODO: throw some Salesforce error about the object not existing?
+        assert (
+            sobject
+        ), f"{parsed_sobject} not present in the virtual Salesforce objects"
+        return sobject
+
+    def _scan(
+        self,
+        sobject_name: str,
+        where_predicate: WherePredicate,
+        order_by: Optional[Tuple[OrderingTerm, ...]],
+        include_deleted: bool,
+        stop: Optional[int],
+        offset: int = 0,
+    ) -> Iterable[dict]:
+        """
+        Returns the records passing the where clause, sorted by the order by clause,
+        from the `offset`th one up to the `stop`th one
+        """
+        table = self.data[sobject_name]
+        if table.vectorized:
+            return table.select(
+                where_predicate,
+                order_by,
+                include_deleted=include_deleted,
+                limit=stop,
+                offset=offset,
+            )
 
-            if parent_fields:
-                add_parent_object_attributes(sobject, record, parent_fields, self)
+        sobjects = plan_candidates(
+            self, sobject_name, where_predicate, include_deleted=include_deleted
+        )
+        sobjects = filter(where_predicate, sobjects)
 
-            records.append(record)
+        if order_by:
+            # only the rows which survive offset and limit need to be sorted
+            sobjects = sort_by_order_by_clause(sobjects, order_by, limit=stop)
+        return islice(sobjects, offset, stop)
 
-        # negative limit and offset values are invalid in soql.  
-        if offset:
-            offset: int = offset[0]
-            assert offset > -1, "SOQL offset must be a non-negative value"
-            records = records[offset:]
+    def _project(
+        self, sobjects: List[dict], fields: List[str], relationships: list
+    ) -> List[dict]:
+        records = [
+            {field: sobject.get(field) for field in fields} for sobject in sobjects
+        ]
 
-        if limit:
-            limit: int = limit[0]
-            assert limit > -1, "Limit must be a non-negative value"
-            records = records[:limit]
+        if relationships:
+            add_parent_object_attributes(sobjects, records, relationships, self)
 
         return records
 
     # CRUD
 
     def get(self, sobject_name: str, record_id: str):
-        for sobject in self.get_sobjects(sobject_name):
-            if sobject["Id"] == record_id:
-                return sobject
-        raise AssertionError(f"Could not find {record_id} in {sobject_name}s")
+        with self.locks.reading(sobject_name):
+            return self._get(sobject_name, record_id)
 
     def get_by_custom_id(self, sobject_name: str, record_id: str, custom_id_field: str):
-        for sobject in self.get_sobjects(sobject_name):
-            if sobject.get(custom_id_field) == record_id:
-                return sobject
-        raise AssertionError(f"Could not find {record_id} in {sobject_name}s")
+        with self.locks.reading(sobject_name):
+            sobject = self._lookup(sobject_name, custom_id_field, record_id)
+        if sobject is None:
+            raise AssertionError(f"Could not find {record_id} in {sobject_name}s")
+        return sobject
 
     def update(self, sobject_name: str, record_id: str, data: dict, url: str = None):
         self._check_for_salesforce_resource(url, sobject_name)
-        sobjects = self.get_sobjects(sobject_name)
-        original, index = find_object_and_index(
-            sobjects,
-            "Id",
-            record_id,
-        )
-        assert index is not None, f"Could not find {record_id} in {sobject_name}s"
+        # related records are looked up before the sobject is locked for writing,
+        # so that a thread never holds a write lock while waiting on another lock
         normalized_sobject = self._normalize_relation_via_external_id_field(data)
         sobject = self._update_datetime_fields(normalized_sobject)
-        self.data[sobject_name][index] = {
-            **original,
-            **sobject,
-        }
+        with self.locks.writing(sobject_name):
+            self._update(sobject_name, record_id, sobject)
 
     def upsert(self, sobject_name: str, record_id: str, sobject: dict, upsert_key: str):
-        sobjects = self.get_sobjects(sobject_name)
-        _, index = find_object_and_index(
-            sobjects,
-            upsert_key,
-            record_id,
-        )
-
         # if this is a single object upsert, SFDC doesn't let you push the upsert key's value
         # up with the JSON. To mimic the server behavior, we need to explicitly add it here
         # even if it's not in the payload
         sobject[upsert_key] = record_id
+        normalized_sobject = self._normalize_relation_via_external_id_field(sobject)
 
-        if index is None:
-            return self.create(sobject_name, sobject), True
-        else:
-            sfdc_id = sobjects[index]["Id"]
-            self.update(sobject_name, sfdc_id, sobject)
+        # looked up and written under the same lock, so that concurrent upserts
+        # of the same external id never create it twice
+        with self.locks.writing(sobject_name):
+            existing = self._lookup(sobject_name, upsert_key, record_id)
+            if existing is None:
+                sobject = self._add_system_fields(normalized_sobject)
+                return self._insert(sobject_name, sobject), True
+            sfdc_id = existing["Id"]
+            sobject = self._update_datetime_fields(normalized_sobject)
+            self._update(sobject_name, sfdc_id, sobject)
             return sfdc_id, False
 
     def create(self, sobject_name: str, sobject: dict):
         normalized_sobject = self._normalize_relation_via_external_id_field(sobject)
         sobject = self._add_system_fields(normalized_sobject)
-        self.data[sobject_name].append(sobject)
-        return sobject["Id"]
+        with self.locks.writing(sobject_name):
+            return self._insert(sobject_name, sobject)
 
     def delete(self, sobject_name: str, record_id: str, url: str = None):
         self._check_for_salesforce_resource(url, sobject_name)
-        index = None
-        sobjects = self.get_sobjects(sobject_name)
-        for idx, object_ in enumerate(sobjects):
-            if object_["Id"] == record_id:
-                index = idx
+        with self.locks.writing(sobject_name):
+            sobject = self._get(sobject_name, record_id)
+            self._mark_as_deleted(sobject_name, sobject)
+
+    def _get(self, sobject_name: str, record_id: str):
+        sobject = self.data[sobject_name].get(record_id)
+        if sobject is None:
+            raise AssertionError(f"Could not find {record_id} in {sobject_name}s")
+        return sobject
+
+    def _update(self, sobject_name: str, record_id: str, sobject: dict):
+        original = self._get(sobject_name, record_id)
+        # update in place so the indexes keep pointing at the stored record
+        original = self.data.writable(sobject_name).writable(original)
+        self._journal(self._undo_update, sobject_name, record_id, dict(original))
+        self.indexes.remove(sobject_name, original)
+        original.update(sobject)
+        self.indexes.add(sobject_name, original)
+
+    def declare_index(self, sobject_name: str, field: str, ordered: bool = False):
+        """
+        Declares a secondary index ahead of time, e.g., on an external id field.
+        Declared indexes survive calls to `provision`; any other (sobject, field)
+        pair is indexed lazily the first time it's used for a lookup
+
+        Ordered indexes can also serve range conditions in where clauses
+        """
+        with self.locks.writing(sobject_name):
+            self.indexes.declare(sobject_name, field, ordered=ordered)
+
+    def drop_index(self, sobject_name: str, field: str):
+        with self.locks.writing(sobject_name):
+            self.indexes.drop(sobject_name, field)
+
+    def declare_field_type(self, sobject_name: str, field: str, field_type: str):
+        """
+        Declares the type a field's values are coerced to when they're written,
+        i.e., string, date, datetime or decimal. Declared types survive calls to
+        `provision`; any other field's type is inferred from its values
+
+        Useful for values whose type can't be inferred, e.g., decimals sent as
+        strings, or shouldn't be, e.g., a text field which happens to hold dates
+        """
+        assert (
+            field_type in FIELD_TYPES
+        ), f"{field_type} is not one of {', '.join(FIELD_TYPES)}"
+        with self.locks.writing(sobject_name):
+            self.field_types[sobject_name][field] = field_type
+            self.data.writable(sobject_name).retype(field)
+            self.indexes.reindex(sobject_name, field)
+
+    # fixtures
+
+    def load_fixture(self, sobject_name: str, path: FixturePath) -> int:
+        """
+        Streams the records of an NDJSON or Data Loader-style CSV file into the
+        virtual instance, in a single pass, and returns how many there were
 
-        assert index is not None, f"Could not found {record_id} in {sobject_name}s"
+        Unlike creating them one by one, relations pushed via an external key are
+        resolved to their lookup field and related object once per file rather
+        than once per record. Records may hold their own system fields, e.g., Ids
+        exported from a real org, which are kept
+        """
+        with self.locks.exclusive():
+            resolve = self._reference_resolver()
+            count = 0
+            for sobject in read_fixture(path):
+                sobject = resolve(sobject)
+                sobject = {**self._add_system_fields(dict()), **sobject}
+                self._insert(sobject_name, sobject)
+                count += 1
+            return count
+
+    def load_fixtures(
+        self, fixtures: Dict[str, FixturePath], cache_path: FixturePath = None
+    ):
+        """
+        Starts the virtual instance from scratch, with the records of the given
+        fixtures, keyed by sobject name, which are loaded in order, so that records
+        can relate to the ones of the fixtures before them
+
+        If a cache path is given, the loaded records are pickled there, and later
+        loads unpickle them instead, as long as none of the fixtures were modified.
+        Processes sharing the cache, e.g., pytest-xdist workers, take turns through
+        a lock file, so that the first one loads the fixtures while the others
+        wait to unpickle them
+        """
+        with self.locks.exclusive():
+            if cache_path is None:
+                self._load_fixtures(fixtures)
+                return
 
-        sobject = sobjects[index]
-        self._mark_as_deleted(sobject)
+            key = fixture_cache_key(
+                fixtures, self.storage_engine, self.field_types, self.relations_file
+            )
+            if self._restore_fixture_cache(cache_path, key):
+                return
+            with fixture_cache_lock(cache_path):
+                # another process may have written the cache while this one
+                # waited for the lock
+                if self._restore_fixture_cache(cache_path, key):
+                    return
+                self._load_fixtures(fixtures)
+                # indexes are rebuilt lazily rather than pickled
+                snapshot = Snapshot(
+                    storage_engine=self.storage_engine,
+                    tables=dict(self.data),
+                    indexes=dict(),
+                    jobs=dict(),
+                    batches=dict(),
+                    batch_data=dict(),
+                )
+                write_fixture_cache(cache_path, key, snapshot)
+
+    def _restore_fixture_cache(self, cache_path: FixturePath, key: tuple) -> bool:
+        snapshot = read_fixture_cache(cache_path, key)
+        if snapshot is None:
+            return False
+        for sobject_name, table in snapshot.tables.items():
+            table.use_field_types(self.field_types[sobject_name])
+        self.restore(snapshot)
+        return True
+
+    def _load_fixtures(self, fixtures: Dict[str, FixturePath]):
+        self.provision()
+        for sobject_name, path in fixtures.items():
+            self.load_fixture(sobject_name, path)
+
+    def _reference_resolver(self) -> Callable[[dict], dict]:
+        """
+        Returns a function normalizing relations pushed via an external key, like
+        _normalize_relation_via_external_id_field does, except that each relation
+        is resolved to its lookup field and related object only once, and the
+        related records are looked up in the index of their external id field
+        """
+        # relation -> (lookup field, related object), or None if it isn't one
+        references = dict()
+
+        def resolve(sobject: dict) -> dict:
+            normalized = dict()
+            for key, value in sobject.items():
+                if not (key.endswith("__r") or type(value) == dict):
+                    normalized[key] = value
+                    continue
+                if key not in references:
+                    references[key] = self._resolve_reference(key, value)
+                reference = references[key]
+                if reference is None:
+                    # e.g., BillingAddress
+                    normalized[key] = value
+                    continue
+                if value is None:
+                    # a null relation
+                    continue
+
+                lookup_field, related_object_name = reference
+                for external_id_field, external_id in value.items():
+                    index = self.indexes.get_index(
+                        related_object_name, external_id_field
+                    )
+                    field_type = self.field_types[related_object_name].get(
+                        external_id_field
+                    )
+                    related_object = index.first(to_native(external_id, field_type))
+                    if related_object is None:
+                        raise AssertionError(
+                            f"Could not find {external_id} in {related_object_name}s"
+                        )
+                    normalized[lookup_field] = related_object["Id"]
+            return normalized
+
+        return resolve
 
     # bulk stuff
 
     def create_job(self, job: dict):
         job_id = self._generate_sfdc_id()
         job = {**job, "id": job_id}
-        self.jobs[job_id] = job
+        with self.locks.writing_jobs():
+            self.jobs[job_id] = job
+            self._journal(self.jobs.pop, job_id)
         return job
 
     def create_batch(self, job_id: str, data: dict, operation: str):
@@ -209,8 +706,10 @@ class VirtualSalesforce:
             "id": batch_id,
             "jobId": job_id,
         }
-        self.batches[batch_id] = batch
-        self.batch_data[batch_id] = data
+        with self.locks.writing_jobs():
+            self.batches[batch_id] = batch
+            self.batch_data[batch_id] = data
+            self._journal(self._undo_create_batch, batch_id)
         return batch
 
     # utils
@@ -218,11 +717,23 @@ class VirtualSalesforce:
     def get_sobjects(self, sobject_name: str, include_deleted: bool = False):
         """
         Returns the objects currently loaded into the virtual instance
+
+        This is a view over the stored records, not a copy
         """
-        sobjects = self.data[sobject_name]
-        if include_deleted:
-            return sobjects
-        return [sobject for sobject in sobjects if not sobject["IsDeleted"]]
+        return self.data[sobject_name].records(include_deleted=include_deleted)
+
+    def _engine_index(
+        self, sobject_name: str, field: str, ordered: bool
+    ) -> Optional[SQLiteFieldIndex]:
+        # sqlite tables are indexed by the database, rather than in Python
+        if self.storage_engine != SQLITE:
+            return None
+        return SQLiteFieldIndex(lambda: self.data.get(sobject_name), field)
+
+    def _lookup(self, sobject_name: str, field: str, value):
+        # indexes are keyed by native values, so the value has to be coerced the same way
+        native = to_native(value, self.field_types[sobject_name].get(field))
+        return self.indexes.lookup(sobject_name, field, native)
 
     def _normalize_relation_via_external_id_field(self, sobject: dict):
         """
@@ -233,55 +744,58 @@ class VirtualSalesforce:
         """
         normalized = dict()
         for key, value in sobject.items():
-            if key.endswith("__r"):
-                # We assume there's only one key in this dict
-                for external_id_field, external_id in value.items():
-                    relational_field_name = self._related_object_name_to_object_name(
-                        key
-                    )
-                    # if the related object name can't be inferred from the field name
-                    # check the manually specified mapping
-                    if key in self.relations_file:
-                        related_object_name = self.relations_file[key]
-                    # o/w infer it automatically
-                    else:
-                        related_object_name = relational_field_name
-                    # If this is a standard object, we have to pop-off the __c
-                    # A little dirty for sure, especially since we overwrite relational_field_name
-                    standard_object_name = related_object_name.replace("__c", "")
-                    if (
-                        related_object_name not in self.data
-                        and standard_object_name in self.data
-                    ):
-                        related_object_name = standard_object_name
-                        relational_field_name = standard_object_name
-                    related_object = self.get_by_custom_id(
-                        related_object_name, external_id, external_id_field
-                    )
-                    normalized[relational_field_name] = related_object["Id"]
-            # this may be a standard, Salesforce relation, such as "Order": {"OrderId__c": order_id}, on OrderItem
-            # BillingAddress is a built-in Salesforce field that comes back from the API as a dictionary
-            elif type(value) == dict and key != "BillingAddress":
-                # check if we're not using a real sobject name,
-                # and instead need to refer to the relations.json file for cases
-                # where an sobject name can't be derived from a look up's field name
-                if key not in self.data:
-                    related_object_name = self.relations_file[key]
-                    lookup_field_prefix = key
-                else:
-                    related_object_name = key
-                    lookup_field_prefix = key
-
-                for external_id_field, external_id in value.items():
-                    related_object = self.get_by_custom_id(
-                        related_object_name, external_id, external_id_field
-                    )
-                    # and in the above case, the lookup field is OrderId
-                    normalized[f"{lookup_field_prefix}Id"] = related_object["Id"]
-            else:
+            reference = self._resolve_reference(key, value)
+            if reference is None:
                 normalized[key] = value
+                continue
+            lookup_field, related_object_name = reference
+            # We assume there's only one key in this dict
+            for external_id_field, external_id in value.items():
+                related_object = self.get_by_custom_id(
+                    related_object_name, external_id, external_id_field
+                )
+                normalized[lookup_field] = related_object["Id"]
         return normalized
 
+    def _resolve_reference(self, key: str, value) -> Optional[Tuple[str, str]]:
+        """
+        Returns the lookup field and the related object of a relation pushed via an
+        external key, e.g., Company__r: {"External_ID__c": "1"}, or None if the
+        field isn't one
+        """
+        if key.endswith("__r"):
+            relational_field_name = self._related_object_name_to_object_name(key)
+            # if the related object name can't be inferred from the field name
+            # check the manually specified mapping
+            if key in self.relations_file:
+                related_object_name = self.relations_file[key]
+            # o/w infer it automatically
+            else:
+                related_object_name = relational_field_name
+            # If this is a standard object, we have to pop-off the __c
+            # A little dirty for sure, especially since we overwrite relational_field_name
+            standard_object_name = related_object_name.replace("__c", "")
+            if (
+                related_object_name not in self.data
+                and standard_object_name in self.data
+            ):
+                related_object_name = standard_object_name
+                relational_field_name = standard_object_name
+            return relational_field_name, related_object_name
+        # this may be a standard, Salesforce relation, such as "Order": {"OrderId__c": order_id}, on OrderItem
+        # BillingAddress is a built-in Salesforce field that comes back from the API as a dictionary
+        if type(value) == dict and key != "BillingAddress":
+            # check if we're not using a real sobject name,
+            # and instead need to refer to the relations.json file for cases
+            # where an sobject name can't be derived from a look up's field name
+            if key not in self.data:
+                related_object_name = self.relations_file[key]
+            else:
+                related_object_name = key
+            # and in the above case, the lookup field is OrderId
+            return f"{key}Id", related_object_name
+        return None
+
     @staticmethod
     def _related_object_name_to_object_name(related_object_name: str):
         return related_object_name.replace("__r", "__c")
@@ -312,10 +826,49 @@ class VirtualSalesforce:
             "LastModifiedDate": current_datetime,
         }
 
-    @staticmethod
-    def _mark_as_deleted(sobject: dict):
+    def _mark_as_deleted(self, sobject_name: str, sobject: dict):
+        table = self.data.writable(sobject_name)
+        sobject = table.writable(sobject)
+        self._journal(self._undo_delete, sobject_name, sobject["Id"], dict(sobject))
+        self.indexes.remove(sobject_name, sobject)
         sobject["IsDeleted"] = True
         sobject["LastModifiedDate"] = datetime.datetime.now().isoformat()
+        table.bury(sobject)
+
+    # journal
+
+    def _journal(self, undo: Callable, *args):
+        if self.journal is not None:
+            self.journal.append(partial(undo, *args))
+
+    def _restart_journal(self):
+        # the entries refer to records which are gone
+        if self.journal is not None:
+            self.journal = list()
+
+    def _undo_create(self, sobject_name: str, record_id: str):
+        table = self.data.writable(sobject_name)
+        sobject = table.get(record_id)
+        self.indexes.remove(sobject_name, sobject)
+        table.remove(sobject)
+
+    def _undo_update(self, sobject_name: str, record_id: str, previous: dict):
+        table = self.data.writable(sobject_name)
+        sobject = table.writable(table.get(record_id))
+        self.indexes.remove(sobject_name, sobject)
+        _overwrite(sobject, previous)
+        self.indexes.add(sobject_name, sobject)
+
+    def _undo_delete(self, sobject_name: str, record_id: str, previous: dict):
+        table = self.data.writable(sobject_name)
+        sobject = table.writable(table.get(record_id, include_deleted=True))
+        _overwrite(sobject, previous)
+        table.unbury(sobject)
+        self.indexes.add(sobject_name, sobject)
+
+    def _undo_create_batch(self, batch_id: str):
+        del self.batches[batch_id]
+        del self.batch_data[batch_id]
 
     @staticmethod
     def _generate_sfdc_id():
@@ -336,4 +889,14 @@ class VirtualSalesforce:
             )
 
 
+def _no_records(sobjects: List[dict]) -> List[dict]:
+    return list()
+
+
+def _overwrite(sobject: dict, values: dict):
+    for field in [field for field in sobject if field not in values]:
+        del sobject[field]
+    sobject.update(values)
+
+
 virtual_salesforce = VirtualSalesforce()
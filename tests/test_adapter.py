@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+import responses
+
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceResourceNotFound
+
+from simple_mockforce import mock_salesforce_adapter
+from simple_mockforce.adapter import salesforce_adapter
+from tests.utils import MOCK_CREDS
+
+
+@mock_salesforce_adapter
+def test_adapter_mocks_the_api():
+    salesforce = Salesforce(**MOCK_CREDS)
+    assert salesforce.session.get_adapter(salesforce.base_url) is salesforce_adapter
+
+    contact_id = salesforce.Contact.create({"LastName": "Smith"})["id"]
+    salesforce.Contact.update(contact_id, {"FirstName": "John"})
+    salesforce.Contact.upsert("External_Id__c/123", {"LastName": "Doe"})
+    assert salesforce.Contact.get(contact_id)["FirstName"] == "John"
+    assert salesforce.Contact.get_by_custom_id("External_Id__c", "123")["LastName"] == (
+        "Doe"
+    )
+
+    salesforce.bulk.Contact.insert([{"LastName": str(i)} for i in range(5)])
+    result = salesforce.query(
+        "SELECT LastName FROM Contact", headers={"Sforce-Query-Options": "batchSize=2"}
+    )
+    assert not result["done"]
+    assert len(salesforce.query_all("SELECT LastName FROM Contact")["records"]) == 7
+
+    salesforce.Contact.delete(contact_id)
+    with pytest.raises(SalesforceResourceNotFound):
+        salesforce.Contact.get(contact_id)
+
+    # responses is left alone
+    assert not responses.mock.registered()
+
+
+@mock_salesforce_adapter
+def test_adapter_mounts_on_given_sessions():
+    session = requests.Session()
+    salesforce = Salesforce(**MOCK_CREDS, session=session)
+    assert salesforce.session is session
+    salesforce.Account.create({"Name": "Google"})
+    assert salesforce.query("SELECT Name FROM Account")["totalSize"] == 1
+
+
+@responses.activate
+def test_adapter_leaves_other_calls_alone():
+    responses.add(
+        responses.GET,
+        "https://mock.salesforce.com/services/apexrest/Hello",
+        json={"hello": "world"},
+    )
+
+    @mock_salesforce_adapter
+    def scenario():
+        salesforce = Salesforce(**MOCK_CREDS)
+        assert salesforce.apexecute("Hello", method="GET") == {"hello": "world"}
+        return salesforce
+
+    salesforce = scenario()
+    # sessions which outlive their scenario aren't mocked anymore
+    with pytest.raises(requests.ConnectionError):
+        salesforce.Account.create({"Name": "Google"})
+
+
+def test_adapter_isolates_fresh_orgs():
+    @mock_salesforce_adapter(fresh=True)
+    def scenario(i: int):
+        salesforce = Salesforce(**MOCK_CREDS)
+        for j in range(5):
+            salesforce.Account.create({"Name": f"Account {i}-{j}"})
+        return salesforce.query("SELECT COUNT() FROM Account")["totalSize"]
+
+    init = Salesforce.__init__
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(scenario, range(8))) == [5] * 8
+    assert Salesforce.__init__ is init
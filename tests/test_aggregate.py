@@ -0,0 +1,203 @@
+import pytest
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.soql import parse_soql
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+AGGREGATE_RESULT = {"type": "AggregateResult"}
+
+
+def _create_opportunities(salesforce):
+    for name, stage, amount, close_date in (
+        ("Big deal", "Closed Won", 1000.5, "2021-12-03"),
+        ("Small deal", "Closed Won", 10, "2022-01-15"),
+        ("Lost deal", "Closed Lost", 500, "2022-01-20"),
+        ("Maybe deal", "Prospecting", None, "2022-02-01"),
+    ):
+        salesforce.Opportunity.create(
+            {
+                "Name": name,
+                "StageName": stage,
+                "Amount": amount,
+                "CloseDate": close_date,
+            }
+        )
+
+
+def test_parse_aggregate_query():
+    parsed_query = parse_soql(
+        "SELECT StageName, COUNT(Id), SUM(Amount) total FROM Opportunity "
+        "WHERE Amount > 0 GROUP BY StageName HAVING count(Id) > 1 "
+        "ORDER BY SUM(Amount) DESC LIMIT 5"
+    )
+
+    assert parsed_query.is_aggregate
+    assert parsed_query.fields == ("StageName", "COUNT(Id)", "SUM(Amount)")
+    assert [function.alias for function in parsed_query.functions] == [None, "total"]
+    assert parsed_query.group_by == ("StageName",)
+    assert parsed_query.having == (("COUNT(Id)", ">", 1),)
+    assert parsed_query.order_by[0].field == "SUM(Amount)"
+    assert parsed_query.limit == 5
+
+    assert not parse_soql("SELECT Id, Name FROM Opportunity").is_aggregate
+
+
+@mock_salesforce
+def test_group_by_query():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    results = salesforce.query(
+        "SELECT StageName, COUNT(Id), SUM(Amount) FROM Opportunity "
+        "GROUP BY StageName ORDER BY StageName"
+    )
+
+    assert results["totalSize"] == 3
+    assert results["records"] == [
+        {
+            "attributes": AGGREGATE_RESULT,
+            "StageName": "Closed Lost",
+            "expr0": 1,
+            "expr1": 500,
+        },
+        {
+            "attributes": AGGREGATE_RESULT,
+            "StageName": "Closed Won",
+            "expr0": 2,
+            "expr1": 1010.5,
+        },
+        {
+            "attributes": AGGREGATE_RESULT,
+            "StageName": "Prospecting",
+            "expr0": 1,
+            "expr1": None,
+        },
+    ]
+
+
+@mock_salesforce
+def test_aggregate_query_without_group_by():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    records = salesforce.query(
+        "SELECT COUNT(Id) total, COUNT(Amount), COUNT_DISTINCT(StageName), "
+        "AVG(Amount), MIN(CloseDate), MAX(Amount) FROM Opportunity"
+    )["records"]
+    assert records == [
+        {
+            "attributes": AGGREGATE_RESULT,
+            "total": 4,
+            "expr0": 3,
+            "expr1": 3,
+            "expr2": 503.5,
+            "expr3": "2021-12-03",
+            "expr4": 1000.5,
+        }
+    ]
+
+    # like Salesforce, there's always a single group, even without any records
+    records = salesforce.query(
+        "SELECT COUNT(Id), SUM(Amount) FROM Opportunity WHERE StageName = 'Nope'"
+    )["records"]
+    assert records == [{"attributes": AGGREGATE_RESULT, "expr0": 0, "expr1": None}]
+
+
+@mock_salesforce
+def test_aggregate_query_with_having_and_order_by_alias():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    records = salesforce.query(
+        "SELECT StageName, SUM(Amount) total FROM Opportunity "
+        "GROUP BY StageName HAVING COUNT(Id) > 1 OR total < 600.5 "
+        "ORDER BY total DESC"
+    )["records"]
+
+    assert [(record["StageName"], record["total"]) for record in records] == [
+        ("Closed Won", 1010.5),
+        ("Closed Lost", 500),
+    ]
+
+
+@mock_salesforce
+def test_group_by_calendar_functions():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    records = salesforce.query(
+        "SELECT CALENDAR_YEAR(CloseDate), CALENDAR_MONTH(CloseDate), COUNT(Id) "
+        "FROM Opportunity GROUP BY CALENDAR_YEAR(CloseDate), CALENDAR_MONTH(CloseDate) "
+        "ORDER BY CALENDAR_YEAR(CloseDate), CALENDAR_MONTH(CloseDate) LIMIT 2"
+    )["records"]
+
+    assert [
+        (record["expr0"], record["expr1"], record["expr2"]) for record in records
+    ] == [
+        (2021, 12, 1),
+        (2022, 1, 2),
+    ]
+
+
+@mock_salesforce
+def test_aggregate_query_aggregates_without_collecting_records():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    results = virtual_salesforce.iter_query(
+        "SELECT StageName, COUNT(Id) FROM Opportunity WHERE Amount != null "
+        "GROUP BY StageName"
+    )
+    assert {record["StageName"]: record["expr0"] for record in results} == {
+        "Closed Won": 2,
+        "Closed Lost": 1,
+    }
+
+
+@mock_salesforce
+def test_ungrouped_field_in_aggregate_query():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    with pytest.raises(AssertionError):
+        virtual_salesforce.query(
+            "SELECT Name, COUNT(Id) FROM Opportunity GROUP BY StageName"
+        )
+
+
+@mock_salesforce
+def test_count_query():
+    salesforce = Salesforce(**MOCK_CREDS)
+    _create_opportunities(salesforce)
+
+    results = salesforce.query("SELECT COUNT() FROM Opportunity")
+    assert results["totalSize"] == 4
+    assert results["records"] == []
+    assert results["done"]
+
+    query = "SELECT COUNT() FROM Opportunity WHERE StageName = 'Closed Won'"
+    assert salesforce.query(query)["totalSize"] == 2
+    virtual_salesforce.declare_index("Opportunity", "StageName")
+    assert salesforce.query(query)["totalSize"] == 2
+    assert virtual_salesforce.count(query) == 2
+    assert virtual_salesforce.query(query) == []
+
+    results = salesforce.query(
+        "SELECT COUNT() FROM Opportunity WHERE Amount > 100 LIMIT 1"
+    )
+    assert results["totalSize"] == 1
+    assert results["records"] == []
+    virtual_salesforce.drop_index("Opportunity", "StageName")
+
+    for i in range(8):
+        virtual_salesforce.create("Opportunity", {"Name": str(i)})
+    # 12 opportunities altogether
+    assert virtual_salesforce.count("SELECT COUNT() FROM Opportunity OFFSET 5") == 7
+    query = "SELECT COUNT() FROM Opportunity LIMIT 10 OFFSET 5"
+    assert virtual_salesforce.count(query) == 7
+    assert salesforce.query(query)["totalSize"] == 7
+    query = "SELECT COUNT() FROM Opportunity LIMIT 10 OFFSET 20"
+    assert virtual_salesforce.count(query) == 0
@@ -0,0 +1,106 @@
+import datetime
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from simple_mockforce.columnar import (
+    DATETIME,
+    NUMBER,
+    OBJECT,
+    ColumnarRecord,
+    ColumnarSObjectTable,
+)
+from simple_mockforce.storage import COLUMNAR, ROWS
+from simple_mockforce.virtual import VirtualSalesforce
+
+QUERIES = [
+    "SELECT Name, Amount FROM Opportunity ORDER BY Amount DESC, Name",
+    "SELECT Name FROM Opportunity WHERE Amount > 500 ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Amount = 0.5 OR Amount = null ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Amount != 100 ORDER BY Name DESC LIMIT 7",
+    "SELECT Name FROM Opportunity WHERE Stage__c IN ('Won', 'Lost') AND IsWon__c = true ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Stage__c != 'Won' ORDER BY Stage__c NULLS LAST, Name",
+    "SELECT Name FROM Opportunity WHERE CloseDate__c >= 2022-06-15 ORDER BY CloseDate__c, Name",
+    "SELECT Name FROM Opportunity WHERE CloseDate__c = THIS_MONTH ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE LastActivity__c < 2022-06-15T12:00:00Z ORDER BY LastActivity__c DESC, Name",
+    "SELECT Name FROM Opportunity WHERE Mixed__c = 'one' OR Mixed__c = 1 ORDER BY Name",
+    "SELECT Name FROM Opportunity ORDER BY Name LIMIT 5 OFFSET 10",
+]
+
+
+def _seed(virtual_salesforce: VirtualSalesforce):
+    rng = random.Random(42)
+    for i in range(200):
+        record = {
+            "Name": f"Opportunity {i:03}",
+            "Amount": rng.choice([None, 0.5, 100, 250.25, 1000, rng.randint(0, 2000)]),
+            "Stage__c": rng.choice([None, "Won", "Lost", "Open"]),
+            "IsWon__c": rng.choice([True, False]),
+            "CloseDate__c": rng.choice(
+                [None, datetime.date.today().isoformat(), "2022-06-01", "2022-06-30"]
+            ),
+            "LastActivity__c": rng.choice(
+                ["2022-06-15T10:00:00.000+0000", "2022-06-15T13:00:00.000+0200"]
+            ),
+            "Mixed__c": rng.choice(["one", 1, None]),
+        }
+        # not every record has every field
+        del record[rng.choice(list(record.keys())[1:])]
+        virtual_salesforce.create("Opportunity", record)
+
+
+@pytest.fixture(scope="module")
+def orgs():
+    rows = VirtualSalesforce(storage_engine=ROWS)
+    columnar = VirtualSalesforce(storage_engine=COLUMNAR)
+    _seed(rows)
+    _seed(columnar)
+    return rows, columnar
+
+
+@pytest.mark.parametrize("soql", QUERIES)
+def test_columnar_engine_matches_rows_engine(orgs, soql):
+    rows, columnar = orgs
+    assert columnar.query(soql) == rows.query(soql)
+
+
+def test_columnar_engine_falls_back_on_values_it_cannot_order(orgs):
+    soql = "SELECT Name FROM Opportunity ORDER BY Mixed__c, Name"
+    for virtual_salesforce in orgs:
+        with pytest.raises(TypeError):
+            virtual_salesforce.query(soql)
+
+
+def test_columnar_engine_writes_through_records():
+    virtual_salesforce = VirtualSalesforce(storage_engine=COLUMNAR)
+    record_id = virtual_salesforce.create("Account", {"Name": "Google"})
+
+    virtual_salesforce.update("Account", record_id, {"Website": "google.com"})
+    account = virtual_salesforce.get("Account", record_id)
+    assert isinstance(account, ColumnarRecord)
+    assert account["Name"] == "Google"
+    assert account["Website"] == "google.com"
+
+    virtual_salesforce.delete("Account", record_id)
+    assert virtual_salesforce.query("SELECT Name FROM Account") == []
+    assert virtual_salesforce.query(
+        "SELECT Name, IsDeleted FROM Account", include_deleted=True
+    ) == [{"Name": "Google", "IsDeleted": True}]
+
+
+def test_columns_hold_objects_once_kinds_are_mixed():
+    table = ColumnarSObjectTable()
+    first = table.insert({"Id": "1", "Value__c": 10, "When__c": "2022-06-15T10:00:00Z"})
+    assert table.columns["Value__c"].kind == NUMBER
+    assert table.columns["When__c"].kind == DATETIME
+
+    table.insert({"Id": "2", "Value__c": "ten"})
+    assert table.columns["Value__c"].kind == OBJECT
+    assert first.native("Value__c") == 10
+    assert dict(first) == {
+        "Id": "1",
+        "Value__c": 10,
+        "When__c": "2022-06-15T10:00:00Z",
+    }
@@ -0,0 +1,170 @@
+import sys
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from simple_mockforce.locks import ReadWriteLock
+from simple_mockforce.virtual import VirtualSalesforce
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    # switches threads far more often than usual, to shake out races
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(switch_interval)
+
+
+def _run(function, count: int):
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(function, range(count)))
+
+
+def test_concurrent_creates():
+    virtual = VirtualSalesforce()
+    virtual.declare_index("Contact", "Email")
+
+    def create(i: int):
+        sobject_name = "Contact" if i % 2 else "Lead"
+        return virtual.create(sobject_name, {"LastName": str(i), "Email": f"{i}@x.com"})
+
+    record_ids = _run(create, 400)
+
+    assert len(set(record_ids)) == 400
+    assert virtual.count("SELECT COUNT() FROM Contact") == 200
+    assert virtual.count("SELECT COUNT() FROM Lead") == 200
+    assert virtual.get_by_custom_id("Contact", "7@x.com", "Email")["LastName"] == "7"
+
+
+def test_concurrent_upserts_create_each_external_id_once():
+    virtual = VirtualSalesforce()
+    virtual.declare_index("Account", "External_ID__c")
+
+    def upsert(i: int):
+        return virtual.upsert(
+            "Account", str(i % 10), {"Name": f"Account {i}"}, "External_ID__c"
+        )
+
+    results = _run(upsert, 200)
+
+    assert sum(created for _, created in results) == 10
+    assert virtual.count("SELECT COUNT() FROM Account") == 10
+    assert len({record_id for record_id, _ in results}) == 10
+
+
+def test_concurrent_reads_and_writes():
+    virtual = VirtualSalesforce()
+    account_ids = [
+        virtual.create("Account", {"Name": f"Account {i}", "Rank__c": i})
+        for i in range(20)
+    ]
+    # queries raise if no record of their sobject was ever created
+    virtual.create("Contact", {"LastName": "First", "AccountId": account_ids[0]})
+
+    def work(i: int):
+        account_id = account_ids[i % 20]
+        if i % 4 == 0:
+            virtual.update("Account", account_id, {"Rank__c": i})
+        elif i % 4 == 1:
+            virtual.create("Contact", {"LastName": str(i), "AccountId": account_id})
+        elif i % 4 == 2:
+            contacts = virtual.query(
+                "SELECT LastName, Account.Name FROM Contact ORDER BY LastName"
+            )
+            assert all(contact["Account"] for contact in contacts)
+        else:
+            accounts = virtual.query(
+                "SELECT Name, (SELECT LastName FROM Contacts) FROM Account "
+                "WHERE Rank__c >= 0"
+            )
+            assert len(accounts) == 20
+
+    _run(work, 400)
+
+    assert virtual.count("SELECT COUNT() FROM Contact") == 101
+
+
+def test_iterated_queries_hold_no_locks_in_between_records():
+    virtual = VirtualSalesforce()
+    for i in range(10):
+        virtual.create("Account", {"Name": f"Account {i}"})
+
+    def create_elsewhere(name: str):
+        thread = threading.Thread(
+            target=virtual.create, args=("Account", {"Name": name}), daemon=True
+        )
+        thread.start()
+        thread.join(timeout=1)
+        assert not thread.is_alive(), "the create is waiting on the query"
+
+    records = virtual.iter_query("SELECT Name FROM Account", batch_size=2)
+    next(records)
+    create_elsewhere("Late")
+    # the records are the ones which matched when the query started
+    assert len(list(records)) == 9
+
+    # abandoned iterators may be closed on whichever thread collects them
+    records = virtual.iter_query("SELECT Name FROM Account", batch_size=2)
+    next(records)
+    closing = threading.Thread(target=records.close)
+    closing.start()
+    closing.join()
+    create_elsewhere("Later")
+    assert virtual.count("SELECT COUNT() FROM Account") == 12
+
+
+def test_concurrent_bulk_jobs():
+    virtual = VirtualSalesforce()
+    virtual.start_journal()
+    savepoint = virtual.savepoint()
+
+    def create_jobs(thread: int):
+        for i in range(50):
+            job = virtual.create_job({"object": "Account", "operation": "insert"})
+            virtual.create_batch(job["id"], [{"Name": f"{thread}-{i}"}], "insert")
+
+    _run(create_jobs, THREADS)
+
+    assert len(virtual.jobs) == len(virtual.batches) == 50 * THREADS
+    virtual.rollback_to(savepoint)
+    assert not virtual.jobs and not virtual.batches and not virtual.batch_data
+
+
+def test_read_write_lock():
+    lock = ReadWriteLock()
+    lock.acquire_read()
+    lock.acquire_read()
+    # the only reader can upgrade
+    lock.acquire_write()
+    lock.acquire_read()
+    lock.release_read()
+    lock.release_write()
+    lock.release_read()
+    lock.release_read()
+
+    readers = threading.Barrier(2)
+    upgraded = list()
+
+    def upgrade():
+        lock.acquire_read()
+        readers.wait()
+        try:
+            lock.acquire_write()
+            upgraded.append(True)
+            lock.release_write()
+        except RuntimeError:
+            upgraded.append(False)
+        lock.release_read()
+
+    threads = [threading.Thread(target=upgrade) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # two readers upgrading at once would deadlock, so one of them gives up
+    assert sorted(upgraded) == [False, True]
@@ -0,0 +1,87 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.context import current_org, drop_named_org, named_org, use_org
+from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def _names(salesforce: Salesforce):
+    records = salesforce.query("SELECT Name FROM Account ORDER BY Name")["records"]
+    return [record["Name"] for record in records]
+
+
+def test_fresh_orgs_isolate_concurrent_threads():
+    @mock_salesforce(fresh=True)
+    def scenario(i: int):
+        salesforce = Salesforce(**MOCK_CREDS)
+        for j in range(5):
+            salesforce.Account.create({"Name": f"Account {i}-{j}"})
+        assert current_org() is not virtual_salesforce
+        return _names(salesforce)
+
+    virtual_salesforce.provision()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(scenario, range(16)))
+
+    assert results == [[f"Account {i}-{j}" for j in range(5)] for i in range(16)]
+    assert "Account" not in virtual_salesforce.data
+
+
+def test_fresh_orgs_isolate_asyncio_tasks():
+    @mock_salesforce(fresh=True)
+    async def scenario(name: str):
+        salesforce = Salesforce(**MOCK_CREDS)
+        salesforce.Account.create({"Name": name})
+        # lets the other task run in between
+        await asyncio.sleep(0)
+        return _names(salesforce)
+
+    async def main():
+        return await asyncio.gather(scenario("Google"), scenario("Alphabet"))
+
+    assert asyncio.run(main()) == [["Google"], ["Alphabet"]]
+
+
+def test_named_orgs_outlive_scenarios():
+    @mock_salesforce(org="named")
+    def scenario():
+        Salesforce(**MOCK_CREDS).Account.create({"Name": "Google"})
+        return current_org()
+
+    org = scenario()
+    assert org is named_org("named")
+    assert [account["Name"] for account in org.query("SELECT Name FROM Account")] == [
+        "Google"
+    ]
+    # each scenario still starts from scratch
+    scenario()
+    assert org.count("SELECT COUNT() FROM Account") == 1
+    drop_named_org("named")
+    assert named_org("named") is not org
+
+
+def test_orgs_can_be_given_or_bound():
+    org = VirtualSalesforce()
+
+    @mock_salesforce(org=org)
+    def scenario():
+        Salesforce(**MOCK_CREDS).Account.create({"Name": "Google"})
+
+    scenario()
+    assert org.count("SELECT COUNT() FROM Account") == 1
+
+    @mock_salesforce
+    def bound_scenario():
+        # mock_salesforce binds the global org, unless told otherwise
+        assert current_org() is virtual_salesforce
+        with use_org(org):
+            Salesforce(**MOCK_CREDS).Account.create({"Name": "Alphabet"})
+
+    bound_scenario()
+    assert org.count("SELECT COUNT() FROM Account") == 2
+    assert current_org() is virtual_salesforce
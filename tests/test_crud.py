@@ -317,3 +317,27 @@ def test_crud_lifecycle_with_custom_id_and_built_in_foreign_key_with_funny_field
     assert result[child_custom_id_field] == child_custom_id
     assert result["Name"] == "Custom child"
     assert result["ParentId"] == parent_id
+
+
+@mock_salesforce
+def test_crud_lifecycle_with_many_records():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    contact_ids = [
+        salesforce.Contact.create({"LastName": f"Doe {i}"})["id"] for i in range(10)
+    ]
+
+    salesforce.Contact.update(contact_ids[3], {"LastName": "Smith"})
+    salesforce.Contact.delete(contact_ids[5])
+
+    for idx, contact_id in enumerate(contact_ids):
+        if idx == 5:
+            with pytest.raises(SalesforceResourceNotFound):
+                salesforce.Contact.get(contact_id)
+            continue
+        contact = salesforce.Contact.get(contact_id)
+        assert contact["Id"] == contact_id
+        assert contact["LastName"] == ("Smith" if idx == 3 else f"Doe {idx}")
+
+    with pytest.raises(SalesforceResourceNotFound):
+        salesforce.Contact.update(contact_ids[5], {"LastName": "Smith"})
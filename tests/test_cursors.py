@@ -0,0 +1,113 @@
+import pytest
+
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceMalformedRequest
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.cursors import (
+    DEFAULT_BATCH_SIZE,
+    QueryLocators,
+    parse_batch_size,
+)
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+BATCH_SIZE_OF_TWO = {"Sforce-Query-Options": "batchSize=2"}
+
+
+@mock_salesforce
+def test_query_pages_with_query_locators():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Contact.insert([{"LastName": str(i)} for i in range(5)])
+
+    soql = "SELECT LastName FROM Contact"
+    result = salesforce.query(soql, headers=BATCH_SIZE_OF_TWO)
+
+    assert result["totalSize"] == 5
+    assert not result["done"]
+    assert [record["LastName"] for record in result["records"]] == ["0", "1"]
+    assert result["nextRecordsUrl"].startswith(
+        f"/services/data/v{salesforce.sf_version}/query/01g"
+    )
+    assert result["nextRecordsUrl"].endswith("-2")
+
+    result = salesforce.query_more(
+        result["nextRecordsUrl"], identifier_is_url=True, headers=BATCH_SIZE_OF_TWO
+    )
+    assert result["totalSize"] == 5
+    assert [record["LastName"] for record in result["records"]] == ["2", "3"]
+
+    locator = result["nextRecordsUrl"].split("/")[-1]
+    result = salesforce.query_more(locator, headers=BATCH_SIZE_OF_TWO)
+    assert result["done"]
+    assert "nextRecordsUrl" not in result
+    assert [record["LastName"] for record in result["records"]] == ["4"]
+
+    # exhausted cursors are closed
+    assert len(virtual_salesforce.query_locators) == 0
+    with pytest.raises(SalesforceMalformedRequest):
+        salesforce.query_more(locator)
+
+
+@mock_salesforce
+def test_query_all_iter_pages_through_everything():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    results = salesforce.bulk.Contact.insert([{"LastName": str(i)} for i in range(7)])
+    salesforce.Contact.delete(results[0]["id"])
+
+    records = salesforce.query_all_iter(
+        "SELECT LastName FROM Contact ORDER BY LastName DESC",
+        headers=BATCH_SIZE_OF_TWO,
+    )
+    assert [record["LastName"] for record in records] == [
+        "6",
+        "5",
+        "4",
+        "3",
+        "2",
+        "1",
+    ]
+
+    result = salesforce.query_all(
+        "SELECT LastName FROM Contact", include_deleted=True, headers=BATCH_SIZE_OF_TWO
+    )
+    assert result["totalSize"] == 7
+
+
+@mock_salesforce
+def test_query_without_batch_size_is_a_single_page():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Contact.insert([{"LastName": str(i)} for i in range(5)])
+
+    result = salesforce.query("SELECT LastName FROM Contact")
+    assert result["done"]
+    assert len(result["records"]) == 5
+    assert len(virtual_salesforce.query_locators) == 0
+
+
+def test_parse_batch_size():
+    assert parse_batch_size(None) == DEFAULT_BATCH_SIZE
+    assert parse_batch_size("batchSize=500") == 500
+    assert parse_batch_size("foo=bar, batchSize=10") == 10
+    assert parse_batch_size("batchSize=100000") == 2000
+
+
+def test_query_locators_evict_by_ttl_and_count():
+    ids = iter(f"{i:015d}AAA" for i in range(100))
+    locators = QueryLocators(id_factory=lambda: next(ids), ttl=60, max_open=2)
+
+    first = locators.open([], lambda sobject: sobject)
+    second = locators.open([], lambda sobject: sobject)
+    third = locators.open([], lambda sobject: sobject)
+
+    with pytest.raises(KeyError):
+        locators.get(first.locator)
+    assert locators.get(second.locator) is second
+
+    third.expires_at = 0
+    with pytest.raises(KeyError):
+        locators.get(third.locator)
+    assert len(locators) == 1
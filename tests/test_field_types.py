@@ -0,0 +1,132 @@
+import datetime
+
+from decimal import Decimal
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.field_types import (
+    DATE,
+    DATETIME,
+    DECIMAL,
+    NUMBER,
+    OBJECT,
+    STRING,
+    infer_field_type,
+    kind_of,
+    to_native,
+)
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def test_infer_field_type():
+    assert infer_field_type("2022-06-03") == DATE
+    assert infer_field_type("2022-06-03T20:42:04.000+0000") == DATETIME
+    assert infer_field_type("2022-06-03T20:42:04Z") == DATETIME
+    assert infer_field_type(10.5) == DECIMAL
+    assert infer_field_type(10) is None
+    assert infer_field_type("Google") is None
+    assert infer_field_type(None) is None
+
+
+def test_to_native():
+    assert to_native("2022-06-03") == datetime.date(2022, 6, 3)
+    assert to_native("2022-06-03T20:42:04.000+0200") == datetime.datetime(
+        2022, 6, 3, 18, 42, 4, tzinfo=datetime.timezone.utc
+    )
+    # naive datetimes are assumed to be in UTC
+    assert to_native("2022-06-03T20:42:04") == datetime.datetime(
+        2022, 6, 3, 20, 42, 4, tzinfo=datetime.timezone.utc
+    )
+    assert to_native(0.1) == Decimal("0.1")
+    assert to_native("0.1", DECIMAL) == Decimal("0.1")
+    assert to_native("2022-06-03", STRING) == "2022-06-03"
+    # values which can't be coerced are left as they are
+    assert to_native("2022-13-45") == "2022-13-45"
+    assert to_native("not a number", DECIMAL) == "not a number"
+    assert to_native(True, DECIMAL) is True
+
+
+def test_kind_of():
+    assert kind_of(1) == NUMBER
+    assert kind_of(Decimal("0.1")) == NUMBER
+    assert kind_of(True) != NUMBER
+    # numbers a float can't hold exactly can only be compared as they are
+    assert kind_of(2**53 + 1) == OBJECT
+    assert kind_of(Decimal("0.1000000000000000000001")) == OBJECT
+    assert kind_of(datetime.date(2022, 6, 3)) == DATE
+    assert kind_of(datetime.datetime(2022, 6, 3, tzinfo=datetime.timezone.utc)) == (
+        DATETIME
+    )
+    assert kind_of(datetime.datetime(2022, 6, 3)) == OBJECT
+    assert kind_of("Google") == STRING
+
+
+@mock_salesforce
+def test_typed_fields_are_queried_by_native_values():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Opportunity.insert(
+        [
+            {
+                "Name": "Early",
+                "Amount": 0.1,
+                "CloseTime__c": "2022-06-03T09:00:00.000+0200",
+            },
+            {
+                "Name": "Late",
+                "Amount": 0.3,
+                "CloseTime__c": "2022-06-03T08:00:00.000+0000",
+            },
+        ]
+    )
+
+    results = salesforce.query(
+        "SELECT Name FROM Opportunity WHERE CloseTime__c > 2022-06-03T07:30:00Z"
+    )
+    assert [record["Name"] for record in results["records"]] == ["Late"]
+
+    results = salesforce.query(
+        "SELECT Name FROM Opportunity ORDER BY CloseTime__c DESC"
+    )
+    assert [record["Name"] for record in results["records"]] == ["Late", "Early"]
+
+    results = salesforce.query("SELECT Name FROM Opportunity WHERE Amount = 0.1")
+    assert [record["Name"] for record in results["records"]] == ["Early"]
+
+    # the wire form is what's returned
+    results = salesforce.query("SELECT Amount, CloseTime__c FROM Opportunity")
+    assert results["records"][0] == {
+        "Amount": 0.1,
+        "CloseTime__c": "2022-06-03T09:00:00.000+0200",
+    }
+
+
+@mock_salesforce
+def test_declared_field_types():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    response = salesforce.Account.create(
+        {"Name": "Google", "Revenue__c": "9", "Founded__c": "1998-09-04"}
+    )
+    salesforce.Account.create(
+        {"Name": "Apple", "Revenue__c": "10", "Founded__c": "1976-04-01"}
+    )
+
+    # strings are compared as strings, until they're declared as decimals
+    results = salesforce.query("SELECT Name FROM Account WHERE Revenue__c > 9")
+    assert results["records"] == []
+    virtual_salesforce.declare_field_type("Account", "Revenue__c", DECIMAL)
+    results = salesforce.query("SELECT Name FROM Account WHERE Revenue__c > 9")
+    assert [record["Name"] for record in results["records"]] == ["Apple"]
+
+    virtual_salesforce.declare_field_type("Account", "Founded__c", STRING)
+    results = salesforce.query("SELECT Name FROM Account WHERE Founded__c = TODAY")
+    assert results["records"] == []
+
+    account = salesforce.Account.get(response["id"])
+    assert account["Revenue__c"] == "9"
+    assert account["Founded__c"] == "1998-09-04"
+
+    virtual_salesforce.field_types.clear()
@@ -0,0 +1,201 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import simple_mockforce.virtual as virtual_module
+from simple_mockforce.fixtures import fixture_cache_lock, read_fixture
+from simple_mockforce.virtual import VirtualSalesforce
+
+ACCOUNTS = [
+    {"Name": "Google", "External_ID__c": "1", "AnnualRevenue": 10.5},
+    {"Name": "Alphabet", "External_ID__c": "2", "Company__r": None},
+    {"Name": "YouTube", "External_ID__c": "3", "Company__r": {"External_ID__c": "1"}},
+]
+
+CONTACTS = """﻿LastName,DoNotCall,Email,Account.External_ID__c,Company__r.External_ID__c
+Page,true,larry@google.com,1,2
+Brin,false,,1,
+Wojcicki,FALSE,susan@youtube.com,3,
+"""
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    accounts = tmp_path / "accounts.ndjson"
+    accounts.write_text("\n".join(json.dumps(account) for account in ACCOUNTS) + "\n")
+    contacts = tmp_path / "contacts.csv"
+    contacts.write_text(CONTACTS, encoding="utf-8")
+    return {"Account": accounts, "Contact": contacts}
+
+
+def test_read_csv_fixture(fixtures):
+    contacts = list(read_fixture(fixtures["Contact"]))
+
+    assert contacts[0] == {
+        "LastName": "Page",
+        "DoNotCall": True,
+        "Email": "larry@google.com",
+        "Account": {"External_ID__c": "1"},
+        "Company__r": {"External_ID__c": "2"},
+    }
+    # empty values are nulls, and null relations are left out
+    assert contacts[1] == {
+        "LastName": "Brin",
+        "DoNotCall": False,
+        "Email": None,
+        "Account": {"External_ID__c": "1"},
+    }
+
+    with pytest.raises(AssertionError):
+        list(read_fixture("accounts.xml"))
+
+
+def test_load_fixtures(fixtures):
+    virtual = VirtualSalesforce()
+    virtual.load_fixtures(fixtures)
+
+    accounts = virtual.query(
+        "SELECT Name, Company__r.Name FROM Account ORDER BY External_ID__c"
+    )
+    assert [account["Name"] for account in accounts] == [
+        "Google",
+        "Alphabet",
+        "YouTube",
+    ]
+    assert accounts[2]["Company__r"] == {"Name": "Google"}
+    alphabet = virtual.get_by_custom_id("Account", "2", "External_ID__c")
+    assert "Company__c" not in alphabet
+
+    contacts = virtual.query(
+        "SELECT LastName, Account.Name, Company__r.Name FROM Contact "
+        "WHERE DoNotCall = false ORDER BY LastName"
+    )
+    assert contacts == [
+        {"LastName": "Brin", "Account": {"Name": "Google"}, "Company__r": None},
+        {
+            "LastName": "Wojcicki",
+            "Account": {"Name": "YouTube"},
+            "Company__r": None,
+        },
+    ]
+    page = virtual.query(
+        "SELECT Id, Company__r.Name FROM Contact WHERE DoNotCall = true"
+    )
+    assert page[0]["Company__r"] == {"Name": "Alphabet"}
+
+
+def test_load_fixture_keeps_system_fields(tmp_path):
+    accounts = tmp_path / "accounts.csv"
+    accounts.write_text("Id,Name\n001000000000001AAA,Google\n")
+
+    virtual = VirtualSalesforce()
+    assert virtual.load_fixture("Account", accounts) == 1
+    account = virtual.get("Account", "001000000000001AAA")
+    assert account["Name"] == "Google"
+    assert account["IsDeleted"] is False
+    assert account["CreatedDate"]
+
+
+def test_load_fixture_with_a_missing_relation(tmp_path):
+    contacts = tmp_path / "contacts.csv"
+    contacts.write_text("LastName,Account.External_ID__c\nPage,1\n")
+
+    virtual = VirtualSalesforce()
+    virtual.create("Account", {"Name": "Google", "External_ID__c": "2"})
+    with pytest.raises(AssertionError):
+        virtual.load_fixture("Contact", contacts)
+
+
+def test_load_fixtures_from_the_cache(fixtures, tmp_path, monkeypatch):
+    cache_path = tmp_path / "org.pickle"
+
+    virtual = VirtualSalesforce()
+    virtual.load_fixtures(fixtures, cache_path=cache_path)
+    assert cache_path.exists()
+    expected = virtual.query("SELECT Id, Name, Company__r.Name FROM Account")
+
+    def fail(path):
+        raise AssertionError(f"{path} was read")
+
+    monkeypatch.setattr(virtual_module, "read_fixture", fail)
+    cached = VirtualSalesforce()
+    cached.create("Lead", {"Name": "Gone once the fixtures are loaded"})
+    cached.load_fixtures(fixtures, cache_path=cache_path)
+    assert cached.query("SELECT Id, Name, Company__r.Name FROM Account") == expected
+    assert "Lead" not in cached.data
+    account = cached.get_by_custom_id("Account", "1", "External_ID__c")
+    # native values come out of the cache as they went in
+    assert str(account.native("AnnualRevenue")) == "10.5"
+    cached.declare_field_type("Account", "External_ID__c", "decimal")
+    assert cached.data["Account"].field_types is cached.field_types["Account"]
+
+    # modifying a fixture invalidates the cache
+    stat = os.stat(fixtures["Contact"])
+    os.utime(fixtures["Contact"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with pytest.raises(AssertionError):
+        VirtualSalesforce().load_fixtures(fixtures, cache_path=cache_path)
+
+
+def _load_in_process(fixtures, cache_path, reads_path) -> int:
+    read = virtual_module.read_fixture
+
+    def logging_read(path):
+        with open(reads_path, "a") as reads:
+            reads.write(f"{path}\n")
+        # keeps the lock long enough for the other processes to wait on it
+        time.sleep(0.2)
+        return read(path)
+
+    virtual_module.read_fixture = logging_read
+    virtual = VirtualSalesforce()
+    virtual.load_fixtures(fixtures, cache_path=cache_path)
+    return virtual.count("SELECT COUNT() FROM Contact")
+
+
+def test_processes_take_turns_loading_fixtures(fixtures, tmp_path):
+    cache_path = tmp_path / "org.pickle"
+    reads_path = tmp_path / "reads.txt"
+
+    # as pytest-xdist workers would, starting at once
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(4) as pool:
+        counts = pool.starmap(
+            _load_in_process, [(fixtures, cache_path, reads_path)] * 4
+        )
+
+    assert counts == [3] * 4
+    # only the first process to get the lock read the fixtures
+    assert len(reads_path.read_text().splitlines()) == len(fixtures)
+    assert not os.path.exists(f"{cache_path}.lock")
+
+
+def test_fixture_cache_locks_of_dead_processes_are_broken(fixtures, tmp_path):
+    cache_path = tmp_path / "org.pickle"
+    process = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    with open(f"{cache_path}.lock", "w") as lock:
+        lock.write(process.stdout.strip())
+
+    with fixture_cache_lock(cache_path, timeout=1) as acquired:
+        assert acquired
+    assert not os.path.exists(f"{cache_path}.lock")
+
+
+def test_fixture_cache_locks_time_out(tmp_path):
+    cache_path = tmp_path / "org.pickle"
+    with open(f"{cache_path}.lock", "w") as lock:
+        lock.write(str(os.getpid()))
+
+    with fixture_cache_lock(cache_path, timeout=0.1) as acquired:
+        assert not acquired
+    # the lock isn't this process's to remove
+    assert os.path.exists(f"{cache_path}.lock")
@@ -0,0 +1,73 @@
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.indexes import IndexRegistry
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def test_index_registry_builds_lazily():
+    records = {"Account": [{"Id": "1", "Key__c": "a"}, {"Id": "2", "Key__c": "b"}]}
+    registry = IndexRegistry(lambda sobject_name: records.get(sobject_name, []))
+
+    assert not registry.has_index("Account", "Key__c")
+    assert registry.lookup("Account", "Key__c", "b")["Id"] == "2"
+    assert registry.has_index("Account", "Key__c")
+
+    new_record = {"Id": "3", "Key__c": "c"}
+    registry.add("Account", new_record)
+    assert registry.lookup("Account", "Key__c", "c") is new_record
+
+    registry.remove("Account", new_record)
+    assert registry.lookup("Account", "Key__c", "c") is None
+
+
+def test_index_registry_skips_unhashable_values():
+    registry = IndexRegistry(lambda sobject_name: [])
+    registry.declare("Account", "BillingAddress")
+
+    record = {"Id": "1", "BillingAddress": {"city": "Springfield"}}
+    registry.add("Account", record)
+    registry.remove("Account", record)
+
+    assert registry.lookup("Account", "BillingAddress", {"city": "Springfield"}) is None
+
+
+def test_index_registry_clear_keeps_declared_indexes():
+    registry = IndexRegistry(lambda sobject_name: [])
+    registry.declare("Account", "Key__c")
+    registry.get_index("Contact", "Email")
+
+    registry.clear()
+
+    assert registry.has_index("Account", "Key__c")
+    assert not registry.has_index("Contact", "Email")
+
+
+@mock_salesforce
+def test_external_id_index_stays_in_sync():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    virtual_salesforce.declare_index("Account", "External_ID__c")
+
+    response = salesforce.Account.create({"Name": "Acme", "External_ID__c": "1"})
+    account_id = response["id"]
+
+    assert (
+        salesforce.Account.get_by_custom_id("External_ID__c", "1")["Id"] == account_id
+    )
+
+    salesforce.Account.update(account_id, {"External_ID__c": "2"})
+
+    assert (
+        salesforce.Account.get_by_custom_id("External_ID__c", "2")["Id"] == account_id
+    )
+    assert virtual_salesforce.indexes.lookup("Account", "External_ID__c", "1") is None
+
+    salesforce.Account.upsert("External_ID__c/2", {"Name": "Acme Corp"})
+    assert salesforce.Account.get(account_id)["Name"] == "Acme Corp"
+
+    salesforce.Account.delete(account_id)
+    assert virtual_salesforce.indexes.lookup("Account", "External_ID__c", "2") is None
+
+    virtual_salesforce.drop_index("Account", "External_ID__c")
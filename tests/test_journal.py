@@ -0,0 +1,103 @@
+import pytest
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+@pytest.fixture
+def journaled_org():
+    virtual_salesforce.provision()
+    virtual_salesforce.declare_index("Account", "External_ID__c")
+    for i in range(10):
+        virtual_salesforce.create(
+            "Account", {"Name": f"Account {i}", "External_ID__c": str(i)}
+        )
+    virtual_salesforce.start_journal()
+    yield virtual_salesforce
+    virtual_salesforce.stop_journal()
+    virtual_salesforce.drop_index("Account", "External_ID__c")
+    virtual_salesforce.provision()
+
+
+def _names(virtual: VirtualSalesforce):
+    return sorted(
+        record["Name"] for record in virtual.query("SELECT Name FROM Account")
+    )
+
+
+def test_rollback_to_undoes_writes_since_the_savepoint():
+    virtual = VirtualSalesforce()
+    account_id = virtual.create("Account", {"Name": "Before", "External_ID__c": "a"})
+    virtual.start_journal()
+    savepoint = virtual.savepoint()
+
+    created_id = virtual.create("Account", {"Name": "Created"})
+    virtual.update(
+        "Account", account_id, {"Name": "Updated", "External_ID__c": "b", "New__c": 1}
+    )
+    virtual.delete("Account", created_id)
+    virtual.create_job({"operation": "insert", "object": "Account"})
+    # only the writes themselves are journaled
+    assert len(virtual.journal) == 4
+
+    virtual.rollback_to(savepoint)
+    assert virtual.journal == []
+    assert virtual.query("SELECT Id, Name FROM Account") == [
+        {"Id": account_id, "Name": "Before"}
+    ]
+    assert "New__c" not in virtual.get("Account", account_id)
+    assert virtual.get("Account", account_id)["External_ID__c"] == "a"
+    assert virtual.jobs == {}
+    assert virtual.data["Account"].get(created_id, include_deleted=True) is None
+    assert virtual.get_by_custom_id("Account", "a", "External_ID__c")["Id"] == (
+        account_id
+    )
+    with pytest.raises(AssertionError):
+        virtual.get_by_custom_id("Account", "b", "External_ID__c")
+
+
+def test_rollback_to_undeletes_records(journaled_org):
+    account = journaled_org.get_by_custom_id("Account", "3", "External_ID__c")
+    savepoint = journaled_org.savepoint()
+
+    journaled_org.delete("Account", account["Id"])
+    assert (
+        journaled_org.query("SELECT Id FROM Account WHERE External_ID__c = '3'") == []
+    )
+
+    journaled_org.rollback_to(savepoint)
+    records = journaled_org.query(
+        "SELECT Id, IsDeleted FROM Account WHERE External_ID__c = '3'"
+    )
+    assert records == [{"Id": account["Id"], "IsDeleted": False}]
+
+
+def test_mock_salesforce_rolls_back_journaled_orgs(journaled_org):
+    seeded_names = _names(journaled_org)
+
+    _write_to_the_org()
+    assert _names(journaled_org) == seeded_names
+    assert journaled_org.jobs == {}
+    assert journaled_org.batches == {}
+    assert journaled_org.journal == []
+
+    _write_to_the_org()
+    assert _names(journaled_org) == seeded_names
+
+
+@mock_salesforce
+def _write_to_the_org():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    # the seeded records are there, rather than an empty org
+    assert len(salesforce.query("SELECT Id FROM Account")["records"]) == 10
+    account = salesforce.Account.get_by_custom_id("External_ID__c", "1")
+    salesforce.Account.update(account["Id"], {"Name": "Renamed"})
+    salesforce.bulk.Account.insert([{"Name": "Bulk"}, {"Name": "Bulkier"}])
+    salesforce.bulk.Account.upsert(
+        [{"External_ID__c": "2", "Name": "Upserted"}], "External_ID__c"
+    )
+    assert len(salesforce.query("SELECT Id FROM Account")["records"]) == 12
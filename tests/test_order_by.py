@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from simple_mockforce.query_algorithms import sort_by_order_by_clause
+from simple_mockforce.soql import parse_soql
+
+
+@pytest.mark.parametrize(
+    "order_by_clause",
+    [
+        "Score__c ASC",
+        "Score__c DESC",
+        "Score__c DESC NULLS FIRST",
+        "Score__c ASC NULLS LAST, Name DESC",
+        "Name ASC, Score__c DESC",
+    ],
+)
+@pytest.mark.parametrize("limit", [0, 1, 5, 50])
+def test_top_k_matches_full_sort(order_by_clause, limit):
+    rng = random.Random(42)
+    sobjects = [
+        {"Name": f"Name {rng.randint(0, 9)}", "Score__c": rng.choice([None, 1, 2, 3])}
+        for _ in range(30)
+    ]
+    original = list(sobjects)
+    order_by = parse_soql(
+        f"SELECT Name FROM Account ORDER BY {order_by_clause}"
+    ).order_by
+
+    fully_sorted = sort_by_order_by_clause(sobjects, order_by)
+    top_k = sort_by_order_by_clause(sobjects, order_by, limit=limit)
+
+    assert top_k == fully_sorted[:limit]
+    assert sobjects == original
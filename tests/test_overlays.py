@@ -0,0 +1,47 @@
+import pytest
+
+from simple_mockforce.overlays import Overlay, layered
+
+
+def test_overlay_leaves_its_base_alone():
+    base = {"a": 1, "b": 2, "c": 3}
+    overlay = Overlay(base)
+    overlay["b"] = 20
+    overlay["d"] = 4
+    del overlay["a"]
+
+    assert base == {"a": 1, "b": 2, "c": 3}
+    assert dict(overlay) == {"b": 20, "c": 3, "d": 4}
+    assert "a" not in overlay
+    assert overlay.get("a") is None
+    with pytest.raises(KeyError):
+        overlay["a"]
+    with pytest.raises(KeyError):
+        del overlay["a"]
+
+
+def test_overlay_iterates_like_a_copy_of_its_base():
+    base = {"a": 1, "b": 2, "c": 3}
+    overlay, copy = Overlay(base), dict(base)
+    for mapping in (overlay, copy):
+        mapping["b"] = 20
+        mapping["d"] = 4
+        del mapping["a"]
+        mapping["a"] = 10
+        del mapping["d"]
+
+    assert list(overlay.items()) == list(copy.items())
+    assert list(overlay.values()) == list(copy.values())
+    assert len(overlay) == len(copy) == 3
+
+
+def test_layered_overlays_are_one_layer_deep():
+    base = {"a": 1}
+    overlay = layered(base)
+    overlay["b"] = 2
+    other = layered(overlay)
+    other["c"] = 3
+
+    assert other.base is base
+    assert dict(overlay) == {"a": 1, "b": 2}
+    assert dict(other) == {"a": 1, "b": 2, "c": 3}
@@ -0,0 +1,178 @@
+import pytest
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.query_algorithms import (
+    compile_where_clause,
+    count_matches,
+    plan_candidates,
+)
+from simple_mockforce.soql import parse_soql
+from simple_mockforce.storage import SQLITE
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+pytestmark = pytest.mark.skipif(
+    virtual_salesforce.storage_engine == SQLITE,
+    reason="sqlite tables are planned by the database itself",
+)
+
+
+def _candidates(soql: str, include_deleted: bool = False):
+    parsed_query = parse_soql(soql)
+    where_predicate = compile_where_clause(parsed_query.where)
+    return list(
+        plan_candidates(
+            virtual_salesforce,
+            parsed_query.sobject,
+            where_predicate,
+            include_deleted=include_deleted,
+        )
+    )
+
+
+@mock_salesforce
+def test_planner_uses_id_and_hash_indexes():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    results = salesforce.bulk.Account.insert(
+        [{"Name": f"Account {i}", "External_ID__c": str(i % 5)} for i in range(20)]
+    )
+    account_ids = [result["id"] for result in results]
+
+    candidates = _candidates(
+        f"SELECT Id FROM Account WHERE Id IN ('{account_ids[3]}', '{account_ids[1]}')"
+    )
+    assert [candidate["Id"] for candidate in candidates] == [
+        account_ids[3],
+        account_ids[1],
+    ]
+
+    # no index has been built yet, so this is a full scan
+    assert len(_candidates("SELECT Id FROM Account WHERE External_ID__c = '2'")) == 20
+
+    virtual_salesforce.indexes.get_index("Account", "External_ID__c")
+    assert len(_candidates("SELECT Id FROM Account WHERE External_ID__c = '2'")) == 4
+
+    results = salesforce.query(
+        "SELECT Name FROM Account WHERE External_ID__c = '2' AND Name != 'Account 7'"
+    )
+    names = [record["Name"] for record in results["records"]]
+    assert names == ["Account 2", "Account 12", "Account 17"]
+
+
+@mock_salesforce
+def test_planner_picks_the_most_selective_index():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Lead.insert(
+        [{"Status": "Open", "Email": f"{i}@example.com"} for i in range(10)]
+    )
+
+    virtual_salesforce.indexes.get_index("Lead", "Status")
+    virtual_salesforce.indexes.get_index("Lead", "Email")
+
+    candidates = _candidates(
+        "SELECT Id FROM Lead WHERE Status = 'Open' AND Email = '3@example.com'"
+    )
+    assert [candidate["Email"] for candidate in candidates] == ["3@example.com"]
+
+    # an OR can't be served by a single index
+    assert (
+        len(
+            _candidates(
+                "SELECT Id FROM Lead WHERE Status = 'Open' OR Email = '3@example.com'"
+            )
+        )
+        == 10
+    )
+
+
+@mock_salesforce
+def test_planner_uses_ordered_indexes_for_ranges():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    virtual_salesforce.declare_index("Opportunity", "LastActivity__c", ordered=True)
+    virtual_salesforce.declare_index("Opportunity", "Amount", ordered=True)
+
+    salesforce.bulk.Opportunity.insert(
+        [
+            {
+                "Name": "Small",
+                "Amount": 10,
+                "LastActivity__c": "2022-01-15T10:00:00.000000",
+            },
+            {
+                "Name": "Medium",
+                "Amount": 100,
+                "LastActivity__c": "2022-02-15T10:00:00.000000",
+            },
+            {
+                "Name": "Large",
+                "Amount": 1000,
+                "LastActivity__c": "2022-03-15T10:00:00.000000",
+            },
+        ]
+    )
+
+    candidates = _candidates("SELECT Id FROM Opportunity WHERE Amount >= 100")
+    assert [candidate["Name"] for candidate in candidates] == ["Medium", "Large"]
+
+    results = salesforce.query(
+        "SELECT Name FROM Opportunity WHERE Amount > 10 AND Amount <= 1000 ORDER BY Name ASC"
+    )
+    assert [record["Name"] for record in results["records"]] == ["Large", "Medium"]
+
+    results = salesforce.query(
+        "SELECT Name FROM Opportunity WHERE LastActivity__c < 2022-02-15T00:00:00.000000"
+    )
+    assert [record["Name"] for record in results["records"]] == ["Small"]
+
+    virtual_salesforce.drop_index("Opportunity", "LastActivity__c")
+    virtual_salesforce.drop_index("Opportunity", "Amount")
+
+
+def _count_matches(soql: str, include_deleted: bool = False):
+    parsed_query = parse_soql(soql)
+    return count_matches(
+        virtual_salesforce,
+        parsed_query.sobject,
+        compile_where_clause(parsed_query.where),
+        include_deleted=include_deleted,
+    )
+
+
+@mock_salesforce
+def test_count_matches_without_fetching_records(monkeypatch):
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    results = salesforce.bulk.Lead.insert(
+        [{"Name": f"Lead {i}", "IsConverted": i % 4 == 0} for i in range(20)]
+    )
+    salesforce.Lead.delete(results[1]["id"])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("records were fetched")
+
+    monkeypatch.setattr(virtual_salesforce, "get_sobjects", fail)
+
+    assert _count_matches("SELECT COUNT() FROM Lead") == 19
+    assert _count_matches("SELECT COUNT() FROM Lead", include_deleted=True) == 20
+    assert (
+        _count_matches(f"SELECT COUNT() FROM Lead WHERE Id = '{results[2]['id']}'") == 1
+    )
+    assert (
+        _count_matches(f"SELECT COUNT() FROM Lead WHERE Id = '{results[1]['id']}'") == 0
+    )
+
+    # only a where clause an index fully covers can be counted
+    assert _count_matches("SELECT COUNT() FROM Lead WHERE IsConverted = false") is None
+    virtual_salesforce.indexes.get_index("Lead", "IsConverted")
+    assert _count_matches("SELECT COUNT() FROM Lead WHERE IsConverted = false") == 14
+    assert (
+        _count_matches(
+            "SELECT COUNT() FROM Lead WHERE IsConverted = false AND Name = 'Lead 2'"
+        )
+        is None
+    )
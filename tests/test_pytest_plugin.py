@@ -0,0 +1,111 @@
+import json
+
+from pathlib import Path
+
+import pytest
+import responses
+
+import simple_mockforce.patching as patching_module
+import simple_mockforce.virtual as virtual_module
+from tests.utils import MOCK_CREDS
+
+pytest_plugins = ["pytester"]
+
+TESTS = f"""
+from simple_salesforce import Salesforce
+
+MOCK_CREDS = {MOCK_CREDS!r}
+
+
+def _names():
+    records = Salesforce(**MOCK_CREDS).query("SELECT Name FROM Account")["records"]
+    return sorted(record["Name"] for record in records)
+
+
+def test_seeded(mockforce):
+    assert _names() == ["Alphabet", "Google"]
+    Salesforce(**MOCK_CREDS).Account.create({{"Name": "YouTube"}})
+    assert mockforce.count("SELECT COUNT() FROM Account") == 3
+
+
+def test_reset(mockforce):
+    assert _names() == ["Alphabet", "Google"]
+
+
+def test_org(mockforce):
+    mockforce.create("Account", {{"Name": "Waymo"}})
+    assert _names() == ["Alphabet", "Google", "Waymo"]
+"""
+
+
+@pytest.fixture
+def project(pytester):
+    accounts = [{"Name": "Google"}, {"Name": "Alphabet"}]
+    pytester.makefile(
+        ".ndjson", accounts="\n".join(json.dumps(account) for account in accounts)
+    )
+    pytester.makeini("""
+        [pytest]
+        mockforce_fixtures =
+            Account = accounts.ndjson
+        mockforce_fixture_cache = mockforce.pickle
+        """)
+    pytester.makepyfile(TESTS)
+    return pytester
+
+
+def test_mockforce_fixture_patches_once_per_session(project, monkeypatch):
+    start = responses.start
+    calls = list()
+
+    def counting_start():
+        calls.append(None)
+        start()
+
+    monkeypatch.setattr(responses, "start", counting_start)
+    result = project.runpytest("-p", "simple_mockforce.pytest_plugin")
+    result.assert_outcomes(passed=3)
+    assert len(calls) == 1
+    # the patch is gone along with the session
+    assert not any(patching_module._activations.values())
+
+
+def test_mockforce_fixture_can_mount_the_adapter(project, monkeypatch):
+    def fail():
+        raise AssertionError("responses was started")
+
+    monkeypatch.setattr(responses, "start", fail)
+    with open(project.path / "tox.ini", "a") as ini:
+        ini.write("\nmockforce_transport = adapter\n")
+    result = project.runpytest("-p", "simple_mockforce.pytest_plugin")
+    result.assert_outcomes(passed=3)
+    assert not any(patching_module._activations.values())
+
+
+def test_conftest_configures_the_org(pytester, monkeypatch):
+    pytester.makefile(".json", relations=json.dumps({"Company__r": "Account"}))
+    pytester.makeconftest("""
+        import os
+
+        os.environ["MOCKFORCE_RELATIONS_ROOT"] = os.path.dirname(__file__)
+        """)
+    pytester.makepyfile("""
+        def test_relations(mockforce):
+            assert mockforce.relations_file == {"Company__r": "Account"}
+        """)
+    # in a process of its own, where the org hasn't been created yet
+    monkeypatch.setenv("PYTHONPATH", str(Path(__file__).parents[1]))
+    result = pytester.runpytest_subprocess("-p", "simple_mockforce.pytest_plugin")
+    result.assert_outcomes(passed=1)
+
+
+def test_mockforce_fixture_seeds_workers_from_the_cache(project, monkeypatch):
+    project.runpytest("-p", "simple_mockforce.pytest_plugin").assert_outcomes(passed=3)
+    assert (project.path / "mockforce.pickle").exists()
+
+    def fail(path):
+        raise AssertionError(f"{path} was read")
+
+    # as another worker would, which finds the fixtures already cached
+    monkeypatch.setattr(virtual_module, "read_fixture", fail)
+    project.runpytest("-p", "simple_mockforce.pytest_plugin").assert_outcomes(passed=3)
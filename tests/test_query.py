@@ -7,11 +7,14 @@ from dateutil.relativedelta import relativedelta
 from python_soql_parser.tokens import TODAY, TOMORROW, YESTERDAY
 
 from simple_mockforce import mock_salesforce
+from simple_mockforce.soql import parse_soql
+from simple_mockforce.storage import SQLITE
 from simple_salesforce import Salesforce
 
 from tests.utils import MOCK_CREDS, MOCK_CREDS_USING_PRIVATE_KEY
 
 import simple_mockforce.query_algorithms.where as where_module
+from simple_mockforce.virtual import virtual_salesforce
 
 
 @mock_salesforce
@@ -340,6 +343,140 @@ def test_query_with_custom_parent_object_attribute():
     assert record["CustomObj__r"]["Name"] == "I'm Custom"
 
 
+@mock_salesforce
+def test_query_with_child_relationship_subquery():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    google_id = salesforce.Account.create({"Name": "Google"})["id"]
+    apple_id = salesforce.Account.create({"Name": "Apple"})["id"]
+    salesforce.Account.create({"Name": "Lonely"})
+    salesforce.bulk.Contact.insert(
+        [
+            {"LastName": "Pichai", "AccountId": google_id},
+            {"LastName": "Page", "AccountId": google_id},
+            {"LastName": "Brin", "AccountId": google_id},
+            {"LastName": "Cook", "AccountId": apple_id},
+        ]
+    )
+
+    results = salesforce.query(
+        "SELECT Name, (SELECT LastName, Account.Name FROM Contacts "
+        "WHERE LastName != 'Brin' ORDER BY LastName) FROM Account ORDER BY Name"
+    )
+    records = results["records"]
+
+    assert [record["Name"] for record in records] == ["Apple", "Google", "Lonely"]
+    assert records[0]["Contacts"] == {
+        "totalSize": 1,
+        "done": True,
+        "records": [{"LastName": "Cook", "Account": {"Name": "Apple"}}],
+    }
+    assert [contact["LastName"] for contact in records[1]["Contacts"]["records"]] == [
+        "Page",
+        "Pichai",
+    ]
+    assert records[2]["Contacts"] is None
+
+    results = salesforce.query(
+        "SELECT Id, (SELECT LastName FROM Contacts LIMIT 1) FROM Account "
+        f"WHERE Id = '{google_id}'"
+    )
+    assert results["records"][0]["Contacts"]["totalSize"] == 1
+
+
+@mock_salesforce
+def test_query_groups_children_once_per_query(monkeypatch):
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    account_ids = [salesforce.Account.create({"Name": str(i)})["id"] for i in range(5)]
+    salesforce.bulk.Contact.insert(
+        [{"LastName": str(i), "AccountId": account_ids[i % 5]} for i in range(10)]
+    )
+
+    scans = list()
+    contacts = virtual_salesforce.data["Contact"]
+    records = contacts.records
+
+    def counting_records(*args, **kwargs):
+        scans.append(args)
+        return records(*args, **kwargs)
+
+    monkeypatch.setattr(contacts, "records", counting_records)
+
+    accounts = list(
+        virtual_salesforce.iter_query(
+            "SELECT Name, (SELECT LastName FROM Contacts ORDER BY LastName) "
+            "FROM Account ORDER BY Name",
+            batch_size=2,
+        )
+    )
+
+    assert len(scans) == 1
+    assert [
+        [contact["LastName"] for contact in account["Contacts"]["records"]]
+        for account in accounts
+    ] == [["0", "5"], ["1", "6"], ["2", "7"], ["3", "8"], ["4", "9"]]
+
+
+@mock_salesforce
+def test_query_with_custom_child_relationship_subquery():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    account_id = salesforce.Account.create({"Name": "Google"})["id"]
+    salesforce.Opportunity.create({"Name": "Ads", "AccountId": account_id})
+    salesforce.Employee__c.create({"Name": "Sundar", "Company__c": account_id})
+
+    results = salesforce.query(
+        "SELECT Id, (SELECT Name FROM Opportunities), "
+        "(SELECT Name FROM Employees__r) FROM Account"
+    )
+    record = results["records"][0]
+
+    assert record["Opportunities"]["records"] == [{"Name": "Ads"}]
+    assert record["Employees__r"]["records"] == [{"Name": "Sundar"}]
+
+
+@pytest.mark.skipif(
+    virtual_salesforce.storage_engine == SQLITE,
+    reason="sqlite tables fetch the parents of a batch in a single query",
+)
+@mock_salesforce
+def test_query_joins_parents_once_per_batch(monkeypatch):
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    google_id = salesforce.Account.create({"Name": "Google", "Industry": "Tech"})["id"]
+    apple_id = salesforce.Account.create({"Name": "Apple", "Industry": "Tech"})["id"]
+    salesforce.bulk.Contact.insert(
+        [
+            {"LastName": str(i), "AccountId": google_id if i % 2 else apple_id}
+            for i in range(50)
+        ]
+        + [{"LastName": "Orphan"}]
+    )
+
+    fetched = list()
+    accounts = virtual_salesforce.data["Account"]
+    get = accounts.get
+
+    def counting_get(record_id, *args, **kwargs):
+        fetched.append(record_id)
+        return get(record_id, *args, **kwargs)
+
+    monkeypatch.setattr(accounts, "get", counting_get)
+
+    results = salesforce.query(
+        "SELECT LastName, Account.Name, Account.Industry FROM Contact"
+    )
+    records = results["records"]
+
+    assert len(records) == 51
+    assert sorted(fetched) == sorted([google_id, apple_id])
+    assert records[0]["Account"] == {"Name": "Apple", "Industry": "Tech"}
+    assert records[1]["Account"] == {"Name": "Google", "Industry": "Tech"}
+    assert records[-1]["LastName"] == "Orphan"
+    assert records[-1]["Account"] is None
+
+
 class JamesDOB:
     def today(*args, **kwargs):
         return datetime.date(1963, 8, 3)
@@ -594,3 +731,142 @@ def test_query_offset_limit_order(offset, asc_desc, expected_names, limit, error
         results = salesforce.query(f"SELECT Name FROM Account {order_by_clause} {limit_clause} {offset_clause}")
         actual_names = [rec["Name"] for rec in results["records"]]
         assert actual_names == expected_names, "offset results match expected"
+
+
+@mock_salesforce
+def test_where_query_with_nested_or_after_and():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Lead.insert(
+        [
+            {"Name": "Bruce Dickinson", "Title": "Singer", "Band__c": "Iron Maiden"},
+            {"Name": "Steve Harris", "Title": "Bassist", "Band__c": "Iron Maiden"},
+            {"Name": "Rob Halford", "Title": "Singer", "Band__c": "Judas Priest"},
+            {"Name": "Dave Murray", "Title": "Guitarist", "Band__c": "Iron Maiden"},
+        ]
+    )
+
+    results = salesforce.query(
+        "SELECT Name FROM Lead WHERE Band__c = 'Iron Maiden' AND (Title = 'Singer' OR Title = 'Bassist')"
+    )
+    names = [record["Name"] for record in results["records"]]
+    assert names == ["Bruce Dickinson", "Steve Harris"]
+
+
+@mock_salesforce
+def test_repeated_date_token_query_follows_the_date(monkeypatch):
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Lead.insert(
+        [
+            {"Name": "James Hetfield", "DOB__c": "1963-08-03"},
+            {"Name": "Lars Ulrich", "DOB__c": "1963-12-26"},
+        ]
+    )
+
+    soql = f"SELECT Name FROM Lead WHERE DOB__c = {TODAY}"
+
+    monkeypatch.setattr(where_module, "date", JamesDOB)
+    records = salesforce.query(soql)["records"]
+    assert [record["Name"] for record in records] == ["James Hetfield"]
+
+    monkeypatch.setattr(where_module, "date", DayAfterLarsDOB)
+    records = salesforce.query(soql)["records"]
+    assert records == []
+
+
+def test_compile_where_clause():
+    parsed_query = parse_soql(
+        "SELECT Id FROM Lead WHERE Name = 'a' OR Name IN ('b', 'c')"
+    )
+    predicate = where_module.compile_where_clause(parsed_query.where)
+
+    assert predicate({"Name": "a"})
+    assert predicate({"Name": "c"})
+    assert not predicate({"Name": "d"})
+    assert not predicate({})
+    assert not predicate.is_stale()
+
+
+@mock_salesforce
+def test_order_by_nulls_first_and_last():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Account.insert(
+        [
+            {"Name": "Google", "AlexaRanking__c": 1},
+            {"Name": "Unranked", "AlexaRanking__c": None},
+            {"Name": "Facebook", "AlexaRanking__c": 7},
+            {"Name": "Unknown"},
+        ]
+    )
+
+    def names(soql):
+        return [record["Name"] for record in salesforce.query(soql)["records"]]
+
+    assert names("SELECT Name FROM Account ORDER BY AlexaRanking__c ASC, Name ASC") == [
+        "Unknown",
+        "Unranked",
+        "Google",
+        "Facebook",
+    ]
+    assert names(
+        "SELECT Name FROM Account ORDER BY AlexaRanking__c ASC NULLS LAST, Name ASC"
+    ) == ["Google", "Facebook", "Unknown", "Unranked"]
+    assert names("SELECT Name FROM Account ORDER BY AlexaRanking__c DESC, Name ASC") == [
+        "Facebook",
+        "Google",
+        "Unknown",
+        "Unranked",
+    ]
+    assert names(
+        "SELECT Name FROM Account ORDER BY AlexaRanking__c DESC NULLS FIRST LIMIT 3"
+    ) == ["Unranked", "Unknown", "Facebook"]
+
+
+@mock_salesforce
+def test_order_by_does_not_reorder_stored_records():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Account.insert(
+        [{"Name": "YouTube"}, {"Name": "Google"}, {"Name": "Facebook"}]
+    )
+
+    results = salesforce.query(
+        "SELECT Name FROM Account ORDER BY Name ASC LIMIT 2", include_deleted=True
+    )
+    assert [record["Name"] for record in results["records"]] == ["Facebook", "Google"]
+
+    results = salesforce.query("SELECT Name FROM Account", include_deleted=True)
+    assert [record["Name"] for record in results["records"]] == [
+        "YouTube",
+        "Google",
+        "Facebook",
+    ]
+
+
+@mock_salesforce
+def test_query_stops_projecting_once_limit_is_reached(monkeypatch):
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Contact.insert([{"LastName": str(i)} for i in range(100)])
+
+    projected = list()
+    project = virtual_salesforce._project
+
+    def counting_project(sobjects, fields, relationships):
+        projected.extend(sobject["LastName"] for sobject in sobjects)
+        return project(sobjects, fields, relationships)
+
+    monkeypatch.setattr(virtual_salesforce, "_project", counting_project)
+
+    results = salesforce.query("SELECT LastName FROM Contact LIMIT 2 OFFSET 10")
+    assert [record["LastName"] for record in results["records"]] == ["10", "11"]
+    assert projected == ["10", "11"]
+
+    projected.clear()
+    records = virtual_salesforce.iter_query(
+        "SELECT LastName FROM Contact", batch_size=10
+    )
+    assert next(records) == {"LastName": "0"}
+    assert projected == [str(i) for i in range(10)]
@@ -0,0 +1,67 @@
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.query_cache import QueryCache
+from simple_mockforce.soql import OrderingTerm
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def test_query_cache_hits_and_misses():
+    cache = QueryCache(maxsize=2)
+
+    first = cache.get("SELECT Id FROM Account")
+    assert cache.get("SELECT Id FROM Account") is first
+    cache.get("SELECT Id FROM Contact")
+
+    info = cache.info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 2
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(maxsize=2)
+
+    cache.get("SELECT Id FROM Account")
+    cache.get("SELECT Id FROM Contact")
+    # touch Account so Contact becomes the least recently used entry
+    cache.get("SELECT Id FROM Account")
+    cache.get("SELECT Id FROM Lead")
+
+    assert len(cache) == 2
+    cache.get("SELECT Id FROM Contact")
+    assert cache.info().misses == 4
+
+    cache.resize(0)
+    assert len(cache) == 0
+
+
+def test_parsed_query_is_immutable():
+    cache = QueryCache()
+
+    parsed_query = cache.get(
+        "SELECT Name FROM Account ORDER BY Name DESC LIMIT 2"
+    ).parsed_query
+
+    assert parsed_query.fields == ("Name",)
+    assert parsed_query.order_by == (
+        OrderingTerm(field="Name", descending=True, nulls_first=False),
+    )
+    assert parsed_query.limit == 2
+    assert parsed_query.offset is None
+
+
+@mock_salesforce
+def test_repeated_order_by_query_uses_cache():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    salesforce.bulk.Account.insert([{"Name": "A"}, {"Name": "C"}, {"Name": "B"}])
+
+    soql = "SELECT Name FROM Account ORDER BY Name DESC"
+    hits = virtual_salesforce.query_cache.info().hits
+    for _ in range(3):
+        records = salesforce.query(soql)["records"]
+        assert [record["Name"] for record in records] == ["C", "B", "A"]
+
+    assert virtual_salesforce.query_cache.info().hits >= hits + 2
@@ -0,0 +1,70 @@
+import datetime
+import pickle
+
+from decimal import Decimal
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.field_types import DECIMAL
+from simple_mockforce.records import FieldTable, Record
+from simple_mockforce.virtual import virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def test_record_keeps_wire_values():
+    schema = FieldTable({"Amount__c": DECIMAL})
+    record = Record(
+        {"Id": "001", "Start__c": "2022-06-03", "Amount__c": "10.50"}, schema
+    )
+
+    assert record == {"Id": "001", "Start__c": "2022-06-03", "Amount__c": "10.50"}
+    assert record.native("Start__c") == datetime.date(2022, 6, 3)
+    assert record.native("Amount__c") == Decimal("10.50")
+    assert record.native("Id") == "001"
+    assert record.native("Missing__c") is None
+
+    record.update({"Start__c": "Soon"})
+    assert record.native("Start__c") == "Soon"
+    record["Start__c"] = "2022-06-04"
+    assert record.native("Start__c") == datetime.date(2022, 6, 4)
+
+    unpickled = pickle.loads(pickle.dumps(record))
+    assert unpickled == record
+    assert unpickled.native("Amount__c") == Decimal("10.50")
+
+
+def test_records_share_their_field_table():
+    schema = FieldTable()
+    first = Record({"Id": "1", "Name": "Google"}, schema)
+    second = Record({"Id": "2", "Website": "apple.com", "Name": None}, schema)
+
+    assert schema.fields == ["Id", "Name", "Website"]
+    # records only grow to the fields they have
+    assert len(first.values) == 2
+    assert "Website" not in first
+    assert first.get("Website") is None
+    assert second["Name"] is None
+    assert dict(second) == {"Id": "2", "Name": None, "Website": "apple.com"}
+
+    first["Website"] = "google.com"
+    assert len(first) == 3
+    del first["Name"]
+    assert dict(first) == {"Id": "1", "Website": "google.com"}
+    assert set(first.keys()) == {"Id", "Website"}
+
+
+@mock_salesforce
+def test_records_are_updated_in_place():
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    response = salesforce.Account.create({"Name": "Google"})
+    account_id = response["id"]
+    stored = virtual_salesforce.get("Account", account_id)
+
+    salesforce.Account.update(account_id, {"Website": "google.com"})
+    assert stored["Website"] == "google.com"
+
+    account = salesforce.Account.get(account_id)
+    assert account["Name"] == "Google"
+    assert account["Website"] == "google.com"
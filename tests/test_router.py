@@ -0,0 +1,79 @@
+import json
+
+import responses
+
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.routes import router as salesforce_router
+from simple_mockforce.router import Router
+from tests.utils import MOCK_CREDS
+
+
+def handler():
+    pass
+
+
+def other_handler():
+    pass
+
+
+def test_router_extracts_parameters():
+    router = Router()
+    router.add("GET", "/services/data/*/sobjects/{sobject}/{record_id}", handler)
+
+    assert router.resolve("GET", "/services/data/v52.0/sobjects/Contact/123") == (
+        handler,
+        {"sobject": "Contact", "record_id": "123"},
+    )
+    assert router.resolve("POST", "/services/data/v52.0/sobjects/Contact/123") is None
+    assert router.resolve("GET", "/services/data/v52.0/sobjects/Contact/") is None
+    assert router.resolve("GET", "/services/data/v52.0/sobjects/Contact") is None
+
+
+def test_router_prefers_literals_to_parameters():
+    router = Router()
+    router.add("GET", "/query/", handler)
+    router.add("GET", "/query/{cursor}", other_handler)
+    router.add("GET", "/sobjects/", handler)
+    router.add("GET", "/{sobject}/describe", handler)
+    router.add("GET", "/{sobject}/{record_id}", other_handler)
+
+    assert router.resolve("GET", "/query/") == (handler, {})
+    assert router.resolve("GET", "/query/describe") == (
+        other_handler,
+        {"cursor": "describe"},
+    )
+    # the literal is backtracked out of when what follows doesn't match
+    assert router.resolve("GET", "/sobjects/describe") == (
+        handler,
+        {"sobject": "sobjects"},
+    )
+    assert router.resolve("GET", "/Account/123") == (
+        other_handler,
+        {"sobject": "Account", "record_id": "123"},
+    )
+
+
+def test_salesforce_router_covers_the_mocked_endpoints():
+    assert salesforce_router.resolve(
+        "PATCH", "/services/data/v52.0/sobjects/Contact/External_Id__c/123"
+    )[1] == {"sobject": "Contact", "id_field": "External_Id__c", "record_id": "123"}
+    assert salesforce_router.resolve(
+        "GET", "/services/async/52.0/job/750x/batch/751x/result/752x"
+    )[1] == {"job_id": "750x", "batch_id": "751x", "result_set_id": "752x"}
+
+
+@mock_salesforce
+def test_unrouted_calls_are_left_to_other_mocks():
+    responses.add(
+        responses.GET,
+        "https://mock.salesforce.com/services/apexrest/Hello",
+        json={"hello": "world"},
+    )
+    salesforce = Salesforce(**MOCK_CREDS)
+
+    assert salesforce.apexecute("Hello", method="GET") == {"hello": "world"}
+    contact_id = salesforce.Contact.create({"LastName": "Smith"})["id"]
+    assert salesforce.Contact.get(contact_id)["LastName"] == "Smith"
+    assert json.loads(responses.calls[-1].response.text)["LastName"] == "Smith"
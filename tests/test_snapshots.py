@@ -0,0 +1,153 @@
+from simple_salesforce import Salesforce
+
+from simple_mockforce import mock_salesforce
+from simple_mockforce.storage import ROWS
+from simple_mockforce.virtual import VirtualSalesforce, virtual_salesforce
+from tests.utils import MOCK_CREDS
+
+
+def _seed(virtual: VirtualSalesforce):
+    virtual.provision()
+    account_ids = [
+        virtual.create("Account", {"Name": f"Account {i}", "External_ID__c": str(i)})
+        for i in range(10)
+    ]
+    virtual.create("Contact", {"LastName": "Osbourne", "AccountId": account_ids[0]})
+    return account_ids
+
+
+def _names(virtual: VirtualSalesforce, sobject_name: str = "Account"):
+    return sorted(
+        record["Name"] for record in virtual.query(f"SELECT Name FROM {sobject_name}")
+    )
+
+
+def test_restore_brings_back_the_snapshot():
+    virtual = VirtualSalesforce()
+    account_ids = _seed(virtual)
+    virtual.get_by_custom_id("Account", "3", "External_ID__c")
+    snapshot = virtual.snapshot()
+    seeded_names = _names(virtual)
+
+    virtual.update(
+        "Account", account_ids[3], {"Name": "Renamed", "External_ID__c": "x"}
+    )
+    virtual.delete("Account", account_ids[4])
+    virtual.create("Account", {"Name": "Account 10", "External_ID__c": "10"})
+    assert "Renamed" in _names(virtual)
+    assert virtual.get_by_custom_id("Account", "x", "External_ID__c")
+
+    virtual.restore(snapshot)
+    assert _names(virtual) == seeded_names
+    assert virtual.get("Account", account_ids[4])["IsDeleted"] is False
+    assert virtual.get_by_custom_id("Account", "3", "External_ID__c")["Id"] == (
+        account_ids[3]
+    )
+    assert virtual.query("SELECT Id FROM Account WHERE External_ID__c = 'x'") == []
+    assert virtual.query("SELECT Id FROM Account WHERE External_ID__c = '10'") == []
+
+    # a snapshot can be restored any number of times
+    virtual.delete("Account", account_ids[3])
+    virtual.restore(snapshot)
+    assert _names(virtual) == seeded_names
+
+
+def test_restore_shares_tables_until_they_are_written_to():
+    # unlike columns, rows are shared one record at a time
+    virtual = VirtualSalesforce(storage_engine=ROWS)
+    account_ids = _seed(virtual)
+    snapshot = virtual.snapshot()
+    virtual.restore(snapshot)
+
+    assert virtual.data["Account"] is snapshot.tables["Account"]
+
+    virtual.update("Account", account_ids[0], {"Name": "Renamed"})
+    account_table = virtual.data["Account"]
+    assert account_table is not snapshot.tables["Account"]
+    assert virtual.data["Contact"] is snapshot.tables["Contact"]
+
+    # only the record which was written to was copied
+    assert account_table.get(account_ids[0]) is not snapshot.tables["Account"].get(
+        account_ids[0]
+    )
+    assert account_table.get(account_ids[1]) is snapshot.tables["Account"].get(
+        account_ids[1]
+    )
+    assert snapshot.tables["Account"].get(account_ids[0])["Name"] == "Account 0"
+
+
+def test_writes_after_a_snapshot_leave_it_untouched():
+    virtual = VirtualSalesforce()
+    account_ids = _seed(virtual)
+    snapshot = virtual.snapshot()
+
+    virtual.delete("Account", account_ids[0])
+    virtual.declare_field_type("Account", "External_ID__c", "decimal")
+
+    other = VirtualSalesforce()
+    other.restore(snapshot)
+    assert len(_names(other)) == 10
+    assert other.get("Account", account_ids[1])["External_ID__c"] == "1"
+    assert len(_names(virtual)) == 9
+
+
+@mock_salesforce
+def test_mock_salesforce_starts_from_the_baseline():
+    salesforce = Salesforce(**MOCK_CREDS)
+    salesforce.Account.create({"Name": "Seeded"})
+    virtual_salesforce.baseline = virtual_salesforce.snapshot()
+
+    try:
+        _run_against_the_baseline()
+        _run_against_the_baseline()
+    finally:
+        virtual_salesforce.baseline = None
+
+
+@mock_salesforce
+def _run_against_the_baseline():
+    salesforce = Salesforce(**MOCK_CREDS)
+    assert _names(virtual_salesforce) == ["Seeded"]
+    salesforce.Account.create({"Name": "Created"})
+    assert _names(virtual_salesforce) == ["Created", "Seeded"]
+
+
+def test_forks_are_layered_over_the_snapshot():
+    virtual = VirtualSalesforce(storage_engine=ROWS)
+    account_ids = _seed(virtual)
+    virtual.declare_index("Account", "External_ID__c", ordered=True)
+    snapshot = virtual.snapshot()
+    seeded_table = snapshot.tables["Account"]
+    seeded_index = snapshot.indexes["Account"]["External_ID__c"]
+
+    virtual.update("Account", account_ids[0], {"External_ID__c": "a"})
+    virtual.delete("Account", account_ids[1])
+    table = virtual.data["Account"]
+    index = virtual.indexes.find_index("Account", "External_ID__c")
+    # the fork only holds what was written to it
+    assert table.live.base is seeded_table.live
+    assert len(table.live.replaced) == 1
+    assert table.live.removed == {account_ids[1]}
+    assert index.buckets.base is seeded_index.buckets
+    assert set(index.buckets.added) == {"a"}
+    assert [record["Id"] for record in table.records()] == [
+        account_ids[0],
+        *account_ids[2:],
+    ]
+
+    # forks of forks are layered over the same records, never deeper
+    virtual.restore(virtual.snapshot())
+    virtual.delete("Account", account_ids[2])
+    assert virtual.data["Account"].live.base is seeded_table.live
+    assert virtual.indexes.find_index("Account", "External_ID__c").keys == [
+        *map(str, range(3, 10)),
+        "a",
+    ]
+    assert _names(virtual) == [f"Account {i}" for i in [0, *range(3, 10)]]
+    assert virtual.query("SELECT Name FROM Account WHERE External_ID__c > '8'") == [
+        {"Name": "Account 9"},
+        {"Name": "Account 0"},
+    ]
+
+    assert seeded_index.keys == [str(i) for i in range(10)]
+    assert len(seeded_table.live) == 10
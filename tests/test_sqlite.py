@@ -0,0 +1,200 @@
+import datetime
+import pickle
+import random
+
+import pytest
+
+from simple_mockforce.query_algorithms import compile_where_clause
+from simple_mockforce.soql import parse_soql
+from simple_mockforce.sqlite import (
+    NUMBER,
+    OBJECT,
+    STRING,
+    SQLiteDatabase,
+    SQLiteFieldIndex,
+    SQLiteRecord,
+)
+from simple_mockforce.storage import ROWS, SQLITE
+from simple_mockforce.virtual import VirtualSalesforce
+
+QUERIES = [
+    "SELECT Name, Amount FROM Opportunity ORDER BY Amount DESC, Name",
+    "SELECT Name FROM Opportunity WHERE Amount > 500 ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Amount = 0.5 OR Amount = null ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Amount != 100 ORDER BY Name DESC LIMIT 7",
+    "SELECT Name FROM Opportunity WHERE Stage__c IN ('Won', 'Lost') AND IsWon__c = true ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Stage__c IN ('Won', null) ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE Stage__c != 'Won' ORDER BY Stage__c NULLS LAST, Name",
+    "SELECT Name FROM Opportunity WHERE Stage__c > 'Lost' ORDER BY Stage__c DESC NULLS FIRST, Name",
+    "SELECT Name FROM Opportunity WHERE CloseDate__c >= 2022-06-15 ORDER BY CloseDate__c, Name",
+    "SELECT Name FROM Opportunity WHERE CloseDate__c = THIS_MONTH ORDER BY Name",
+    "SELECT Name FROM Opportunity WHERE LastActivity__c < 2022-06-15T12:00:00Z ORDER BY LastActivity__c DESC, Name",
+    "SELECT Name FROM Opportunity WHERE Mixed__c = 'one' OR Mixed__c = 1 ORDER BY Name",
+    "SELECT Name FROM Opportunity ORDER BY Name LIMIT 5 OFFSET 10",
+    "SELECT Name FROM Opportunity WHERE Amount > 100 LIMIT 3 OFFSET 2",
+    "SELECT Name FROM Opportunity WHERE Nope__c = 1",
+    "SELECT Name, Account.Name FROM Opportunity WHERE AccountId != null ORDER BY Name LIMIT 10",
+]
+
+
+def _seed(virtual_salesforce: VirtualSalesforce):
+    rng = random.Random(42)
+    account_ids = [
+        virtual_salesforce.create("Account", {"Name": f"Account {i}"}) for i in range(5)
+    ]
+    for i in range(200):
+        record = {
+            "Name": f"Opportunity {i:03}",
+            "Amount": rng.choice([None, 0.5, 100, 250.25, 1000, rng.randint(0, 2000)]),
+            "Stage__c": rng.choice([None, "Won", "Lost", "Open"]),
+            "IsWon__c": rng.choice([True, False]),
+            "CloseDate__c": rng.choice(
+                [None, datetime.date.today().isoformat(), "2022-06-01", "2022-06-30"]
+            ),
+            "LastActivity__c": rng.choice(
+                ["2022-06-15T10:00:00.000+0000", "2022-06-15T13:00:00.000+0200"]
+            ),
+            "Mixed__c": rng.choice(["one", 1, None]),
+            "AccountId": rng.choice(account_ids + [None]),
+        }
+        # not every record has every field
+        del record[rng.choice(list(record.keys())[1:])]
+        virtual_salesforce.create("Opportunity", record)
+
+
+@pytest.fixture(scope="module")
+def orgs():
+    rows = VirtualSalesforce(storage_engine=ROWS)
+    sqlite = VirtualSalesforce(storage_engine=SQLITE)
+    _seed(rows)
+    _seed(sqlite)
+    return rows, sqlite
+
+
+@pytest.mark.parametrize("soql", QUERIES)
+def test_sqlite_engine_matches_rows_engine(orgs, soql):
+    rows, sqlite = orgs
+    assert sqlite.query(soql) == rows.query(soql)
+    if parse_soql(soql).limit is None:
+        count_soql = f"SELECT COUNT() FROM {soql.split(' FROM ')[1]}"
+        count_soql = count_soql.split(" ORDER BY ")[0]
+        assert sqlite.count(count_soql) == rows.count(count_soql)
+
+
+def test_sqlite_engine_translates_where_clauses(orgs):
+    _, sqlite = orgs
+    table = sqlite.data["Opportunity"]
+
+    def exact(soql: str) -> bool:
+        where = compile_where_clause(parse_soql(soql).where).where
+        return table._where(where)[2]
+
+    assert exact("SELECT Id FROM Opportunity WHERE Amount > 5 AND Stage__c = 'Won'")
+    assert exact("SELECT Id FROM Opportunity WHERE Amount = null OR IsWon__c = false")
+    # relative date tokens, and fields of mixed kinds, are evaluated in Python
+    assert not exact("SELECT Id FROM Opportunity WHERE CloseDate__c = THIS_MONTH")
+    assert not exact("SELECT Id FROM Opportunity WHERE Mixed__c = 'one'")
+    # as are literals of another kind than the field's values
+    assert not exact("SELECT Id FROM Opportunity WHERE Amount = 'five'")
+
+    assert table.kinds["Amount"] == NUMBER
+    assert table.kinds["Stage__c"] == STRING
+    assert table.kinds["Mixed__c"] == OBJECT
+
+
+def test_sqlite_engine_falls_back_on_values_it_cannot_order(orgs):
+    soql = "SELECT Name FROM Opportunity ORDER BY Mixed__c, Name"
+    for virtual_salesforce in orgs:
+        with pytest.raises(TypeError):
+            virtual_salesforce.query(soql)
+
+
+def test_sqlite_engine_writes_through_records():
+    virtual_salesforce = VirtualSalesforce(storage_engine=SQLITE)
+    record_id = virtual_salesforce.create(
+        "Account", {"Name": "Google", "Founded__c": datetime.date(1998, 9, 4)}
+    )
+
+    virtual_salesforce.update("Account", record_id, {"Website": "google.com"})
+    account = virtual_salesforce.get("Account", record_id)
+    assert isinstance(account, SQLiteRecord)
+    assert account["Name"] == "Google"
+    assert account["Website"] == "google.com"
+    # values which aren't JSON are kept as they were written
+    assert account["Founded__c"] == datetime.date(1998, 9, 4)
+    del account["Website"]
+    assert "Website" not in virtual_salesforce.get("Account", record_id)
+
+    virtual_salesforce.delete("Account", record_id)
+    assert virtual_salesforce.query("SELECT Name FROM Account") == []
+    assert virtual_salesforce.query(
+        "SELECT Name, IsDeleted FROM Account", include_deleted=True
+    ) == [{"Name": "Google", "IsDeleted": True}]
+
+
+def test_sqlite_engine_indexes_in_the_database():
+    virtual_salesforce = VirtualSalesforce(storage_engine=SQLITE)
+    virtual_salesforce.declare_index("Account", "External_ID__c")
+    for i in range(10):
+        virtual_salesforce.create(
+            "Account", {"Name": f"Account {i}", "External_ID__c": str(i)}
+        )
+
+    table = virtual_salesforce.data["Account"]
+    plan = table.database.execute(
+        f"EXPLAIN QUERY PLAN SELECT position FROM {table.name} "
+        f"WHERE n{table.field_numbers['External_ID__c']} = '3'"
+    ).fetchall()
+    assert "INDEX" in str(plan)
+
+    account = virtual_salesforce.get_by_custom_id("Account", "3", "External_ID__c")
+    assert account["Name"] == "Account 3"
+    virtual_salesforce.declare_field_type("Account", "External_ID__c", "decimal")
+    account = virtual_salesforce.get_by_custom_id("Account", "3", "External_ID__c")
+    assert account["Name"] == "Account 3"
+    # records are never indexed in Python
+    index = virtual_salesforce.indexes.get_index("Account", "Name")
+    assert isinstance(index, SQLiteFieldIndex)
+    assert [account["Name"] for account in index.lookup("Account 4")] == ["Account 4"]
+    assert "Name" in table.indexed
+
+
+def test_sqlite_tables_fork_and_pickle():
+    virtual_salesforce = VirtualSalesforce(storage_engine=SQLITE)
+    record_id = virtual_salesforce.create("Account", {"Name": "Google"})
+    snapshot = virtual_salesforce.snapshot()
+
+    virtual_salesforce.update("Account", record_id, {"Name": "Alphabet"})
+    assert snapshot.tables["Account"].get(record_id)["Name"] == "Google"
+    assert virtual_salesforce.get("Account", record_id)["Name"] == "Alphabet"
+
+    table = pickle.loads(pickle.dumps(virtual_salesforce.data["Account"]))
+    assert table.database is not virtual_salesforce.data["Account"].database
+    assert dict(table.get(record_id)) == dict(
+        virtual_salesforce.get("Account", record_id)
+    )
+
+
+def test_sqlite_database_drops_unused_tables():
+    database = SQLiteDatabase()
+    table = database.table()
+    name = table.name
+    del table
+    database.table()
+
+    tables = database.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    assert name not in [row[0] for row in tables]
+
+
+def test_sqlite_databases_share_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("MOCKFORCE_SQLITE_DATABASE", str(tmp_path / "mockforce.db"))
+    first = VirtualSalesforce(storage_engine=SQLITE)
+    first.create("Account", {"Name": "Google"})
+    # e.g., a fresh org, or the next run, opening the same file
+    second = VirtualSalesforce(storage_engine=SQLITE)
+    second.create("Account", {"Name": "Alphabet"})
+    second.use_storage_engine(SQLITE)
+    second.create("Account", {"Name": "YouTube"})
+
+    assert first.query("SELECT Name FROM Account") == [{"Name": "Google"}]
+    assert second.query("SELECT Name FROM Account") == [{"Name": "YouTube"}]
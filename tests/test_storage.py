@@ -0,0 +1,17 @@
+from simple_mockforce.records import Record
+from simple_mockforce.storage import SObjectTable
+
+
+def test_sobject_table_partitions():
+    table = SObjectTable()
+    first = table.insert({"Id": "1", "IsDeleted": False})
+    second = table.insert({"Id": "2", "IsDeleted": False})
+    assert isinstance(first, Record)
+
+    table.bury(first)
+
+    assert len(table) == 1
+    assert table.get("1") is None
+    assert table.get("2") is second
+    assert list(table.records()) == [second]
+    assert list(table.records(include_deleted=True)) == [second, first]